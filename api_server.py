@@ -0,0 +1,227 @@
+"""
+Read-only HTTP API for briefings and news.
+
+    GET /briefings                  dates of all briefings, newest first
+    GET /briefings/<YYYY-MM-DD>     one briefing (as saved)
+    GET /news?since=<YYYY-MM-DD>[&limit=N] news published on/after that date
+
+Sits on top of database.py (SQLite or Firestore), so tools can poll it
+instead of opening their own Firestore clients. Responses carry a strong
+ETag (hash of the body) and honour If-None-Match with 304; bodies are
+gzipped when the client accepts it. Rendered responses are kept in an
+in-process LRU with a short TTL and dropped when this process saves a
+briefing.
+
+Usage:
+    python api_server.py [--host 0.0.0.0] [--port 8502]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+DEFAULT_PORT = 8502
+CACHE_ENTRIES = 256
+LIST_TTL = 60               # seconds; /briefings and /news
+BRIEFING_TTL = 300          # /briefings/<date>
+MAX_NEWS_LIMIT = 1000
+GZIP_MIN_BYTES = 1024
+
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+SINCE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')    # published_at is a date, no time
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Response:
+    """A rendered JSON body with its ETag and lazily gzipped variant."""
+
+    def __init__(self, payload, status=200):
+        self.status = status
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            # mtime=0: identical bytes for identical bodies
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+class LRUCache:
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()    # key -> (expires_at, Response)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self, *args):
+        with self.lock:
+            self.entries.clear()
+
+
+cache = LRUCache()
+database.add_briefing_listener(cache.clear)
+
+
+# --- Endpoints ---
+def list_briefings(query):
+    return {'briefings': database.list_briefings()}, LIST_TTL
+
+
+def get_briefing(query, date_str):
+    if not DATE_RE.match(date_str):
+        raise ApiError(400, "Date must be YYYY-MM-DD")
+    data = database.get_briefing(date_str)
+    if not data:
+        raise ApiError(404, f"No briefing for {date_str}")
+    return data, BRIEFING_TTL
+
+
+def list_news(query):
+    since = (query.get('since') or [''])[0]
+    if not SINCE_RE.match(since):
+        raise ApiError(400, "since=YYYY-MM-DD is required")
+    try:
+        limit = int((query.get('limit') or ['200'])[0])
+    except ValueError:
+        raise ApiError(400, "limit must be an integer")
+    if limit < 1:
+        raise ApiError(400, "limit must be positive")
+    limit = min(limit, MAX_NEWS_LIMIT)
+    rows = database.get_news_since(since, limit)
+    return {'since': since, 'news': [dict(row) for row in rows]}, LIST_TTL
+
+
+ROUTES = [
+    (re.compile(r'^/briefings/?$'), list_briefings),
+    (re.compile(r'^/briefings/([^/]+)$'), get_briefing),
+    (re.compile(r'^/news/?$'), list_news),
+]
+
+
+def handle(path, query_string):
+    """Response for a GET, from the cache when fresh."""
+    key = path + '?' + query_string
+    response = cache.get(key)
+    if response is not None:
+        return response
+
+    query = parse_qs(query_string)
+    for pattern, endpoint in ROUTES:
+        match = pattern.match(path)
+        if match:
+            try:
+                payload, ttl = endpoint(query, *match.groups())
+            except ApiError as e:
+                return Response({'error': str(e)}, e.status)
+            response = Response(payload)
+            cache.put(key, response, ttl)
+            return response
+    return Response({'error': 'Not found'}, 404)
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match uses weak comparison: W/"x" matches "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag.removeprefix('W/') in (etag, etag[:-1] + '-gzip"') for tag in candidates)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = 'NewsRadarAPI/1.0'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        try:
+            response = handle(parts.path, parts.query)
+        except Exception as e:
+            print(f"API error for {self.path}: {e}")
+            response = Response({'error': 'Internal error'}, 500)
+
+        use_gzip = 'gzip' in (self.headers.get('Accept-Encoding') or '') and len(response.body) >= GZIP_MIN_BYTES
+        # Strong ETags identify one representation: the gzip variant gets its own
+        etag = response.etag[:-1] + '-gzip"' if use_gzip else response.etag
+
+        if response.status == 200 and etag_matches(self.headers.get('If-None-Match'), response.etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        body = response.gzipped if use_gzip else response.body
+        self.send_response(response.status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if response.status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'public, max-age=60')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {self.address_string()} {format % args}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--host', default='0.0.0.0')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = arg_parser.parse_args()
+
+    database.init_db()
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"Serving briefings API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
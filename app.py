@@ -52,6 +52,7 @@ load_secrets_to_env()
 load_dotenv(override=True)
 
 import database
+import ui_data
 import pandas as pd
 from datetime import datetime, timedelta
 import time
@@ -67,18 +68,16 @@ st.set_page_config(
 
 # Load CSS
 def load_css():
-    css_path = os.path.join('assets', 'style.css')
-    if os.path.exists(css_path):
-        with open(css_path, encoding='utf-8') as f:
-            st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+    css = ui_data.load_css()
+    if css:
+        st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
 
 load_css()
 
 # Load sources config
 def load_sources_config():
     try:
-        with open('sources.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return ui_data.load_sources_config()
     except Exception as e:
         st.error(f"Error loading sources.json: {e}")
         return []
@@ -101,11 +100,14 @@ if hasattr(database, 'FIRESTORE_IMPORT_ERROR') and database.FIRESTORE_IMPORT_ERR
 # ========== TOP 10 SECTION ==========
 import rule_based_top10
 import glob
+from html import escape as html_escape
+import jobs
+import publisher
 
 # ========== MINIMALIST SINGLE-LAYER FEED ==========
 # Inject CSS with Minimalist design principles
 # Find all available briefing files via DB
-briefing_dates = database.list_briefings()
+briefing_dates = ui_data.list_briefings()
 # briefing_files = sorted(glob.glob("top10_*.json"), reverse=True)
 # # Exclude cache files
 # briefing_files = [f for f in briefing_files if 'cache' not in f]
@@ -122,19 +124,15 @@ with st.popover("📅 每日新聞", help="點擊管理簡報"):
     today_file = f"top10_{today_str}.json"
     
     # Check if we have news for today in DB
-    today_news_count = database.get_today_news_count()
+    today_news_count = ui_data.get_today_news_count()
     has_news = today_news_count > 0
     
-    # Determine default behavior
     if today_str not in briefing_dates:
         if has_news:
-            default_skip_crawl = True
             st.caption(f"📊 資料庫已有 {today_news_count} 則今日新聞")
         else:
-            default_skip_crawl = False
             st.caption("⚠️ 資料庫尚無今日新聞，將自動爬取")
     else:
-        default_skip_crawl = True
         st.caption("✅ 今日簡報已存在，點擊可重新生成")
         
         # --- Email Notification Button ---
@@ -142,7 +140,7 @@ with st.popover("📅 每日新聞", help="點擊管理簡報"):
             with st.spinner("🚀 正在發送電子報..."):
                 try:
                     # Load data
-                    data = database.get_briefing(today_str)
+                    data = ui_data.get_briefing(today_str)
                     top10 = data.get('top10', [])
                     summary = data.get('daily_briefing', '')
                     
@@ -151,7 +149,10 @@ with st.popover("📅 每日新聞", help="點擊管理簡報"):
                     else:
                         import notification_service
                         notifier = notification_service.EmailNotifier()
-                        success = notifier.send_daily_briefing(top10, summary)
+                        try:
+                            success = notifier.send_daily_briefing(top10, summary)
+                        finally:
+                            notifier.close()
                         
                         if success:
                             st.toast("✅ 電子報發送成功！", icon='🎉')
@@ -162,263 +163,109 @@ with st.popover("📅 每日新聞", help="點擊管理簡報"):
                     st.error(f"發送發生錯誤: {e}")
         # ---------------------------------
     
-    # Check if generation is complete
-    if st.session_state.get('generation_complete', False):
-        # Display terminal with stored logs
-        term_container = st.empty()
-        
-        def display_terminal(lines, show_cursor=False):
-            content_lines = ""
-            for line in lines:
-                content_lines += f'<div class="terminal-line"><span class="terminal-prompt">➜</span><span>{line}</span></div>'
-            
-            cursor_html = '<span class="terminal-cursor"></span>' if show_cursor else ''
-            
-            html = f'''
-            <div class="terminal-window">
-                <div class="terminal-header">
-                    <div class="terminal-dots">
-                        <div class="terminal-dot dot-red"></div>
-                        <div class="terminal-dot dot-yellow"></div>
-                        <div class="terminal-dot dot-green"></div>
-                    </div>
-                    <span>BRIEFING_GENERATOR_v2.1</span>
-                </div>
-                <div class="terminal-content">
-                    {content_lines}
-                    {cursor_html}
-                </div>
+    # Briefing generation runs as a background job (jobs.py): this script run
+    # only submits it and follows its status and log.
+    TERMINAL_HEADER = '''
+    <div class="terminal-window terminal-head">
+        <div class="terminal-header">
+            <div class="terminal-dots">
+                <div class="terminal-dot dot-red"></div>
+                <div class="terminal-dot dot-yellow"></div>
+                <div class="terminal-dot dot-green"></div>
             </div>
-            '''
-            term_container.markdown(html, unsafe_allow_html=True)
+            <span>BRIEFING_GENERATOR_v2.1</span>
+        </div>
+    </div>
+    '''
+    
+    def terminal_lines_html(lines):
+        content_lines = ""
+        for line in lines:
+            content_lines += f'<div class="terminal-line"><span class="terminal-prompt">➜</span><span>{html_escape(line)}</span></div>'
+        return f'<div class="terminal-window terminal-body"><div class="terminal-content">{content_lines}</div></div>'
+    
+    def stream_job_logs(job_id):
+        """
+        Show the job's log as it is written: each batch of new lines is
+        appended to the terminal as its own element, so earlier lines are
+        never re-sent. Returns when the job has finished.
+        """
+        st.markdown(TERMINAL_HEADER, unsafe_allow_html=True)
+        body = st.container(height=360)
+        waiting = st.empty()
+        seq = 0
+        while True:
+            new_lines = jobs.wait_logs(job_id, seq)
+            if new_lines:
+                seq = new_lines[-1][0]
+                body.markdown(terminal_lines_html([line for _, line in new_lines]), unsafe_allow_html=True)
+            job = jobs.get_job(job_id)
+            if job is None or job['status'] not in jobs.ACTIVE_STATES:
+                return
+            if job['status'] == jobs.QUEUED:
+                waiting.caption("⏳ 等待背景工作開始...")
+            else:
+                waiting.empty()
+    
+    # Follow our own job, or one started by another session/user
+    job_id = st.session_state.get('briefing_job_id')
+    if job_id is None:
+        running = jobs.active_job('briefing')
+        if running:
+            job_id = st.session_state.briefing_job_id = running['id']
+    job = jobs.get_job(job_id) if job_id is not None else None
+    
+    if job and job['status'] in jobs.ACTIVE_STATES:
+        stream_job_logs(job_id)
+        st.rerun()  # finished: redraw the whole page (new briefing, result panel)
+    
+    elif job:
+        st.markdown(TERMINAL_HEADER, unsafe_allow_html=True)
+        with st.container(height=360):
+            st.markdown(terminal_lines_html([line for _, line in jobs.get_logs(job_id)]), unsafe_allow_html=True)
         
-        # Display stored logs
-        stored_logs = st.session_state.get('generation_logs', [])
-        display_terminal(stored_logs, show_cursor=False)
+        if job['status'] == jobs.SUCCEEDED:
+            new_items = (job['result'] or {}).get('new_items')
+            if new_items == 0:
+                st.warning("⚠️ 本次爬蟲未抓取到任何新新聞 (新增數: 0)")
+                with st.expander("❓ 為什麼抓不到新聞？(點擊查看排除方法)"):
+                    st.markdown("""
+                    **可能原因與解決方法：**
+                    1. **資料庫已有最新資料**：今天的新聞可能已經抓過了。
+                    2. **網路連線問題**：伺服器可能無法連線到新聞網站。
+                    3. **網站阻擋 (WAF)**：新聞來源可能阻擋了爬蟲 (如 Cloudflare)。
+                    4. **來源網站未更新**：目標網站今天可能還沒發布新文章。
+                    
+                    **建議操作：**
+                    - 檢查 `debug_log.txt` 查看詳細錯誤。
+                    - 稍後再試。
+                    """)
+            elif new_items:
+                st.success(f"✅ 成功抓取 {new_items} 則新新聞！")
+        else:
+            st.error(f"⚠️ 生成失敗: {job['error']}。上方終端機已顯示詳細日誌。")
         
         # Add completion button
         if st.button("✅ 完成並重新整理", use_container_width=True):
-            st.session_state.generation_complete = False
-            st.session_state.generation_logs = []
+            st.session_state.briefing_job_id = None
             st.rerun()
     
     elif st.button("🚀 開始生成", use_container_width=True):
-        # Terminal Container
-        term_container = st.empty()
-        
-        def update_terminal(lines, show_cursor=True):
-            content_lines = ""
-            for line in lines:
-                content_lines += f'<div class="terminal-line"><span class="terminal-prompt">➜</span><span>{line}</span></div>'
-            
-            cursor_html = '<span class="terminal-cursor"></span>' if show_cursor else ''
-            
-            html = f'''
-            <div class="terminal-window">
-                <div class="terminal-header">
-                    <div class="terminal-dots">
-                        <div class="terminal-dot dot-red"></div>
-                        <div class="terminal-dot dot-yellow"></div>
-                        <div class="terminal-dot dot-green"></div>
-                    </div>
-                    <span>BRIEFING_GENERATOR_v2.1</span>
-                </div>
-                <div class="terminal-content">
-                    {content_lines}
-                    {cursor_html}
-                </div>
-            </div>
-            '''
-            term_container.markdown(html, unsafe_allow_html=True)
-            time.sleep(0.3)
-        
-        try:
-            logs = []
-            logs.append("Initializing system...")
-            update_terminal(logs)
-            time.sleep(0.5)
-            
-            logs.append("Authenticating user... [OK]")
-            update_terminal(logs)
-            
-            # Step 1: Crawl (Always force crawl when manually triggered)
-            if True: # Always run crawl sequence when button is clicked
-                logs.append("Checking environment variables...")
-                
-                # DEBUG: Check what secrets are actually loaded
-                has_key = "GOOGLE_API_KEY" in st.secrets or ("general" in st.secrets and "GOOGLE_API_KEY" in st.secrets["general"])
-                if has_key:
-                    logs.append("DEBUG: GOOGLE_API_KEY found in st.secrets")
-                else:
-                    logs.append("DEBUG: GOOGLE_API_KEY NOT found in st.secrets")
-                    
-                api_key = os.environ.get("GOOGLE_API_KEY")
-                if api_key:
-                    logs.append(f"API Key found in env: {api_key[:5]}... (masked)")
-                else:
-                    logs.append("WARNING: GOOGLE_API_KEY not found in env!")
-                update_terminal(logs)
-                
-                logs.append("Starting crawler subsystem...")
-                update_terminal(logs)
-                
-                # Get initial count
-                initial_count = database.get_today_news_count()
-                logs.append(f"Initial news count: {initial_count}")
-                update_terminal(logs)
-
-                logs.append("Targeting global AI news sources...")
-                update_terminal(logs)
-                
-                import subprocess
-                import sys
-                result = subprocess.run([sys.executable, "crawler.py"], capture_output=True, text=True, encoding='utf-8')
-                
-                # Show crawler output in logs
-                if result.stdout:
-                    for line in result.stdout.split('\n'):
-                        if line.strip():
-                            logs.append(f"CRAWLER: {line[:100]}")  # Truncate long lines
-                    update_terminal(logs)
-                
-                if result.returncode != 0:
-                    logs.append(f"ERROR: Crawler failed with code {result.returncode}")
-                    logs.append("Aborting sequence.")
-                    update_terminal(logs, show_cursor=False)
-                    
-                    # Store logs in session state
-                    st.session_state.generation_logs = logs
-                    st.session_state.generation_complete = True
-                    
-                    error_msg = result.stderr if result.stderr else result.stdout
-                    st.error(f"爬蟲錯誤: {error_msg}")
-                    st.stop()
-                else:
-                    # Wait for Firestore writes to complete (async write latency)
-                    logs.append("Waiting for database sync...")
-                    update_terminal(logs)
-                    time.sleep(2)
-                    
-                    # Get final count
-                    final_count = database.get_today_news_count()
-                    new_items = final_count - initial_count
-                    
-                    logs.append("Crawler finished successfully. [OK]")
-                    logs.append(f"Data ingestion complete. New items: {new_items}")
-                    update_terminal(logs)
-                    
-                    if new_items == 0:
-                        logs.append("WARNING: No new items found.")
-                        update_terminal(logs)
-                        st.warning("⚠️ 本次爬蟲未抓取到任何新新聞 (新增數: 0)")
-                        with st.expander("❓ 為什麼抓不到新聞？(點擊查看排除方法)"):
-                            st.markdown("""
-                            **可能原因與解決方法：**
-                            1. **資料庫已有最新資料**：今天的新聞可能已經抓過了。
-                            2. **網路連線問題**：伺服器可能無法連線到新聞網站。
-                            3. **網站阻擋 (WAF)**：新聞來源可能阻擋了爬蟲 (如 Cloudflare)。
-                            4. **來源網站未更新**：目標網站今天可能還沒發布新文章。
-                            
-                            **建議操作：**
-                            - 檢查 `debug_log.txt` 查看詳細錯誤。
-                            - 稍後再試。
-                            """)
-                    else:
-                        st.success(f"✅ 成功抓取 {new_items} 則新新聞！")
-            else:
-                logs.append("Database check: Found existing records.")
-                logs.append("Skipping crawler sequence. [SKIP]")
-                update_terminal(logs)
-            
-            # Step 2: Analyze & Generate
-            logs.append("Initializing AI Core (Deep Analyzer)...")
-            update_terminal(logs)
-            
-            import deep_analyzer
-            import rule_based_top10
-            import importlib
-            importlib.reload(rule_based_top10)
-            importlib.reload(deep_analyzer)
-            
-            logs.append("AI Agent: Analyzing content relevance...")
-            update_terminal(logs)
-            
-            # Capture stdout/stderr from deep_analyzer to show in UI
-            import io
-            import contextlib
-            
-            output_capture = io.StringIO()
-            result = None
-            
-            try:
-                with contextlib.redirect_stdout(output_capture), contextlib.redirect_stderr(output_capture):
-                    result = deep_analyzer.generate_deep_top10()
-            except Exception as e:
-                output_capture.write(f"\nEXCEPTION in deep_analyzer: {e}")
-            
-            # Process captured logs
-            captured_logs = output_capture.getvalue().split('\n')
-            for line in captured_logs:
-                if line.strip():
-                    logs.append(f"DA: {line}")
-            
-            update_terminal(logs)
-            
-            if not result or not result.get('top10'):
-                logs.append("CRITICAL: Generation produced 0 items.")
-                update_terminal(logs, show_cursor=False)
-                
-                # Store logs in session state
-                st.session_state.generation_logs = logs
-                st.session_state.generation_complete = True
-                
-                st.error("⚠️ 生成結果為空！上方終端機已顯示詳細日誌 (DA: 開頭)。請檢查是否有 'Found 0 candidates' 或其他錯誤訊息。")
-                st.stop()
-            
-            logs.append(f"Success: Generated {len(result['top10'])} items.")
-            logs.append("Generating briefing artifacts...")
-            update_terminal(logs)
-            
-            logs.append("Sequence complete. System ready.")
-            update_terminal(logs, show_cursor=False)
-            
-            # Store logs in session state
-            st.session_state.generation_logs = logs
-            st.session_state.generation_complete = True
-            
-            time.sleep(1)
-            st.rerun()
-        except Exception as e:
-            logs.append(f"CRITICAL ERROR: {str(e)}")
-            update_terminal(logs, show_cursor=False)
-            
-            # Store logs in session state
-            st.session_state.generation_logs = logs
-            st.session_state.generation_complete = True
-            
-            st.error(f"發生錯誤: {e}")
+        # Always crawl when manually triggered
+        job_id, created = jobs.submit('briefing', {'start_at': 'crawl'})
+        if not created:
+            st.toast("已有簡報正在生成，顯示目前進度", icon='⏳')
+        st.session_state.briefing_job_id = job_id
+        st.rerun()
 
 if not briefing_dates:
     st.info("尚無每日簡報資料。請先點擊上方「📅 每日新聞」按鈕，再點擊「🚀 開始生成」來產生第一期簡報。")
 else:
     
-    # Iterate through dates to find the first valid briefing
-    found_valid_briefing = False
-    file_date = None
-    top10_list = []
-    
-    for date_str in briefing_dates:
-        try:
-            data = database.get_briefing(date_str)
-            if data and data.get('top10'):
-                top10_list = [item for item in data.get('top10', []) if item is not None]
-                if top10_list: # Ensure list is not empty
-                    file_date = date_str
-                    found_valid_briefing = True
-                    break
-        except Exception as e:
-            print(f"Error checking briefing for {date_str}: {e}")
-            continue
+    # Newest briefing with a non-empty top10 (cached, see ui_data.py)
+    file_date, data = ui_data.latest_briefing()
+    found_valid_briefing = file_date is not None
+    top10_list = [item for item in data.get('top10', []) if item is not None] if data else []
             
     if not found_valid_briefing:
         st.info("尚無可用的每日簡報資料。請先點擊上方「📅 每日新聞」按鈕，再點擊「🚀 開始生成」來產生第一期簡報。")
@@ -433,62 +280,12 @@ else:
         st.markdown("---")
         
         # Display Daily Summary Card (if available)
-        daily_summary = data.get('daily_briefing')
-        if daily_summary:
-            summary_html = f'''
-<div class="daily-summary-card">
-    <div class="daily-summary-title">今日新聞總結</div>
-    <div class="daily-summary-content">{daily_summary}</div>
-</div>
-'''
+        summary_html = publisher.render_summary_html(data.get('daily_briefing'))
+        if summary_html:
             st.markdown(summary_html, unsafe_allow_html=True)
         
-        # 5x2 Grid Layout
-        html_cards = []
-        html_cards.append('<div class="news-grid-responsive">')
-        
-        for i, item in enumerate(top10_list[:10]): # Ensure max 10
-            rank = i + 1
-            title = item.get('title', 'No Title')
-            source = item.get('source', 'Unknown')
-            url = item.get('url', '#')
-            rundown = item.get('ai_rundown', '尚無摘要')
-            
-            # 分類標籤對應的顯示名稱和 CSS class
-            CATEGORY_DISPLAY = {
-                'Breaking': ('Breaking', 'tag-breaking'),
-                'Tools': ('Tools', 'tag-tools'),
-                'Business': ('Business', 'tag-business'),
-                'Creative': ('Creative', 'tag-creative'),
-                'Research': ('Research', 'tag-research'),
-                'Rules': ('Rules', 'tag-rules'),
-                'Risk': ('Risk', 'tag-risk'),
-            }
-            
-            ai_category = item.get('ai_category', '')
-            category_name, category_class = CATEGORY_DISPLAY.get(ai_category, ('', ''))
-            
-            # 只在有分類時顯示標籤
-            category_tag = f'<span class="news-category-tag {category_class}">{category_name}</span>' if category_name else ''
-            
-            card_html = f'''
-<div class="news-card-text-only">
-<div class="card-rank">#{rank:02d}</div>
-<a href="{url}" target="_blank" class="card-title">{title}</a>
-<div class="card-meta">
-<span class="news-source">{source}</span>
-{category_tag}
-</div>
-<div class="card-summary">
-{rundown}
-</div>
-</div>
-'''
-            html_cards.append(card_html)
-        
-        html_cards.append('</div>')
-        
-        st.markdown("".join(html_cards), unsafe_allow_html=True)
+        # 5x2 Grid Layout (same markup as the static pages, see publisher.py)
+        st.markdown(publisher.render_cards_html(top10_list), unsafe_allow_html=True)
             
 
 
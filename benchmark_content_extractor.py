@@ -0,0 +1,143 @@
+"""
+Benchmark main-content extraction on saved article pages.
+
+Compares the legacy heuristic (<article> / content classes / whole page,
+first 3000 chars sent to Gemini) with content_extractor's density scoring:
+extraction time and how much text (chars / estimated tokens) each produces.
+
+Usage:
+    python benchmark_content_extractor.py                  # pages in snapshots/articles/
+    python benchmark_content_extractor.py --capture 20     # save 20 recent articles first
+    python benchmark_content_extractor.py page1.html page2.html --budget 600
+    python benchmark_content_extractor.py --show           # print the extracted lead
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from content_extractor import DEFAULT_TOKEN_BUDGET, estimate_tokens, extract_content
+from html_parsing import make_soup
+
+ARTICLE_DIR = os.path.join('snapshots', 'articles')
+LEGACY_PROMPT_CHARS = 3000  # deep_analyzer used content[:3000]
+
+
+def legacy_extract(html):
+    """The extraction fetch_article_content used before content_extractor."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript"]):
+        tag.decompose()
+    article = soup.find('article')
+    if not article:
+        for cls in ['content', 'post-content', 'entry-content', 'article-body', 'story-body']:
+            article = soup.find(class_=cls)
+            if article:
+                break
+    if not article:
+        article = soup
+    return article.get_text(separator='\n', strip=True)
+
+
+def capture_articles(count):
+    """Save the most recent article pages from the news DB under snapshots/articles/."""
+    import requests
+    import urllib3
+    import database
+    import google_news
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    os.makedirs(ARTICLE_DIR, exist_ok=True)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    }
+    saved = 0
+    for row in database.get_all_news():
+        if saved >= count:
+            break
+        url = dict(row)['url']
+        if google_news.is_google_news_url(url):
+            url = google_news.resolve_url(url)
+            if not url:
+                continue
+        path = os.path.join(ARTICLE_DIR, hashlib.sha1(url.encode('utf-8')).hexdigest()[:12] + '.html')
+        if os.path.exists(path):
+            continue
+        try:
+            response = requests.get(url, headers=headers, timeout=15, verify=False)
+            response.raise_for_status()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"<!-- {url} -->\n" + response.text)
+            saved += 1
+            print(f"Saved {url} -> {path}")
+        except Exception as e:
+            print(f"Failed to capture {url}: {e}")
+
+
+def best_time(fn, runs):
+    best = None
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('pages', nargs='*', help='HTML files (default: snapshots/articles/*.html)')
+    arg_parser.add_argument('--capture', type=int, metavar='N', help='save N recent articles from the DB first')
+    arg_parser.add_argument('--runs', type=int, default=3, help='runs per page (best time is reported)')
+    arg_parser.add_argument('--budget', type=int, default=DEFAULT_TOKEN_BUDGET, help='token budget for the extractor')
+    arg_parser.add_argument('--show', action='store_true', help='print the extracted text')
+    args = arg_parser.parse_args()
+
+    if args.capture:
+        capture_articles(args.capture)
+
+    pages = args.pages or sorted(glob.glob(os.path.join(ARTICLE_DIR, '*.html')))
+    if not pages:
+        print("No article pages found. Run with --capture N or pass HTML files.")
+        return 1
+
+    header = f"{'Page':<24} {'KB':>5} {'legacy ms':>10} {'new ms':>8} {'legacy tok':>11} {'new tok':>8}  method"
+    print(header)
+    print("-" * len(header))
+
+    totals = {'legacy_ms': 0.0, 'new_ms': 0.0, 'legacy_tok': 0, 'new_tok': 0}
+    for path in pages:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html = f.read()
+
+        legacy_s, legacy_text = best_time(lambda: legacy_extract(html), args.runs)
+        new_s, result = best_time(lambda: extract_content(make_soup(html), args.budget), args.runs)
+        # What the analyzer actually received
+        legacy_tokens = estimate_tokens(legacy_text[:LEGACY_PROMPT_CHARS])
+        new_tokens = estimate_tokens(result['text'])
+
+        totals['legacy_ms'] += legacy_s * 1000
+        totals['new_ms'] += new_s * 1000
+        totals['legacy_tok'] += legacy_tokens
+        totals['new_tok'] += new_tokens
+
+        name = os.path.basename(path)[:24]
+        print(f"{name:<24} {len(html) // 1024:>5} {legacy_s * 1000:>10.1f} {new_s * 1000:>8.1f} "
+              f"{legacy_tokens:>11} {new_tokens:>8}  {result['method']}{' (truncated)' if result['truncated'] else ''}")
+        if args.show:
+            print(result['text'][:1500])
+            print()
+
+    print("-" * len(header))
+    print(f"{'Total':<24} {'':>5} {totals['legacy_ms']:>10.1f} {totals['new_ms']:>8.1f} "
+          f"{totals['legacy_tok']:>11} {totals['new_tok']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Benchmark email delivery against a local stand-in SMTP server.
+
+The stand-in speaks enough SMTP for smtplib (EHLO, AUTH PLAIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT), can add a per-command delay to mimic network
+round trips and a session setup delay to mimic the TLS handshake and
+login of a real provider, and refuses recipients to exercise per-recipient status:
+addresses containing "defer" get 451 (retried), "bounce" get 550 (failed).
+
+Compares the old delivery (connect + login for every message, all
+recipients in one transaction) with email_delivery (one reused session,
+recipients in batches, outbox bookkeeping), and reports throughput.
+
+Usage:
+    python benchmark_email_delivery.py
+    python benchmark_email_delivery.py --messages 50 --recipients 20 --setup-latency 300
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+import email_delivery
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, text):
+        self.wfile.write((text + "\r\n").encode('utf-8'))
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        if server.setup_latency:
+            time.sleep(server.setup_latency)
+        self.reply("220 stand-in ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if server.latency:
+                time.sleep(server.latency)
+
+            if verb == 'EHLO':
+                self.reply("250-stand-in\r\n250-AUTH PLAIN\r\n250 SIZE 10485760")
+            elif verb == 'HELO':
+                self.reply("250 stand-in")
+            elif verb == 'AUTH':
+                server.count('logins')
+                if server.setup_latency:
+                    time.sleep(server.setup_latency)
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == 'MAIL':
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                address = command.lower()
+                if 'bounce' in address:
+                    self.reply("550 5.1.1 No such user")
+                elif 'defer' in address:
+                    self.reply("451 4.3.0 Try again later")
+                else:
+                    server.count('recipients')
+                    self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b".\r\n":
+                        break
+                server.count('transactions')
+                self.reply("250 OK queued")
+            elif verb in ('RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0, setup_latency=0.0):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.latency = latency
+        self.setup_latency = setup_latency
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def take_stats(self):
+        with self.lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+
+def legacy_send(port, sender, recipients, html):
+    """The old EmailNotifier path: fresh connection and login for every message."""
+    server = smtplib.SMTP('127.0.0.1', port)
+    server.login(sender, 'password')
+    try:
+        server.sendmail(sender, recipients, email_delivery.build_message(sender, recipients, "Briefing", html))
+    except smtplib.SMTPRecipientsRefused:
+        pass
+    server.quit()
+
+
+def make_recipients(count, defer_every, bounce_every):
+    recipients = []
+    for i in range(count):
+        if bounce_every and i % bounce_every == bounce_every - 1:
+            recipients.append(f"bounce{i}@example.com")
+        elif defer_every and i % defer_every == defer_every - 1:
+            recipients.append(f"defer{i}@example.com")
+        else:
+            recipients.append(f"reader{i}@example.com")
+    return recipients
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--messages', type=int, default=10, help='messages to send')
+    arg_parser.add_argument('--recipients', type=int, default=200, help='recipients per message')
+    arg_parser.add_argument('--batch', type=int, default=email_delivery.RECIPIENTS_PER_BATCH, help='recipients per SMTP transaction')
+    arg_parser.add_argument('--latency', type=float, default=2.0, help='server delay per command (ms)')
+    arg_parser.add_argument('--setup-latency', type=float, default=150.0, help='delay for connect and for login (ms)')
+    arg_parser.add_argument('--defer-every', type=int, default=50, help='every Nth recipient gets a 451 (0: none)')
+    arg_parser.add_argument('--bounce-every', type=int, default=100, help='every Nth recipient gets a 550 (0: none)')
+    args = arg_parser.parse_args()
+
+    server = StandInSMTPServer(latency=args.latency / 1000, setup_latency=args.setup_latency / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    sender = "radar@example.com"
+    html = "<html><body>" + "<p>news</p>" * 400 + "</body></html>"
+    recipients = make_recipients(args.recipients, args.defer_every, args.bounce_every)
+    deliveries = args.messages * args.recipients
+
+    print(f"{args.messages} messages x {args.recipients} recipients, "
+          f"{args.latency:.0f} ms per SMTP command, {args.setup_latency:.0f} ms connect/login\n")
+
+    # 1. Legacy: connect + login per message
+    start = time.perf_counter()
+    for _ in range(args.messages):
+        legacy_send(port, sender, recipients, html)
+    legacy_s = time.perf_counter() - start
+    legacy_stats = server.take_stats()
+
+    # 2. Outbox + reused session
+    with tempfile.TemporaryDirectory() as tmp:
+        email_delivery.OUTBOX_DB = os.path.join(tmp, 'outbox.db')
+        connection = email_delivery.SMTPConnection(sender, 'password', host='127.0.0.1', port=port, security='none')
+        start = time.perf_counter()
+        for i in range(args.messages):
+            email_delivery.enqueue(f"bench:{i}", sender, "Briefing", html, recipients)
+        counts = email_delivery.deliver_pending(connection, batch_size=args.batch)
+        outbox_s = time.perf_counter() - start
+        connection.close()
+        outbox_stats = server.take_stats()
+
+        status = {}
+        conn = email_delivery.get_connection()
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM deliveries GROUP BY status"):
+            status[row['status']] = row['n']
+        conn.close()
+
+    server.shutdown()
+
+    header = f"{'Mode':<22} {'seconds':>8} {'msg/s':>8} {'deliveries/s':>13} {'connects':>9} {'logins':>7} {'transactions':>13}"
+    print(header)
+    print("-" * len(header))
+    for name, seconds, stats in (("connect per message", legacy_s, legacy_stats),
+                                 ("outbox, reused session", outbox_s, outbox_stats)):
+        print(f"{name:<22} {seconds:>8.2f} {args.messages / seconds:>8.1f} {deliveries / seconds:>13.0f} "
+              f"{stats.get('connections', 0):>9} {stats.get('logins', 0):>7} {stats.get('transactions', 0):>13}")
+    print(f"\nOutbox run: {counts}; recipient status: {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
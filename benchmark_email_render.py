@@ -0,0 +1,75 @@
+"""
+Benchmark briefing email rendering for many recipients.
+
+Compares rendering the whole newsletter for every recipient (what
+personalised editions would cost with the old generate_html_content)
+with email_templates' cached body: rendered once per briefing, then one
+fragment splice per recipient.
+
+Usage:
+    python benchmark_email_render.py
+    python benchmark_email_render.py --recipients 10000 --items 10
+"""
+import argparse
+import sys
+import time
+
+import email_templates
+
+
+def render_per_recipient(top10_data, daily_summary, date_str, recipient):
+    """No body cache: every recipient pays for the full render."""
+    body = email_templates.SharedBody(email_templates._render_body(top10_data, daily_summary, date_str))
+    return email_templates.personalize(body, recipient)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--recipients', type=int, default=5000)
+    arg_parser.add_argument('--items', type=int, default=10)
+    args = arg_parser.parse_args()
+
+    top10 = [{
+        'title': f"Headline number {i} about a new model release",
+        'url': f"https://example.com/news/{i}",
+        'source': 'Example News',
+        'ai_category': 'Research',
+        'ai_rundown': "A fairly long rundown paragraph summarising the article for readers. " * 6,
+    } for i in range(args.items)]
+    summary = "Today's summary of the most important AI news. " * 8
+    recipients = [f"reader{i}@example.com" for i in range(args.recipients)]
+    date_str = '2026-01-22'
+
+    start = time.perf_counter()
+    for recipient in recipients:
+        render_per_recipient(top10, summary, date_str, recipient)
+    legacy_s = time.perf_counter() - start
+
+    email_templates.clear_cache()
+    start = time.perf_counter()
+    for recipient in recipients:
+        email_templates.render_briefing(top10, summary, date_str, recipient=recipient)
+    cached_s = time.perf_counter() - start
+
+    # render_briefing() hashes the briefing on every call to find the cached body;
+    # the outbox instead splits the shared body once and splices per recipient
+    shared = email_templates.render_shared(top10, summary, date_str)
+    start = time.perf_counter()
+    for recipient in recipients:
+        email_templates.personalize(shared, recipient)
+    splice_s = time.perf_counter() - start
+
+    print(f"{args.recipients} recipients x {args.items} items\n")
+    header = f"{'Mode':<30} {'seconds':>8} {'renders/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, seconds in (("full render per recipient", legacy_s),
+                          ("render_briefing (cached body)", cached_s),
+                          ("personalize (outbox path)", splice_s)):
+        print(f"{name:<30} {seconds:>8.3f} {args.recipients / seconds:>10.0f}")
+    print(f"\nBody cache: {email_templates.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Benchmark HTML parser backends on saved listing-page snapshots.
+
+Usage:
+    python benchmark_parsers.py                 # benchmark saved snapshots
+    python benchmark_parsers.py --capture       # save snapshots of static sources first
+    python benchmark_parsers.py --runs 10 --parsers lxml html.parser
+    python benchmark_parsers.py --partial       # also time container-only parsing
+
+Snapshots are read from the checked-in dumps (bnext.html, hackingai_dump.html)
+and from snapshots/<source-slug>.html (written by --capture).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from html_parsing import container_strainer
+
+SNAPSHOT_DIR = 'snapshots'
+
+# Checked-in dumps that predate the snapshots/ folder
+LEGACY_SNAPSHOTS = {
+    '數位時代': 'bnext.html',
+    'HackingAI': 'hackingai_dump.html',
+}
+
+# Item selectors hard-coded in crawler.py for sources without "selectors"
+BUILTIN_CONTAINERS = {
+    'HackingAI': 'div.mb-3',
+    'TLDR Tech AI': 'article.mt-3',
+}
+
+
+def slugify(name):
+    slug = re.sub(r'[^\w]+', '-', name.lower()).strip('-')
+    return slug or 'source'
+
+
+def load_sources():
+    with open('sources.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def container_selector(source):
+    if source['name'] in BUILTIN_CONTAINERS:
+        return BUILTIN_CONTAINERS[source['name']]
+    return source.get('selectors', {}).get('container')
+
+
+def snapshot_path(source):
+    legacy = LEGACY_SNAPSHOTS.get(source['name'])
+    if legacy and os.path.exists(legacy):
+        return legacy
+    return os.path.join(SNAPSHOT_DIR, f"{slugify(source['name'])}.html")
+
+
+def capture_snapshots(sources):
+    """Fetch static HTML sources and save them under snapshots/."""
+    import requests
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    }
+    session = requests.Session()
+    for source in sources:
+        if source.get('type', 'static') != 'static' or source.get('link_only'):
+            continue
+        path = os.path.join(SNAPSHOT_DIR, f"{slugify(source['name'])}.html")
+        try:
+            response = session.get(source['url'], headers=headers, timeout=15, verify=False)
+            response.raise_for_status()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            print(f"Saved {source['name']} -> {path} ({len(response.text) // 1024} KB)")
+        except Exception as e:
+            print(f"Failed to capture {source['name']}: {e}")
+
+
+def time_parse(html, parser, selector, runs, strainer=None):
+    """Return (best seconds per parse+select, item count)."""
+    best = None
+    count = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        # Parse with the backend directly so a missing backend shows as n/a
+        # instead of silently timing the fallback
+        soup = BeautifulSoup(html, parser, parse_only=strainer)
+        items = []
+        if selector:
+            for sel in selector.split(','):
+                items = soup.select(sel.strip())
+                if items:
+                    break
+        elapsed = time.perf_counter() - start
+        count = len(items)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def peak_memory(html, parser, strainer=None):
+    """Peak traced allocation (KB) while building the tree."""
+    tracemalloc.start()
+    try:
+        BeautifulSoup(html, parser, parse_only=strainer)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--capture', action='store_true', help='fetch static sources into snapshots/ first')
+    arg_parser.add_argument('--runs', type=int, default=5, help='runs per parser (best time is reported)')
+    arg_parser.add_argument('--parsers', nargs='+', default=['lxml', 'html5lib', 'html.parser'])
+    arg_parser.add_argument('--partial', action='store_true', help='add container-only (SoupStrainer) columns')
+    args = arg_parser.parse_args()
+
+    sources = load_sources()
+    if args.capture:
+        capture_snapshots(sources)
+
+    columns = []
+    for parser in args.parsers:
+        columns.append((parser, False))
+        if args.partial and parser != 'html5lib':  # html5lib ignores parse_only
+            columns.append((parser, True))
+
+    labels = [f"{p}+strainer" if partial else p for p, partial in columns]
+    header = f"{'Source':<28} {'KB':>6} " + " ".join(f"{label:>16}" for label in labels) + "  items"
+    if args.partial:
+        header += "  peak KB (full/partial)"
+    print(header)
+    print("-" * len(header))
+
+    found = 0
+    for source in sources:
+        path = snapshot_path(source)
+        if not os.path.exists(path):
+            continue
+        found += 1
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html = f.read()
+
+        selector = container_selector(source)
+        strainer = container_strainer(selector)
+        cells = []
+        counts = []
+        for parser, partial in columns:
+            if partial and strainer is None:
+                cells.append(f"{'-':>16}")
+                continue
+            try:
+                seconds, count = time_parse(html, parser, selector, args.runs, strainer if partial else None)
+                cells.append(f"{seconds * 1000:>13.1f} ms")
+                counts.append(str(count))
+            except Exception:
+                cells.append(f"{'n/a':>16}")
+                counts.append('-')
+        line = f"{source['name'][:28]:<28} {len(html) // 1024:>6} " + " ".join(cells) + "  " + "/".join(counts)
+        if args.partial and strainer is not None:
+            try:
+                parser = args.parsers[0]
+                line += f"  {peak_memory(html, parser)}/{peak_memory(html, parser, strainer)}"
+            except Exception:
+                pass
+        print(line)
+
+    if not found:
+        print("No snapshots found. Run with --capture to save the configured sources.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Main-content extraction for article pages (readability-style).
+
+Every text block (<p>, <pre>, <li>, ...) is scored by its length and comma
+count; scores propagate to the parent and grandparent containers. Containers
+are then weighted by their class/id (article-ish names up, sidebar-ish names
+down) and penalized by link density, so navigation and "related stories"
+lists lose to the real article body. The best container's blocks are
+returned in document order, lead paragraphs first, until a token budget is
+spent: only the part of the article the analyzer actually reads is kept.
+"""
+import re
+
+from bs4 import BeautifulSoup, Tag
+
+from html_parsing import make_soup
+
+DEFAULT_TOKEN_BUDGET = 800
+MIN_BLOCK_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+
+STRIP_TAGS = ["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript", "form", "svg", "button"]
+BLOCK_TAGS = ['p', 'pre', 'blockquote', 'li', 'h2', 'h3', 'h4', 'td']
+CONTAINER_TAGS = {'div', 'section', 'article', 'main', 'td', 'body', 'ul', 'ol', 'blockquote'}
+
+_UNLIKELY_RE = re.compile(
+    r'comment|sidebar|footer|footnote|menu|nav|share|social|related|promo|sponsor'
+    r'|advert|\bads?\b|cookie|consent|subscribe|newsletter|popup|modal|breadcrumb|masthead|banner',
+    re.IGNORECASE
+)
+_POSITIVE_RE = re.compile(r'article|body|content|entry|main|post|story|text|blog', re.IGNORECASE)
+_NEGATIVE_RE = re.compile(r'comment|meta|footer|sidebar|widget|related|share|tag|author|byline', re.IGNORECASE)
+_CJK_RE = re.compile(r'[぀-ヿ㐀-鿿豈-﫿가-힯]')
+_COMMA_RE = re.compile(r'[,，、]')
+_SPACE_RE = re.compile(r'[ \t\r\f\v]+')
+
+
+def estimate_tokens(text):
+    """Rough token count: one per CJK character, one per ~4 other characters."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _class_id(tag):
+    classes = tag.get('class') or []
+    if isinstance(classes, str):
+        classes = [classes]
+    return ' '.join(classes) + ' ' + (tag.get('id') or '')
+
+
+def _class_weight(tag):
+    names = _class_id(tag)
+    weight = 0
+    if _POSITIVE_RE.search(names):
+        weight += 25
+    if _NEGATIVE_RE.search(names):
+        weight -= 25
+    if tag.name in ('article', 'main'):
+        weight += 25
+    return weight
+
+
+def _text(tag):
+    return _SPACE_RE.sub(' ', tag.get_text(' ', strip=True))
+
+
+def _link_density(tag, text_length=None):
+    if text_length is None:
+        text_length = len(_text(tag))
+    if not text_length:
+        return 0.0
+    link_length = sum(len(a.get_text(strip=True)) for a in tag.find_all('a'))
+    return min(1.0, link_length / text_length)
+
+
+def _strip_clutter(soup):
+    for tag in soup(STRIP_TAGS):
+        tag.decompose()
+    # Drop boilerplate containers unless they also look like content
+    for tag in soup.find_all(['div', 'section', 'ul', 'span', 'p']):
+        if getattr(tag, 'decomposed', False):
+            continue  # inside a container removed earlier
+        names = _class_id(tag)
+        if names.strip() and _UNLIKELY_RE.search(names) and not _POSITIVE_RE.search(names):
+            tag.decompose()
+
+
+def _score_candidates(soup):
+    scores = {}
+    for block in soup.find_all(['p', 'pre', 'td', 'blockquote']):
+        text = _text(block)
+        if len(text) < MIN_BLOCK_CHARS:
+            continue
+        # CJK text has few spaces/commas: count length in characters either way
+        score = 1 + len(_COMMA_RE.findall(text)) + min(len(text) // 100, 3)
+        parent = block.parent
+        for share, ancestor in ((1.0, parent), (0.5, parent.parent if parent else None)):
+            if not isinstance(ancestor, Tag) or ancestor.name not in CONTAINER_TAGS:
+                continue
+            if id(ancestor) not in scores:
+                scores[id(ancestor)] = [ancestor, float(_class_weight(ancestor))]
+            scores[id(ancestor)][1] += score * share
+
+    candidates = []
+    for tag, score in scores.values():
+        candidates.append((score * (1 - _link_density(tag)), tag))
+    return candidates
+
+
+def _blocks(container):
+    """Readable blocks of a container in document order (no nested duplicates)."""
+    blocks = []
+    seen = set()
+    for block in container.find_all(BLOCK_TAGS):
+        seen.add(id(block))
+        # Skip blocks nested in another block (e.g. <p> inside <li>)
+        ancestor = block.parent
+        while ancestor is not None and ancestor is not container and id(ancestor) not in seen:
+            ancestor = ancestor.parent
+        if ancestor is not None and ancestor is not container:
+            continue
+        text = _text(block)
+        if not text:
+            continue
+        is_heading = block.name in ('h2', 'h3', 'h4')
+        if not is_heading and len(text) < MIN_BLOCK_CHARS:
+            continue
+        if _link_density(block, len(text)) > MAX_LINK_DENSITY:
+            continue
+        blocks.append(block)
+    return blocks
+
+
+def _take_budget(paragraphs, max_tokens):
+    """Lead paragraphs until the token budget is spent. Returns (text, truncated)."""
+    kept = []
+    used = 0
+    for paragraph in paragraphs:
+        tokens = estimate_tokens(paragraph)
+        if used + tokens > max_tokens:
+            if not kept:
+                # A single huge paragraph: cut it to the budget
+                ratio = max_tokens / max(tokens, 1)
+                kept.append(paragraph[:max(1, int(len(paragraph) * ratio))])
+            return '\n'.join(kept), True
+        kept.append(paragraph)
+        used += tokens
+    return '\n'.join(kept), False
+
+
+def _fallback_text(soup):
+    """Old heuristic: <article>, common content classes, else the whole page."""
+    article = soup.find('article')
+    if not article:
+        for cls in ['content', 'post-content', 'entry-content', 'article-body', 'story-body']:
+            article = soup.find(class_=cls)
+            if article:
+                break
+    return (article or soup).get_text(separator='\n', strip=True).split('\n')
+
+
+def extract_content(html_or_soup, max_tokens=DEFAULT_TOKEN_BUDGET, parser=None):
+    """
+    Extract the main article text, at most ~max_tokens tokens.
+    Accepts HTML or an already parsed soup (which is modified in place: read
+    metadata such as og:image before calling).
+    Returns a dict: text, truncated, method ('density' or 'fallback').
+    """
+    if isinstance(html_or_soup, BeautifulSoup):
+        soup = html_or_soup
+    else:
+        soup = make_soup(html_or_soup or "", parser)
+
+    _strip_clutter(soup)
+
+    candidates = _score_candidates(soup)
+    paragraphs = []
+    method = 'fallback'
+    if candidates:
+        best_score, best = max(candidates, key=lambda c: c[0])
+        # The best container is often one of several siblings holding the
+        # article (e.g. split by ads): widen to the parent if it scores well too
+        parent = best.parent
+        for score, tag in candidates:
+            if tag is parent and score >= best_score * 0.75:
+                best = parent
+                break
+        paragraphs = [_text(block) for block in _blocks(best)]
+        if paragraphs:
+            method = 'density'
+
+    if not paragraphs:
+        paragraphs = [line for line in _fallback_text(soup) if line.strip()]
+
+    text, truncated = _take_budget(paragraphs, max_tokens)
+    return {'text': text, 'truncated': truncated, 'method': method}
+
+
+def extract_text(html_or_soup, max_tokens=DEFAULT_TOKEN_BUDGET, parser=None):
+    """Shortcut for extract_content(...)['text']."""
+    return extract_content(html_or_soup, max_tokens, parser)['text']
@@ -0,0 +1,199 @@
+"""
+Persistent store of fetched article content.
+
+Holds, per canonical URL, the extracted article text, the OG image and the
+fetch status, so an article is downloaded and cleaned at most once per TTL
+no matter which step needs it (crawler date lookups, deep analysis,
+regenerating the briefing, debug scripts).
+
+Each entry is one compressed JSON file under cache/content/ (zstd when the
+`zstandard` package is installed, gzip otherwise). The file mtime is bumped
+on every hit and serves as the LRU clock; prune() evicts expired and least
+recently used entries beyond the entry-count and byte caps. Files are
+independent, so the crawler subprocess and the app can share the store.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from content_extractor import DEFAULT_TOKEN_BUDGET, extract_text
+from html_parsing import make_soup
+from json_cache import cache_path
+from page_metadata import find_image
+from url_utils import canonical_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STORE_DIR = cache_path('content')
+TTL_SECONDS = 24 * 3600          # successful fetches
+FAILURE_TTL_SECONDS = 3600       # failed fetches are retried sooner
+MAX_ENTRIES = 2000
+MAX_BYTES = 50 * 1024 * 1024
+PRUNE_EVERY = 50                 # puts between size checks
+MIN_CONTENT_CHARS = 500          # shorter extractions count as "no content"
+
+
+class ContentStore:
+    def __init__(self, directory=STORE_DIR, ttl=TTL_SECONDS, failure_ttl=FAILURE_TTL_SECONDS,
+                 max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ext = '.json.zst' if zstandard else '.json.gz'
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    # --- Encoding ---
+    def _compress(self, data):
+        if zstandard:
+            return zstandard.ZstdCompressor(level=6).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _decompress(self, path, data):
+        if path.endswith('.zst'):
+            if not zstandard:
+                return None
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _paths(self, url):
+        key = hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        # Preferred format first; the other one may exist from another install
+        return [base + self.ext] + [base + ext for ext in ('.json.zst', '.json.gz') if ext != self.ext]
+
+    # --- API ---
+    def get(self, url):
+        """Cached entry dict (text, image_url, status, ok, fetched_at) or None."""
+        for path in self._paths(url):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    raw = self._decompress(path, f.read())
+                if raw is None:
+                    continue
+                entry = json.loads(raw.decode('utf-8'))
+            except Exception as e:
+                print(f"Content store read error ({url}): {e}")
+                continue
+
+            if time.time() > entry.get('expires_at', 0):
+                self._remove(path)
+                continue
+            try:
+                os.utime(path)  # LRU: mark as recently used
+            except OSError:
+                pass
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, url, text, status, image_url=None, ok=None):
+        """Store a fetch result. `ok` defaults to "text is non-empty"."""
+        if ok is None:
+            ok = bool(text)
+        now = time.time()
+        entry = {
+            'url': url,
+            'text': text,
+            'image_url': image_url,
+            'status': status,
+            'ok': ok,
+            'fetched_at': now,
+            'expires_at': now + (self.ttl if ok else self.failure_ttl),
+        }
+        path = self._paths(url)[0]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(self._compress(json.dumps(entry, ensure_ascii=False).encode('utf-8')))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Content store write error ({url}): {e}")
+            return
+
+        self._puts += 1
+        if self._puts % PRUNE_EVERY == 0:
+            self.prune()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def prune(self):
+        """Evict entries idle longer than the TTL, then LRU beyond the caps."""
+        if not os.path.isdir(self.directory):
+            return 0
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(('.json.gz', '.json.zst')):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        removed = 0
+        # Not used within the TTL means it was written more than a TTL ago
+        fresh = []
+        for mtime, size, path in files:
+            if now - mtime > self.ttl:
+                self._remove(path)
+                removed += 1
+            else:
+                fresh.append((mtime, size, path))
+
+        fresh.sort(reverse=True)  # most recently used first
+        total = 0
+        for index, (mtime, size, path) in enumerate(fresh):
+            total += size
+            if index >= self.max_entries or total > self.max_bytes:
+                self._remove(path)
+                removed += 1
+        if removed:
+            print(f"Content store: evicted {removed} entries")
+        return removed
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'compression': 'zstd' if zstandard else 'gzip'}
+
+
+_store = None
+
+
+def get_store():
+    """Shared store for this process."""
+    global _store
+    if _store is None:
+        _store = ContentStore()
+    return _store
+
+
+def store_page(url, html_or_soup, status, max_tokens=DEFAULT_TOKEN_BUDGET):
+    """
+    Extract text and OG image from a page fetched for another purpose (e.g.
+    date lookup) and store it if it has real content. A parsed soup is
+    modified in place. Returns (text, image_url).
+    """
+    soup = html_or_soup if not isinstance(html_or_soup, str) else make_soup(html_or_soup)
+    image_url = find_image(soup, url)
+    text = extract_text(soup, max_tokens)
+    if len(text) > MIN_CONTENT_CHARS:
+        get_store().put(url, text, status, image_url)
+    return text, image_url
@@ -1,6 +1,13 @@
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from html_parsing import make_soup, source_parser, container_strainer
+from feed_parser import iter_feed_items
+import date_parser
+from date_parser import today_in_taipei
+from date_resolver import DateResolver, extract_date_from_html
+from content_store import store_page
+import google_news
+from watermark import Watermark
+import url_filter
 import os
 from dotenv import load_dotenv
 
@@ -11,10 +18,8 @@ import database
 import time
 import urllib3
 import json
-import re
 from playwright.sync_api import sync_playwright
 import sys
-import io
 try:
     from zoneinfo import ZoneInfo
 except ImportError:
@@ -23,15 +28,10 @@ except ImportError:
 # Timezone helper
 TAIPEI_TZ = ZoneInfo("Asia/Taipei")
 
-# Force UTF-8 encoding for stdout/stderr on Windows to prevent UnicodeEncodeError
-if sys.platform.startswith('win'):
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
-
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class NewsCrawler:
-    def __init__(self):
+    def __init__(self, use_watermarks=True, use_url_filter=True):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
@@ -39,6 +39,15 @@ class NewsCrawler:
         }
         self.db = database
         self.sources = self.load_sources()
+        # Concurrent, cached article date lookups (HTTP only)
+        self.date_resolver = DateResolver(self.headers)
+        # Google News links are stored as the publisher URL
+        self.google_news = google_news.get_resolver()
+        # Per-source incremental crawl (see watermark.py); set in crawl_source
+        self.use_watermarks = use_watermarks
+        self.watermark = None
+        # Bloom filter of stored URLs: "definitely new" links skip the DB lookup
+        self.url_filter = url_filter.load() if use_url_filter else None
         # Shared Playwright resources
         self._playwright = None
         self._browser = None
@@ -153,93 +162,12 @@ class NewsCrawler:
     # --- Date Normalization Helpers ---
     def _today(self):
         """Return today's date as YYYY-MM-DD in Taipei Time."""
-        return datetime.now(TAIPEI_TZ).strftime('%Y-%m-%d')
-
-    def _try_regex_extraction(self, date_str):
-        """Try to extract date using regex patterns."""
-        patterns = [
-            (r'(\d{4}-\d{1,2}-\d{1,2})', '%Y-%m-%d'),    # YYYY-MM-DD
-            (r'(\d{4}/\d{1,2}/\d{1,2})', '%Y/%m/%d'),    # YYYY/MM/DD
-            (r'(\d{1,2}/\d{1,2}/\d{4})', '%m/%d/%Y'),    # MM/DD/YYYY
-            (r'(\d{4})年(\d{1,2})月(\d{1,2})日', '%Y-%m-%d'),  # YYYY年MM月DD日
-        ]
-        for pattern, fmt in patterns:
-            match = re.search(pattern, date_str)
-            if match:
-                try:
-                    return datetime.strptime(match.group(1), fmt).strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-        return None
-
-    def _try_common_formats(self, date_str):
-        """Try common date formats."""
-        formats = [
-            '%Y-%m-%d',        # 2025-12-31
-            '%Y/%m/%d',        # 2025/12/31
-            '%m/%d/%Y',        # 12/31/2025
-            '%b %d, %Y',       # Dec 31, 2025
-            '%B %d, %Y',       # December 31, 2025
-        ]
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-        
-        # Handle "Thursday 18 Dec 2025" - remove weekday prefix
-        clean_date = re.sub(r'^[A-Za-z]+,?\s+', '', date_str)
-        for fmt in ['%d %b %Y', '%d %B %Y']:
-            try:
-                return datetime.strptime(clean_date, fmt).strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-        
-        # Handle "December 16" (assume current year)
-        try:
-            dt = datetime.strptime(date_str, '%B %d')
-            return dt.replace(year=datetime.now(TAIPEI_TZ).year).strftime('%Y-%m-%d')
-        except ValueError:
-            pass
-        
-        return None
-
-    def _try_relative_time(self, date_str):
-        """Handle relative time expressions like '2 hours ago' or '3天前'."""
-        try:
-            lower = date_str.lower()
-            if 'ago' in lower:
-                parts = lower.split()
-                num = int(parts[0])
-                unit = parts[1]
-                if 'hour' in unit or 'min' in unit:
-                    return self._today()
-                elif 'day' in unit:
-                    return (datetime.now(TAIPEI_TZ) - timedelta(days=num)).strftime('%Y-%m-%d')
-            
-            if '小時前' in date_str or '分鐘前' in date_str:
-                return self._today()
-            if '天前' in date_str:
-                num = int(date_str.replace('天前', '').strip())
-                return (datetime.now(TAIPEI_TZ) - timedelta(days=num)).strftime('%Y-%m-%d')
-        except Exception:
-            pass
-        return None
+        return today_in_taipei().strftime('%Y-%m-%d')
 
     def normalize_date(self, date_str):
-        """Parse various date formats and return YYYY-MM-DD."""
-        if not date_str:
-            return self._today()
-        
-        date_str = date_str.strip()
-        
-        # Try strategies in order
-        return (
-            self._try_regex_extraction(date_str) or
-            self._try_common_formats(date_str) or
-            self._try_relative_time(date_str) or
-            self._today()
-        )
+        """Parse various date formats and return YYYY-MM-DD (see date_parser)."""
+        # Anchor is taken per call so relative dates stay correct across midnight
+        return date_parser.normalize_date(date_str, today=today_in_taipei())
 
     def extract_text(self, element, selector):
         if not element or not selector:
@@ -314,6 +242,48 @@ class NewsCrawler:
             
         return ""
 
+    def _url_exists(self, link):
+        """url_exists; the DB is only asked when the URL filter says maybe."""
+        if self.url_filter is None:
+            return self.db.url_exists(link)
+        return self.url_filter.exists(link, self.db.url_exists)
+
+    def _known(self, link, published_at=None):
+        """_url_exists, answered from the source watermark when possible."""
+        if self.watermark is None:
+            return self._url_exists(link)
+        return self.watermark.known(link, self._url_exists, published_at)
+
+    def _stop_early(self):
+        """A run of known items on a newest-first listing: the rest is old."""
+        if self.watermark is not None and self.watermark.exhausted:
+            print(f"  -> {self.watermark.run} known items in a row, stopping early")
+            return True
+        return False
+
+    def _remember(self, link, published_at=None, stored=True):
+        """Record a link seen on the listing; stored: it was just inserted."""
+        if self.watermark is not None:
+            self.watermark.remember(link, published_at)
+        if stored and self.url_filter is not None:
+            self.url_filter.add(link)
+
+    def _add_news(self, title, link, source_name, category, published_at, summary, image_url, **extra):
+        """
+        db.add_news, then remember the link only if it is in the database now:
+        inserted, or already there (stored meanwhile by another crawler). A
+        failed write is looked up again next crawl instead of being skipped
+        as known. Returns True if it was inserted now (a new item).
+        """
+        added = self.db.add_news(title, link, source_name, category, published_at, summary, image_url, **extra)
+        if added or self.db.url_exists(link):
+            self._remember(link, published_at)
+            if extra.get('origin_url'):
+                self._remember(extra['origin_url'], stored=False)
+        else:
+            print(f"  -> Failed to add to DB: {title}")
+        return added
+
     def get_nested_value(self, data, path):
         """Helper to get value from nested dictionary using dot notation"""
         try:
@@ -361,7 +331,7 @@ class NewsCrawler:
                 
             if not isinstance(items, list):
                 print(f"Expected list of items, got {type(items)}")
-                return
+                return None
 
             print(f"Found {len(items)} items on {name}")
             
@@ -375,7 +345,9 @@ class NewsCrawler:
                     link = self.get_nested_value(item, mapping['link'])
                     if not link: continue
                     
-                    if self.db.url_exists(link):
+                    if self._known(link):
+                        if self._stop_early():
+                            break
                         continue
                         
                     raw_date = self.get_nested_value(item, mapping['date'])
@@ -383,22 +355,24 @@ class NewsCrawler:
                     
                     # Summary might be HTML, strip it
                     raw_summary = self.get_nested_value(item, mapping['summary'])
-                    summary = BeautifulSoup(raw_summary, 'html.parser').get_text(strip=True) if raw_summary else ""
+                    summary = make_soup(raw_summary, source_parser(source)).get_text(strip=True) if raw_summary else ""
                     
                     # Skip image extraction (not used in UI)
                     image_url = ""
                     
                     print(f"Adding: {title} ({category})")
-                    self.db.add_news(title, link, name, category, published_at, summary, image_url)
-                    count += 1
+                    if self._add_news(title, link, name, category, published_at, summary, image_url):
+                        count += 1
                     
                 except Exception as e:
                     print(f"Error parsing {name} item: {e}")
                     
             print(f"{name}: Added {count} new items.")
+            return count
             
         except Exception as e:
             print(f"Error crawling {name}: {e}")
+            return None
 
 
     def crawl_tldr_api(self, source):
@@ -422,7 +396,7 @@ class NewsCrawler:
             content = page.content()
             page.close()
                 
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = make_soup(content, source_parser(source))
             articles = soup.select('article.mt-3')
             print(f"Found {len(articles)} articles")
             
@@ -445,104 +419,83 @@ class NewsCrawler:
                         if "(" in title and "read)" in title:
                             title = title.rsplit("(", 1)[0].strip()
                         
-                        # Try to extract date from original URL
-                        published_at = self._try_extract_date_from_url(link)
+                        # Known articles don't need their date resolved again
+                        if self._known(link):
+                            if self._stop_early():
+                                break
+                            continue
                         
                         news_items.append({
                             'source': source['name'],
                             'title': title,
                             'url': link,
                             'summary': summary,
-                            'published_at': published_at
                         })
-                        print(f"Parsed item: {title} (Date: {published_at})")
                 except Exception as e:
                     print(f"Error parsing item: {e}")
                     continue
             
-            print(f"{name}: Added {len(news_items)} new items.")
+            # Resolve publication dates from the original URLs in one batch
+            dates = self._resolve_dates([item['url'] for item in news_items])
             for item in news_items:
-                 self.db.add_news(item['title'], item['url'], item['source'], 'Tech', item['published_at'], item['summary'], "")
+                item['published_at'] = dates[item['url']]
+                print(f"Parsed item: {item['title']} (Date: {item['published_at']})")
+            
+            news_items = [item for item in news_items
+                          if self._add_news(item['title'], item['url'], item['source'], 'Tech', item['published_at'], item['summary'], "")]
+            print(f"{name}: Added {len(news_items)} new items.")
                     
         except Exception as e:
             print(f"Error crawling TLDR: {e}")
+            return None
             
         return news_items
     
     def _extract_date_from_html(self, html, url=""):
-        """Extract date from HTML content using BeautifulSoup."""
+        """Extract date from HTML content (see date_resolver)."""
+        return extract_date_from_html(html, url)
+
+    def _extract_date_with_browser(self, url):
+        """Render the page with Playwright and extract its date (or None)."""
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # 1. Look for <time> tag
-            time_tag = soup.find('time')
-            if time_tag:
-                datetime_attr = time_tag.get('datetime')
-                if datetime_attr:
-                    return self.normalize_date(datetime_attr)
-                text = time_tag.get_text(strip=True)
-                if text:
-                    return self.normalize_date(text)
-            
-            # 2. Look for meta tags
-            meta_published = soup.find('meta', property='article:published_time')
-            if meta_published:
-                return self.normalize_date(meta_published.get('content'))
-            
-            meta_date = soup.find('meta', attrs={'name': 'date'})
-            if meta_date:
-                return self.normalize_date(meta_date.get('content'))
-            
-            # 3. Look for common date classes
-            date_selectors = [
-                '.published-date', '.post-date', '.entry-date', 
-                '.article-date', '[class*="date"]', '[class*="time"]'
-            ]
-            for selector in date_selectors:
-                date_elem = soup.select_one(selector)
-                if date_elem:
-                    date_text = date_elem.get_text(strip=True)
-                    if date_text:
-                        normalized = self.normalize_date(date_text)
-                        if normalized and normalized <= self._today():
-                            return normalized
+            html = self.fetch_with_browser(url)
+            if html:
+                soup = make_soup(html)
+                date = self._extract_date_from_html(soup, url)
+                store_page(url, soup, "Success (Playwright)")
+                return date
         except Exception as e:
-            print(f"Error parsing HTML for date ({url}): {e}")
+            print(f"    -> Playwright date extraction error: {e}")
         return None
 
+    def _resolve_dates(self, urls):
+        """
+        Resolve publication dates for article URLs.
+        Cached and HTTP lookups run concurrently in the date resolver; only the
+        URLs it can't resolve are rendered with Playwright, one at a time.
+        Falls back to today's date.
+        """
+        dates = self.date_resolver.resolve_many(urls)
+        for url in urls:
+            if dates.get(url):
+                continue
+            date = self._extract_date_with_browser(url)
+            if date:
+                self.date_resolver.remember(url, date, 'browser')
+                dates[url] = date
+            else:
+                print(f"    -> Could not extract date for {url}, using today.")
+                dates[url] = self._today()
+        self.date_resolver.save()
+        return dates
+
     def _try_extract_date_from_url(self, url):
         """
         Try to extract publication date from the original article URL.
-        Falls back to Playwright if requests fails.
+        Falls back to Playwright if plain HTTP can't find it.
         """
         print(f"  Extracting date from: {url}")
-        
-        # 1. Try fast requests first
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10, verify=False)
-            if response.status_code == 200:
-                date = self._extract_date_from_html(response.text, url)
-                if date and date != self._today():
-                    return date
-                print(f"    -> Requests returned no date or today's date. Trying Playwright...")
-            else:
-                print(f"    -> Requests failed ({response.status_code}). Trying Playwright...")
-        except Exception as e:
-            print(f"    -> Requests error: {e}. Trying Playwright...")
-
-        # 2. Fallback to Playwright
-        try:
-            html = self.fetch_with_browser(url)
-            if html:
-                date = self._extract_date_from_html(html, url)
-                if date:
-                    return date
-        except Exception as e:
-            print(f"    -> Playwright date extraction error: {e}")
-        
-        # Fallback to current date
-        print("    -> Could not extract date, using today.")
-        return self._today()
+        return self._resolve_dates([url])[url]
 
 
     def crawl_hackingai(self, source):
@@ -558,9 +511,10 @@ class NewsCrawler:
         
         if not html:
             print(f"Failed to fetch {name}")
-            return
+            return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        strainer = container_strainer('div.mb-3') if source.get('partial_parse', True) else None
+        soup = make_soup(html, source_parser(source), parse_only=strainer)
         
         # Select all post items (they are in .mb-3 containers)
         # Structure:
@@ -623,46 +577,149 @@ class NewsCrawler:
                     continue
                     
                 # Check if exists
-                if self.db.url_exists(source_url):
+                if self._known(source_url, published_at):
                     print(f"  -> Skipping existing URL: {source_url}")
+                    if self._stop_early():
+                        break
                     continue
                     
                 print(f"Adding (HackingAI): {title} ({source_name}) | Date: {published_at}")
                 # Add to DB with discussion_url
-                success = self.db.add_news(title, source_url, source_name, category, published_at, "", "", discussion_url=discussion_url)
-                if success:
+                if self._add_news(title, source_url, source_name, category, published_at, "", "", discussion_url=discussion_url):
                     count += 1
-                else:
-                    print(f"  -> Failed to add to DB: {title}")
                 
             except Exception as e:
                 print(f"Error parsing HackingAI item: {e}")
                 
         print(f"{name}: Added {count} new items.")
+        return count
+
+    def _looks_like_feed(self, url):
+        """Legacy heuristic for RSS sources configured as 'static'."""
+        lower = url.lower()
+        return 'rss' in lower or 'feed' in lower or 'xml' in lower
+
+    def crawl_feed(self, source):
+        """
+        Crawl an RSS/Atom feed with the streaming feed parser.
+        Items are parsed as the response streams in; Google News publisher
+        names come from each item's <source> element and links are resolved
+        to the publisher URL before they are stored.
+        """
+        name = source['name']
+        url = source['url']
+        category = source.get('category', 'Uncategorized')
+        
+        print(f"Crawling {name} (Feed)...")
+        
+        try:
+            response = requests.get(url, headers=self.headers, timeout=15, verify=False, stream=True)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Failed to fetch {name}: {repr(e)}")
+            return None
+        
+        found = 0
+        count = 0
+        entries = []
+        try:
+            for entry in iter_feed_items(response.iter_content(chunk_size=16384)):
+                found += 1
+                if not entry['title'] or not entry['link']:
+                    continue
+                # Also catches Google News links stored unresolved (and, via the
+                # watermark, ones stored under their resolved URL)
+                if self._known(entry['link'], self.normalize_date(entry['published'])):
+                    if self._stop_early():
+                        break
+                    continue
+                entries.append(entry)
+        except Exception as e:
+            print(f"Error reading feed {name}: {repr(e)}")
+        finally:
+            response.close()
+        
+        # Resolve Google News redirect links to the publisher URL (cached)
+        resolved = self.google_news.resolve_many([entry['link'] for entry in entries])
+        self.google_news.save()
+        
+        for entry in entries:
+            try:
+                title = entry['title']
+                link = entry['link']
+                origin_url = None
+                if resolved.get(link):
+                    origin_url, link = link, resolved[link]
+                    if self._url_exists(link):
+                        self._remember(origin_url, stored=False)
+                        continue
+                
+                published_at = self.normalize_date(entry['published'])
+                # Google News: real publisher from <source>, else the feed name
+                real_source_name = entry['source'] or name
+                
+                print(f"Adding: {title} ({real_source_name}) | Date: {published_at}")
+                if self._add_news(title, link, real_source_name, category, published_at, entry['summary'], "", origin_url=origin_url):
+                    count += 1
+            except Exception as e:
+                print(f"Error parsing {name} item: {repr(e)}")
+        
+        print(f"Found {found} items on {name}")
+        print(f"{name}: Added {count} new items.")
+        return count
+
+    def _select_containers(self, soup, container_selector):
+        """Return matches of the first container selector alternative that finds anything."""
+        for sel in container_selector.split(','):
+            sel = sel.strip()
+            found_items = soup.select(sel)
+            if found_items:
+                return found_items
+        return []
 
     def crawl_source(self, source):
+        """
+        Crawl one source. Returns the number of new items added, or None if
+        the source was skipped or could not be fetched/parsed.
+        """
+        if self.url_filter is not None:
+            # Pick up news stored by other hosts/processes since the last sync
+            self.url_filter.refresh()
+        if self.use_watermarks and not source.get('link_only'):
+            self.watermark = Watermark.load(source)
+        try:
+            return self._crawl_source(source)
+        finally:
+            if self.watermark is not None:
+                self.watermark.save()
+                self.watermark = None
+            if self.url_filter is not None:
+                self.url_filter.save()
+
+    def _crawl_source(self, source):
         name = source['name']
         method = source.get('type', 'static')
         
         # Skip link-only sources (blocked by WAF/Cloudflare)
         if source.get('link_only'):
             print(f"Skipping {name} (link-only)")
-            return
+            return None
         
         if method == 'json_api':
-            self.crawl_json_api(source)
-            return
+            return self.crawl_json_api(source)
 
         if method == 'tldr_api':
-            self.crawl_tldr_api(source)
-            return
+            news_items = self.crawl_tldr_api(source)
+            return None if news_items is None else len(news_items)
 
         if method == 'hackingai':
-            self.crawl_hackingai(source)
-            return
+            return self.crawl_hackingai(source)
 
         url = source['url']
         
+        if method == 'feed' or (method == 'static' and self._looks_like_feed(url)):
+            return self.crawl_feed(source)
+        
         print(f"Crawling {name}...")
         
         if method == 'dynamic':
@@ -676,12 +733,14 @@ class NewsCrawler:
             
         if not html:
             print(f"Failed to fetch {name}")
-            return
+            return None
 
-        # Detect RSS/XML
-        is_rss = 'rss' in url.lower() or 'feed' in url.lower() or 'xml' in url.lower()
-        parser = 'xml' if is_rss else 'html.parser'
-        soup = BeautifulSoup(html, parser)
+        # For plain CSS-selector sources only build the container subtrees
+        strainer = None
+        if not source.get('json_embedded') and source.get('partial_parse', True):
+            strainer = container_strainer(source.get('selectors', {}).get('container'))
+        
+        soup = make_soup(html, source_parser(source), parse_only=strainer)
         
         # Handle JSON Embedded
         if source.get('json_embedded'):
@@ -719,7 +778,7 @@ class NewsCrawler:
                     items = self.get_nested_value(data, source.get('json_path', ''))
                     if not isinstance(items, list):
                         print(f"Expected list of items in JSON, got {type(items)}")
-                        return
+                        return None
                     
                     print(f"Found {len(items)} items in embedded JSON for {name}")
                     mapping = source.get('json_mapping', {})
@@ -745,7 +804,9 @@ class NewsCrawler:
                                     else:
                                         link = base_url + '/' + link
 
-                            if self.db.url_exists(link):
+                            if self._known(link):
+                                if self._stop_early():
+                                    break
                                 continue
                             
                             raw_date = str(self.get_nested_value(item, mapping.get('date', '')) or "")
@@ -759,13 +820,13 @@ class NewsCrawler:
                             
                             category = source.get('category', 'Uncategorized')
                             print(f"Adding (JSON): {title} ({category})")
-                            self.db.add_news(title, link, name, category, published_at, summary, image_url)
-                            count += 1
+                            if self._add_news(title, link, name, category, published_at, summary, image_url):
+                                count += 1
                         except Exception as e:
                             print(f"Error parsing {name} JSON item: {e}")
                     
                     print(f"{name}: Added {count} new items.")
-                    return
+                    return count
                 except Exception as e:
                     print(f"Error extracting data from JSON for {name}: {e}")
 
@@ -773,16 +834,15 @@ class NewsCrawler:
         selectors = source.get('selectors', {})
         if not selectors or 'container' not in selectors:
             print(f"No selectors found for {name}")
-            return
+            return None
 
         # Handle multiple container selectors
-        items = []
-        for sel in selectors['container'].split(','):
-            sel = sel.strip()
-            found_items = soup.select(sel)
-            if found_items:
-                items = found_items
-                break
+        items = self._select_containers(soup, selectors['container'])
+        if not items and strainer is not None:
+            # Strainer and CSS engine disagree (unusual markup); retry on the full tree
+            print(f"Partial parse found no items for {name}, parsing full page...")
+            soup = make_soup(html, source_parser(source))
+            items = self._select_containers(soup, selectors['container'])
         
         print(f"Found {len(items)} items on {name}")
         
@@ -818,8 +878,10 @@ class NewsCrawler:
                         else:
                             link = base_url + '/' + link
 
-                if self.db.url_exists(link):
+                if self._known(link):
                     # print(f"  -> Skip: URL exists: {link}")
+                    if self._stop_early():
+                        break
                     continue
                 
                 # Extract Date
@@ -840,45 +902,21 @@ class NewsCrawler:
                 # Extract Summary
                 summary = self.extract_text(item, selectors['summary'])
                 
-                # Special handling for Google News source extraction
-                real_source_name = name
-                # 處理所有 Google News 變體 (AI, Gemini AI, ChatGPT, 人工智慧等)
-                if "Google News" in name or "google news" in name.lower():
-                    try:
-                        # For RSS, source is often in a specific tag or part of title/description
-                        # In Google News RSS, it's often at the end of the title: "Title - Source"
-                        if " - " in title:
-                            parts = title.rsplit(" - ", 1)
-                            if len(parts) > 1:
-                                real_source_name = parts[1].strip()
-                                title = parts[0].strip() # Clean title
-                        
-                        # Fallback to description font tag if title split fails or to be sure
-                        description_elem = item.select_one('description')
-                        if description_elem:
-                            desc_html = description_elem.get_text()
-                            desc_soup = BeautifulSoup(desc_html, 'html.parser')
-                            font_elem = desc_soup.find('font', color='#6f6f6f')
-                            if font_elem:
-                                real_source_name = font_elem.get_text(strip=True)
-                    except Exception as e:
-                        print(f"Error extracting Google News source: {e}")
-
-
                 # Skip image extraction (not used in UI)
                 image_url = ""
                 
                 # Get Category
                 category = source.get('category', 'Uncategorized')
                 
-                print(f"Adding: {title} ({real_source_name}) | Date: {published_at}")
-                self.db.add_news(title, link, real_source_name, category, published_at, summary, image_url)
-                count += 1
+                print(f"Adding: {title} ({name}) | Date: {published_at}")
+                if self._add_news(title, link, name, category, published_at, summary, image_url):
+                    count += 1
                 
             except Exception as e:
                 print(f"Error parsing {name} item: {repr(e)}")
         
         print(f"{name}: Added {count} new items.")
+        return count
 
     def run(self):
         database.init_db()
@@ -893,14 +931,23 @@ class NewsCrawler:
         finally:
             self.close()  # Ensure Playwright resources are cleaned up
         
+        if self.url_filter is not None:
+            print(f"URL filter: {self.url_filter.stats}")
         print("Crawl finished.")
 
 if __name__ == "__main__":
     import sys
     import traceback
-    
+
+    # Force UTF-8 output on Windows to prevent UnicodeEncodeError. Only when run
+    # as a script: the app and jobs import this module with their own streams.
+    for stream in (sys.stdout, sys.stderr):
+        if sys.platform.startswith('win') and hasattr(stream, 'reconfigure'):
+            stream.reconfigure(encoding='utf-8', errors='replace')
+
     try:
-        crawler = NewsCrawler()
+        # --full: ignore the per-source watermarks and walk every listing
+        crawler = NewsCrawler(use_watermarks='--full' not in sys.argv)
         crawler.run()
     except Exception as e:
         print(f"CRITICAL CRAWLER ERROR: {e}", file=sys.stderr)
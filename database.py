@@ -1,13 +1,28 @@
 import sqlite3
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Check environment variable to decide which DB to use
 # Default to SQLite if not set
 USE_FIRESTORE = os.environ.get('USE_FIRESTORE', 'False').lower() == 'true'
 FIRESTORE_IMPORT_ERROR = None
 
+# Callbacks run with (date, briefing) after a briefing is saved (e.g. UI cache
+# invalidation, static publishing)
+_briefing_listeners = []
+
+def add_briefing_listener(callback):
+    if callback not in _briefing_listeners:
+        _briefing_listeners.append(callback)
+
+def _notify_briefing_saved(date_str, data_dict):
+    for callback in list(_briefing_listeners):
+        try:
+            callback(date_str, data_dict)
+        except Exception as e:
+            print(f"Briefing listener error: {e}")
+
 if USE_FIRESTORE:
     try:
         import database_firestore as backend
@@ -74,6 +89,20 @@ if not USE_FIRESTORE:
         if 'discussion_url' not in columns:
             print("Migrating database: adding discussion_url column")
             c.execute("ALTER TABLE news ADD COLUMN discussion_url TEXT")
+
+        # Link as found in the feed when `url` was resolved from it (e.g. Google News)
+        if 'origin_url' not in columns:
+            print("Migrating database: adding origin_url column")
+            c.execute("ALTER TABLE news ADD COLUMN origin_url TEXT")
+
+        # Per-source crawl scheduling state (JSON blob, see scheduler.py)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS source_state (
+                name TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
             
         conn.commit()
         conn.close()
@@ -90,7 +119,7 @@ if not USE_FIRESTORE:
         conn.close()
         return exists
 
-    def add_news(title, url, source, category, published_at, summary, image_url, ai_rundown=None, ai_details=None, ai_impact=None, discussion_url=None):
+    def add_news(title, url, source, category, published_at, summary, image_url, ai_rundown=None, ai_details=None, ai_impact=None, discussion_url=None, origin_url=None):
         # Ensure DB exists
         if not os.path.exists(DB_NAME):
             init_db()
@@ -99,9 +128,9 @@ if not USE_FIRESTORE:
         c = conn.cursor()
         try:
             c.execute('''
-                INSERT INTO news (title, url, source, category, published_at, summary, image_url, ai_rundown, ai_details, ai_impact, discussion_url)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (title, url, source, category, published_at, summary, image_url, ai_rundown, ai_details, ai_impact, discussion_url))
+                INSERT INTO news (title, url, source, category, published_at, summary, image_url, ai_rundown, ai_details, ai_impact, discussion_url, origin_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, url, source, category, published_at, summary, image_url, ai_rundown, ai_details, ai_impact, discussion_url, origin_url))
             conn.commit()
             return True
         except sqlite3.IntegrityError:
@@ -143,6 +172,46 @@ if not USE_FIRESTORE:
         conn.close()
         return rows
 
+    def iter_news_urls(since=None):
+        """
+        Every stored news URL, or those stored at/after `since` (unix time),
+        e.g. to build or catch up the crawler's URL filter.
+        """
+        if not os.path.exists(DB_NAME):
+            init_db()
+            
+        conn = get_connection()
+        try:
+            if since is None:
+                rows = conn.execute('SELECT url FROM news')
+            else:
+                # created_at is CURRENT_TIMESTAMP: UTC
+                since_str = datetime.fromtimestamp(since, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                rows = conn.execute('SELECT url FROM news WHERE created_at >= ?', (since_str,))
+            for row in rows:
+                yield row['url']
+        finally:
+            conn.close()
+
+    def get_url_filter_blob():
+        # The filter file next to news.db is already shared by local processes
+        return None
+
+    def save_url_filter_blob(data):
+        return False
+
+    def get_news_since(since, limit=500):
+        """News published at/after `since` (ISO date or datetime string), newest first."""
+        if not os.path.exists(DB_NAME):
+            init_db()
+            
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute('SELECT * FROM news WHERE published_at >= ? ORDER BY published_at DESC, created_at DESC LIMIT ?', (since, limit))
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
     def get_today_news_count():
         """Count news items published today"""
         # Ensure DB exists
@@ -203,6 +272,7 @@ if not USE_FIRESTORE:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(data_dict, f, ensure_ascii=False, indent=2)
             print(f"Briefing saved to local file: {filename}")
+            _notify_briefing_saved(date_str, data_dict)
             return True
         except Exception as e:
             print(f"Error saving local briefing: {e}")
@@ -235,6 +305,54 @@ if not USE_FIRESTORE:
         dates.sort(reverse=True)
         return dates
 
+    # --- Source State (crawl scheduling) ---
+    def get_source_states():
+        """{source name: state dict} for every source with saved state."""
+        if not os.path.exists(DB_NAME):
+            init_db()
+        conn = get_connection()
+        try:
+            rows = conn.execute("SELECT name, state FROM source_state").fetchall()
+        finally:
+            conn.close()
+        states = {}
+        for row in rows:
+            try:
+                states[row['name']] = json.loads(row['state'])
+            except ValueError:
+                continue
+        return states
+
+    def get_source_state(name):
+        if not os.path.exists(DB_NAME):
+            init_db()
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT state FROM source_state WHERE name = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+        try:
+            return json.loads(row['state']) if row else {}
+        except ValueError:
+            return {}
+
+    def save_source_state(name, state):
+        if not os.path.exists(DB_NAME):
+            init_db()
+        conn = get_connection()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO source_state (name, state, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+                (name, json.dumps(state, ensure_ascii=False))
+            )
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving source state for {name}: {e}")
+            return False
+        finally:
+            conn.close()
+
 else:
     # Proxy calls to the firestore backend
     def init_db():
@@ -243,14 +361,26 @@ else:
     def url_exists(url):
         return backend.url_exists(url)
 
-    def add_news(title, url, source, category, published_at, summary, image_url, ai_rundown=None, ai_details=None, ai_impact=None, discussion_url=None):
-        return backend.add_news(title, url, source, category, published_at, summary, image_url, ai_rundown, ai_details, ai_impact, discussion_url)
+    def add_news(title, url, source, category, published_at, summary, image_url, ai_rundown=None, ai_details=None, ai_impact=None, discussion_url=None, origin_url=None):
+        return backend.add_news(title, url, source, category, published_at, summary, image_url, ai_rundown, ai_details, ai_impact, discussion_url, origin_url)
 
     def cleanup_old_news(days=30):
         return backend.cleanup_old_news(days)
 
     def get_all_news():
         return backend.get_all_news()
+
+    def iter_news_urls(since=None):
+        return backend.iter_news_urls(since)
+
+    def get_url_filter_blob():
+        return backend.get_url_filter_blob()
+
+    def save_url_filter_blob(data):
+        return backend.save_url_filter_blob(data)
+
+    def get_news_since(since, limit=500):
+        return backend.get_news_since(since, limit)
         
     def get_today_news_count():
         return backend.get_today_news_count()
@@ -262,10 +392,22 @@ else:
         return backend.update_news_image(url, image_url)
         
     def save_briefing(date_str, data_dict):
-        return backend.save_briefing(date_str, data_dict)
+        saved = backend.save_briefing(date_str, data_dict)
+        if saved:
+            _notify_briefing_saved(date_str, data_dict)
+        return saved
         
     def get_briefing(date_str):
         return backend.get_briefing(date_str)
 
     def list_briefings():
         return backend.list_briefings()
+
+    def get_source_states():
+        return backend.get_source_states()
+
+    def get_source_state(name):
+        return backend.get_source_state(name)
+
+    def save_source_state(name, state):
+        return backend.save_source_state(name, state)
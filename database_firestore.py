@@ -1,7 +1,9 @@
 import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import firestore
-from datetime import datetime
+from google.api_core.exceptions import AlreadyExists
+from datetime import datetime, timezone
+import hashlib
 import os
 import json
 
@@ -60,7 +62,11 @@ def url_exists(url):
         print(f"Error checking url in Firestore: {e}")
         return False
 
-def add_news(title, url, source, category, published_at, summary, image_url, ai_rundown=None, ai_details=None, ai_impact=None, discussion_url=None):
+def _news_id(url):
+    # Stable per URL (document IDs can't contain '/'); older documents keep their auto IDs
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+def add_news(title, url, source, category, published_at, summary, image_url, ai_rundown=None, ai_details=None, ai_impact=None, discussion_url=None, origin_url=None):
     db = get_db()
     if not db: return False
     
@@ -77,11 +83,15 @@ def add_news(title, url, source, category, published_at, summary, image_url, ai_
             'ai_rundown': ai_rundown,
             'ai_details': ai_details,
             'ai_impact': ai_impact,
-            'discussion_url': discussion_url
+            'discussion_url': discussion_url,
+            'origin_url': origin_url
         }
-        # Add a new document with auto-generated ID
-        db.collection('news').add(data)
+        # One document per URL: create() fails if another crawler (instance,
+        # scheduler, app job) stored it first, so concurrent inserts can't duplicate
+        db.collection('news').document(_news_id(url)).create(data)
         return True
+    except AlreadyExists:
+        return False
     except Exception as e:
         print(f"Error adding news to Firestore: {e}")
         return False
@@ -133,6 +143,63 @@ def get_all_news():
         print(f"Error fetching news from Firestore: {e}")
         return []
 
+def iter_news_urls(since=None):
+    """Every stored news URL, or those created at/after `since` (unix time);
+    only the url field is fetched. Raises on errors: a partial list would
+    make the crawler's URL filter miss stored URLs."""
+    db = get_db()
+    if not db:
+        raise RuntimeError("Firestore not available")
+    
+    query = db.collection('news')
+    if since is not None:
+        query = query.where('created_at', '>=', datetime.fromtimestamp(since, timezone.utc))
+    for doc in query.select(['url']).stream():
+        url = (doc.to_dict() or {}).get('url')
+        if url:
+            yield url
+
+def get_url_filter_blob():
+    """The crawler's shared URL filter (see url_filter.py), or None."""
+    db = get_db()
+    if not db: return None
+    
+    try:
+        doc = db.collection('meta').document('url_filter').get()
+        if doc.exists:
+            return (doc.to_dict() or {}).get('data')
+        return None
+    except Exception as e:
+        print(f"Error fetching URL filter from Firestore: {e}")
+        return None
+
+def save_url_filter_blob(data):
+    db = get_db()
+    if not db: return False
+    
+    try:
+        db.collection('meta').document('url_filter').set({'data': data, 'updated_at': datetime.now()})
+        return True
+    except Exception as e:
+        print(f"Error saving URL filter to Firestore: {e}")
+        return False
+
+def get_news_since(since, limit=500):
+    """News published at/after `since` (ISO date or datetime string), newest first."""
+    db = get_db()
+    if not db: return []
+    
+    try:
+        docs = (db.collection('news')
+                .where('published_at', '>=', since)
+                .order_by('published_at', direction=firestore.Query.DESCENDING)
+                .limit(limit)
+                .stream())
+        return [doc.to_dict() for doc in docs]
+    except Exception as e:
+        print(f"Error fetching news since {since} from Firestore: {e}")
+        return []
+
 def get_today_news_count():
     db = get_db()
     if not db: return 0
@@ -269,3 +336,51 @@ def list_briefings():
         print(f"Error listing briefings from Firestore: {e}")
         return []
 
+# --- Source State (crawl scheduling) ---
+
+def _source_state_id(name):
+    # Document IDs can't contain '/'
+    return name.replace('/', '_')
+
+def get_source_states():
+    """{source name: state dict} for every source with saved state."""
+    db = get_db()
+    if not db: return {}
+    
+    try:
+        states = {}
+        for doc in db.collection('source_state').stream():
+            data = doc.to_dict() or {}
+            states[data.get('name', doc.id)] = data.get('state') or {}
+        return states
+    except Exception as e:
+        print(f"Error fetching source states from Firestore: {e}")
+        return {}
+
+def get_source_state(name):
+    db = get_db()
+    if not db: return {}
+    
+    try:
+        doc = db.collection('source_state').document(_source_state_id(name)).get()
+        if doc.exists:
+            return (doc.to_dict() or {}).get('state') or {}
+        return {}
+    except Exception as e:
+        print(f"Error fetching source state for {name} from Firestore: {e}")
+        return {}
+
+def save_source_state(name, state):
+    db = get_db()
+    if not db: return False
+    
+    try:
+        db.collection('source_state').document(_source_state_id(name)).set({
+            'name': name,
+            'state': state,
+            'updated_at': datetime.now()
+        })
+        return True
+    except Exception as e:
+        print(f"Error saving source state for {name} to Firestore: {e}")
+        return False
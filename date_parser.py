@@ -0,0 +1,216 @@
+"""
+Date normalization for crawled items.
+
+normalize_date() turns the many date strings found on listing pages, feeds
+and article metadata into 'YYYY-MM-DD'. Patterns are compiled once, common
+shapes (ISO 8601, RFC-822 feed pubDate, CJK 年月日) are sniffed before the
+slower strptime fallbacks, and parse results are memoized per raw string.
+
+Relative expressions ("3 days ago", "3天前") and year-less dates are cached
+in relative form and resolved against the `today` anchor passed by the
+caller, so cached results stay correct across midnight.
+"""
+import re
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+TAIPEI_TZ = ZoneInfo("Asia/Taipei")
+
+# --- Fast paths ---
+_ISO_RE = re.compile(
+    r'^(\d{4})-(\d{1,2})-(\d{1,2})'
+    r'(?:[T ](\d{1,2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?\s*(Z|[+-]\d{2}:?\d{2})?)?'
+)
+_RFC822_RE = re.compile(r'^(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{2,4}\s+\d{1,2}:\d{2}')
+_CJK_RE = re.compile(r'(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日')
+
+# --- Dates embedded anywhere in the string ---
+_EMBEDDED_PATTERNS = [
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), ('y', 'm', 'd')),   # YYYY-MM-DD
+    (re.compile(r'(\d{4})/(\d{1,2})/(\d{1,2})'), ('y', 'm', 'd')),   # YYYY/MM/DD
+    (re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), ('m', 'd', 'y')),   # MM/DD/YYYY
+]
+
+# --- Whole-string formats ---
+_TEXT_FORMATS = [
+    '%b %d, %Y',       # Dec 31, 2025
+    '%B %d, %Y',       # December 31, 2025
+]
+_WEEKDAY_PREFIX_RE = re.compile(r'^[A-Za-z]+,?\s+')
+_DAY_FIRST_FORMATS = ['%d %b %Y', '%d %B %Y']  # Thursday 18 Dec 2025
+
+# --- Relative time ---
+_RELATIVE_EN_RE = re.compile(r'^(\d+)\s*(second|sec|minute|min|hour|hr|day|week)s?\b.*\bago\b', re.IGNORECASE)
+_RELATIVE_CJK_RE = re.compile(r'(\d+)\s*(秒|分鐘|小時|天|週)前')
+_RECENT_CJK = ('剛剛', '小時前', '分鐘前')
+_UNIT_DAYS = {
+    'second': 0, 'sec': 0, 'minute': 0, 'min': 0, 'hour': 0, 'hr': 0,
+    'day': 1, 'week': 7,
+    '秒': 0, '分鐘': 0, '小時': 0, '天': 1, '週': 7,
+}
+
+
+def today_in_taipei():
+    """Today's date in Taipei Time (the default anchor)."""
+    return datetime.now(TAIPEI_TZ).date()
+
+
+def _ymd(year, month, day):
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _aware_to_taipei(dt):
+    if dt.tzinfo is None:
+        return dt.date()
+    return dt.astimezone(TAIPEI_TZ).date()
+
+
+def _parse_iso(raw):
+    match = _ISO_RE.match(raw)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, tz = match.groups()
+    if hour is None or tz is None:
+        # Naive timestamp: take the date as written
+        return _ymd(year, month, day)
+    try:
+        iso = f"{int(year):04d}-{int(month):02d}-{int(day):02d}T{int(hour):02d}:{minute}:{second or '00'}"
+        tz = '+00:00' if tz == 'Z' else (tz if ':' in tz else f"{tz[:3]}:{tz[3:]}")
+        return _aware_to_taipei(datetime.fromisoformat(iso + tz))
+    except ValueError:
+        return _ymd(year, month, day)
+
+
+def _parse_rfc822(raw):
+    if not _RFC822_RE.match(raw):
+        return None
+    try:
+        return _aware_to_taipei(parsedate_to_datetime(raw))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _parse_cjk(raw):
+    match = _CJK_RE.search(raw)
+    return _ymd(*match.groups()) if match else None
+
+
+def _parse_embedded(raw):
+    for pattern, order in _EMBEDDED_PATTERNS:
+        match = pattern.search(raw)
+        if match:
+            parts = dict(zip(order, match.groups()))
+            parsed = _ymd(parts['y'], parts['m'], parts['d'])
+            if parsed:
+                return parsed
+    return None
+
+
+def _parse_text(raw):
+    for fmt in _TEXT_FORMATS:
+        try:
+            return datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+
+    clean = _WEEKDAY_PREFIX_RE.sub('', raw)
+    for fmt in _DAY_FIRST_FORMATS:
+        try:
+            return datetime.strptime(clean, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse(raw):
+    """
+    Parse a stripped raw string. Returns one of:
+      ('date', date)            absolute date
+      ('offset', days)          N days before the anchor
+      ('monthday', month, day)  date in the anchor's year
+      None                      unparseable
+    """
+    # 1. Format sniffing fast paths
+    if raw[:1].isdigit():
+        parsed = _parse_iso(raw)
+        if parsed:
+            return ('date', parsed)
+    parsed = _parse_rfc822(raw) or _parse_cjk(raw)
+    if parsed:
+        return ('date', parsed)
+
+    # 2. Dates embedded in other text
+    parsed = _parse_embedded(raw) or _parse_text(raw)
+    if parsed:
+        return ('date', parsed)
+
+    # 3. "December 16" (year of the anchor)
+    try:
+        dt = datetime.strptime(raw, '%B %d')
+        return ('monthday', dt.month, dt.day)
+    except ValueError:
+        pass
+
+    # 4. Relative time
+    match = _RELATIVE_EN_RE.match(raw) or _RELATIVE_CJK_RE.search(raw)
+    if match:
+        num, unit = match.groups()
+        return ('offset', int(num) * _UNIT_DAYS[unit.lower()])
+    if any(marker in raw for marker in _RECENT_CJK):
+        return ('offset', 0)
+
+    return None
+
+
+def parse_date(date_str, today=None):
+    """Parse a date string into a date, or None if it can't be parsed."""
+    if not date_str:
+        return None
+    raw = str(date_str).strip()
+    if not raw:
+        return None
+
+    result = _parse(raw)
+    if result is None:
+        return None
+
+    kind = result[0]
+    if kind == 'date':
+        return result[1]
+
+    if today is None:
+        today = today_in_taipei()
+    elif isinstance(today, datetime):
+        today = today.date()
+
+    if kind == 'offset':
+        return today - timedelta(days=result[1])
+    return _ymd(today.year, result[1], result[2])
+
+
+def normalize_date(date_str, today=None):
+    """
+    Parse various date formats and return YYYY-MM-DD.
+    Falls back to `today` (default: today in Taipei Time) if parsing fails.
+    """
+    if today is None:
+        today = today_in_taipei()
+    elif isinstance(today, datetime):
+        today = today.date()
+
+    parsed = parse_date(date_str, today)
+    return (parsed or today).strftime('%Y-%m-%d')
+
+
+def cache_info():
+    """Memoization statistics of the raw-string parser."""
+    return _parse.cache_info()
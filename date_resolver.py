@@ -0,0 +1,171 @@
+"""
+Publication-date resolution for article URLs.
+
+Used for sources that link to arbitrary third-party articles (TLDR) where the
+listing page carries no date. For each URL, cheapest first:
+
+  1. persistent per-URL cache (cache/article_dates.json)
+  2. head-only fetch (page_metadata), looking at <meta article:published_time>,
+     JSON-LD datePublished, ...
+  3. full GET and the heuristic HTML extraction (the page's extracted
+     content goes into the content store, so it isn't downloaded again)
+
+Steps 2-3 run concurrently for a batch of URLs on a bounded thread pool.
+URLs still unresolved are returned as None so the caller can fall back to a
+browser render; that stays on the caller's thread because Playwright's sync
+API is not thread-safe.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from content_store import store_page
+from date_parser import normalize_date, parse_date, today_in_taipei
+from html_parsing import make_soup
+from jobs import inherit_output
+from json_cache import JsonCache, cache_path
+from page_metadata import HEAD_BUDGET, fetch_head, parse_metadata
+
+MAX_WORKERS = 8
+CACHE_MAX_AGE_DAYS = 30  # matches the news retention window
+
+# Heuristic selectors for pages without metadata
+DATE_SELECTORS = [
+    '.published-date', '.post-date', '.entry-date',
+    '.article-date', '[class*="date"]', '[class*="time"]'
+]
+
+
+def _today():
+    return today_in_taipei().strftime('%Y-%m-%d')
+
+
+def extract_date_from_html(html, url=""):
+    """
+    Extract a date from a full HTML page (<time>, meta tags, date classes).
+    Accepts markup or an already parsed soup.
+    """
+    try:
+        soup = make_soup(html) if isinstance(html, str) else html
+
+        # 1. Look for <time> tag
+        time_tag = soup.find('time')
+        if time_tag:
+            datetime_attr = time_tag.get('datetime')
+            if datetime_attr:
+                return normalize_date(datetime_attr)
+            text = time_tag.get_text(strip=True)
+            if text:
+                return normalize_date(text)
+
+        # 2. Look for meta tags
+        meta_published = soup.find('meta', property='article:published_time')
+        if meta_published:
+            return normalize_date(meta_published.get('content'))
+
+        meta_date = soup.find('meta', attrs={'name': 'date'})
+        if meta_date:
+            return normalize_date(meta_date.get('content'))
+
+        # 3. Look for common date classes
+        today = _today()
+        for selector in DATE_SELECTORS:
+            date_elem = soup.select_one(selector)
+            if date_elem:
+                date_text = date_elem.get_text(strip=True)
+                if date_text:
+                    normalized = normalize_date(date_text)
+                    if normalized and normalized <= today:
+                        return normalized
+    except Exception as e:
+        print(f"Error parsing HTML for date ({url}): {e}")
+    return None
+
+
+class DateResolver:
+    def __init__(self, headers, max_workers=MAX_WORKERS, head_budget=HEAD_BUDGET, cache=None):
+        self.headers = headers
+        self.max_workers = max_workers
+        self.head_budget = head_budget
+        self.cache = cache or JsonCache(cache_path('article_dates.json'), max_age_days=CACHE_MAX_AGE_DAYS)
+        self._local = threading.local()
+
+    def _session(self):
+        # requests.Session is not guaranteed thread-safe: one per worker
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def fetch_full(self, url):
+        response = self._session().get(url, headers=self.headers, timeout=10, verify=False)
+        if response.status_code != 200:
+            print(f"    -> Requests failed ({response.status_code}) for {url}")
+            return None
+        return response.text
+
+    def resolve_http(self, url):
+        """
+        Resolve a date over plain HTTP. Returns (date, method) or (None, None).
+        A heuristic result equal to today is treated as unresolved (it is
+        usually a clock widget, not the article date).
+        """
+        html = None
+        try:
+            head, complete = fetch_head(url, self.headers, session=self._session(), max_bytes=self.head_budget)
+            if head:
+                # parse_date, not normalize_date: an unparseable value must not
+                # become today's date (and be cached as a 'meta' result)
+                published = parse_date(parse_metadata(head)['published_time'])
+                if published:
+                    return published.strftime('%Y-%m-%d'), 'meta'
+                if complete:
+                    html = head  # small page: no need to download it again
+        except Exception as e:
+            print(f"    -> Head fetch error for {url}: {e}")
+
+        try:
+            if html is None:
+                html = self.fetch_full(url)
+            if html:
+                soup = make_soup(html)
+                date = extract_date_from_html(soup, url)
+                # The body is here anyway: keep its content for deep analysis
+                store_page(url, soup, "Success (Requests)")
+                if date and date != _today():
+                    return date, 'html'
+        except Exception as e:
+            print(f"    -> Requests error for {url}: {e}")
+        return None, None
+
+    def remember(self, url, date, method):
+        self.cache.set(url, {'date': date, 'method': method})
+
+    def resolve_many(self, urls):
+        """
+        Resolve dates for a batch of URLs. Returns {url: 'YYYY-MM-DD' or None};
+        None means HTTP could not determine the date. Call save() afterwards
+        to persist new results.
+        """
+        results = {}
+        pending = []
+        for url in dict.fromkeys(urls):
+            cached = self.cache.get(url)
+            if cached:
+                results[url] = cached['date']
+            else:
+                pending.append(url)
+
+        if pending:
+            print(f"  Resolving dates: {len(results)} cached, {len(pending)} to fetch ({self.max_workers} workers)")
+            with ThreadPoolExecutor(max_workers=self.max_workers, initializer=inherit_output()) as pool:
+                for url, (date, method) in zip(pending, pool.map(self.resolve_http, pending)):
+                    results[url] = date
+                    if date:
+                        self.remember(url, date, method)
+        return results
+
+    def save(self):
+        self.cache.save()
@@ -6,9 +6,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import database
+from selection import QuotaSelector
+from page_metadata import fetch_metadata, find_image
+import google_news
+import reddit_fetcher
+import content_store
+from prefetch import Prefetcher
+from content_extractor import estimate_tokens, extract_text
+from html_parsing import make_soup
 import requests
-from bs4 import BeautifulSoup
-import google.generativeai as genai
+import llm_client
+import publisher  # registers static publishing of saved briefings
+from llm_client import get_api_key
 from datetime import datetime, timedelta
 import time
 import random
@@ -49,20 +58,12 @@ def log_debug(msg):
 
 # Configuration
 CACHE_FILE = 'top10_cache.json'
-
-def get_api_key():
-    """Dynamically load API Key from env or .env file"""
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key and os.path.exists('.env'):
-        try:
-            with open('.env', 'r') as f:
-                for line in f:
-                    if line.startswith('GOOGLE_API_KEY='):
-                        api_key = line.strip().split('=')[1]
-                        break
-        except:
-            pass
-    return api_key
+# Article text sent to the analyzer: lead paragraphs up to this many tokens
+CONTENT_TOKEN_BUDGET = 800
+# Fetch status when plain HTTP wasn't enough and the browser wasn't allowed
+BROWSER_NEEDED = "Needs browser"
+# Top candidates fetched speculatively while the AI editor is deciding
+PREFETCH_COUNT = 12
 
 # Browser headers
 HEADERS = {
@@ -198,82 +199,86 @@ def resolve_original_source(item):
     return item['source']
 
 
-def fetch_article_content(url, source, discussion_url=None):
+def fetch_article_content(url, source, discussion_url=None, allow_browser=True, browser_only=False):
     """
     Fetches the full content of an article and its OG image.
+    With allow_browser=False (e.g. on prefetch threads) pages that need
+    Playwright return BROWSER_NEEDED instead; browser_only=True then
+    finishes such a page without repeating the HTTP attempts.
     Returns: (text_content, status_message, image_url)
     """
     print(f"Fetching content for: {url}")
     log_debug(f"Fetching content for: {url} (Source: {source})")
-    image_url = None
 
     # --- Reddit First Strategy for HackingAI ---
-    if discussion_url and 'hackingai' in source.lower():
+    if discussion_url and 'hackingai' in source.lower() and not browser_only:
         log_debug(f"HackingAI item detected. Trying Reddit first: {discussion_url}")
         try:
-            from crawler import NewsCrawler
-            crawler = NewsCrawler()
-            # Use specific selector for Reddit post content
-            html = crawler.fetch_with_browser(discussion_url, wait_selector='shreddit-post')
-            crawler.close()
-            
-            if html:
-                soup = BeautifulSoup(html, 'html.parser')
-                # Try to find the main post content
-                # Reddit's structure varies, but often in shreddit-post or div with specific classes
-                content_div = soup.select_one('shreddit-post')
-                if content_div:
-                     # Extract text from the post content
-                     text = content_div.get_text(strip=True)
-                     if len(text) > 100:
-                         log_debug(f"Successfully fetched Reddit content ({len(text)} chars)")
-                         return f"[Reddit Discussion Content]\n{text}", "Success (Reddit)", None
-                
-                # Fallback to general text extraction if specific selector fails
-                text = soup.get_text(strip=True)
-                if len(text) > 500:
-                     return f"[Reddit Page Content]\n{text[:5000]}", "Success (Reddit General)", None
+            # .json API over a pooled session, old.reddit HTML as fallback (cached per thread)
+            thread = reddit_fetcher.fetch_thread(discussion_url)
+            if thread:
+                text = reddit_fetcher.thread_text(thread)
+                if len(text) > 100:
+                    log_debug(f"Successfully fetched Reddit content via {thread['via']} ({len(text)} chars)")
+                    return f"[Reddit Discussion Content]\n{text}", f"Success (Reddit {thread['via']})", None
                      
             log_debug("Reddit fetch failed or content too short. Falling back to original URL.")
         except Exception as e:
             log_debug(f"Error fetching Reddit content: {e}")
 
+    # --- Google News links (rows crawled before links were resolved at crawl time) ---
+    if google_news.is_google_news_url(url):
+        resolved = google_news.resolve_url(url)
+        if not resolved:
+            return None, "Google News redirect failed", None
+        log_debug(f"Resolved Google News link: {resolved}")
+        url = resolved
+
+    # --- Content store: each article is downloaded and cleaned at most once per TTL ---
+    store = content_store.get_store()
+    cached = store.get(url)
+    if cached:
+        log_debug(f"Content store hit: {cached['status']}")
+        return (cached['text'] if cached['ok'] else None), f"{cached['status']} (cached)", cached['image_url']
+
+    text, status, image_url = download_article_content(url, allow_browser, browser_only)
+    # Exceptions are usually transient (timeouts etc.) and BROWSER_NEEDED is
+    # not a final answer: don't remember them
+    if is_final_status(status):
+        store.put(url, text, status, image_url)
+    return text, status, image_url
+
+def is_final_status(status):
+    """False for fetch outcomes worth retrying (errors, HTTP-only misses)."""
+    return status != BROWSER_NEEDED and not status.startswith("Error:")
+
+def download_article_content(url, allow_browser=True, browser_only=False):
+    """
+    Downloads an article with requests (Playwright as fallback) and extracts
+    its main content and OG image. browser_only skips the requests attempt.
+    Returns: (text_content, status_message, image_url)
+    """
+    image_url = None
     try:
         # 1. Try requests first (faster)
-        response = requests.get(url, headers=HEADERS, timeout=10, verify=False)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
+        if not browser_only:
+            response = requests.get(url, headers=HEADERS, timeout=10, verify=False)
             
-            # Remove clutter
-            for tag in soup(["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript"]):
-                tag.decompose()
+            if response.status_code == 200:
+                soup = make_soup(response.text)
                 
-            # Try to find main article content
-            article = soup.find('article')
-            if not article:
-                # Fallback to common content classes
-                for cls in ['content', 'post-content', 'entry-content', 'article-body', 'story-body']:
-                    article = soup.find(class_=cls)
-                    if article: break
-            
-            if not article:
-                article = soup # Fallback to body
+                # Read metadata before the extractor strips the tree
+                if not image_url:
+                    image_url = find_image(soup, url)
                 
-            text = article.get_text(separator='\n', strip=True)
-            
-            # Try to find OG image
-            if not image_url:
-                og_image = soup.find('meta', property='og:image')
-                if og_image:
-                    image_url = og_image.get('content')
-                else:
-                    twitter_image = soup.find('meta', name='twitter:image')
-                    if twitter_image:
-                        image_url = twitter_image.get('content')
+                # Main content by text/link density, lead paragraphs within the budget
+                text = extract_text(soup, CONTENT_TOKEN_BUDGET)
 
-            if len(text) > 500:
-                return text, "Success (Requests)", image_url
+                if len(text) > 500:
+                    return text, "Success (Requests)", image_url
+                    
+            if not allow_browser:
+                return None, BROWSER_NEEDED, image_url
                 
         # 2. Fallback to Playwright (for dynamic content)
         print("Requests failed or content too short, trying Playwright...")
@@ -282,28 +287,6 @@ def fetch_article_content(url, source, discussion_url=None):
         try:
             page.goto(url, wait_until='domcontentloaded', timeout=20000)
             
-            # Special handling for Google News redirects
-            if "news.google.com" in url:
-                print("Waiting for Google News redirect...")
-                # Wait for redirect to complete
-                page.wait_for_timeout(3000)
-                
-                # Check if we've been redirected to the actual article
-                current_url = page.url
-                if "news.google.com" not in current_url:
-                    print(f"Redirected to: {current_url}")
-                else:
-                    # If still on Google News, wait longer and try to trigger redirect
-                    print("Still on Google News, waiting for redirect...")
-                    page.wait_for_timeout(5000)
-                    current_url = page.url
-                    
-                    # If still on Google News after 8 seconds total, give up on this URL
-                    if "news.google.com" in current_url:
-                        print(f"-> Redirect failed, still on Google News")
-                        page.close()
-                        return None, "Google News redirect failed", None
-            
             # Wait a bit for JS to load
             try:
                 page.wait_for_selector('article, .content, p', timeout=5000)
@@ -314,17 +297,13 @@ def fetch_article_content(url, source, discussion_url=None):
         finally:
             page.close()
             
-        soup = BeautifulSoup(content, 'html.parser')
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
-            
-        text = soup.get_text(separator='\n', strip=True)
+        soup = make_soup(content)
         
         # Try to find OG image in Playwright content
         if not image_url:
-            og_image = soup.find('meta', property='og:image')
-            if og_image:
-                image_url = og_image.get('content')
+            image_url = find_image(soup, url)
+            
+        text = extract_text(soup, CONTENT_TOKEN_BUDGET)
         
         if len(text) > 500:
             return text, "Success (Playwright)", image_url
@@ -334,22 +313,71 @@ def fetch_article_content(url, source, discussion_url=None):
     except Exception as e:
         return None, f"Error: {str(e)}", None
 
-def analyze_article_with_gemini(title, content, source):
+def backfill_image(item, fetched_image=None):
     """
-    Uses Gemini to generate UX writing for a single article.
+    Fill in a missing image_url and store it in the DB. Uses the image found
+    while fetching content, otherwise fetches only the article's <head>.
     """
-    api_key = get_api_key()
-    if not api_key:
-        error_msg = "CRITICAL: No API Key found. Cannot proceed with AI analysis."
-        print(error_msg)
-        raise ValueError(error_msg)
-        # return None
+    if item.get('image_url'):
+        return
+    image_url = fetched_image
+    if not image_url and not google_news.is_google_news_url(item['url']):
+        metadata = fetch_metadata(item['url'], HEADERS)
+        image_url = metadata['image'] if metadata else None
+    if not image_url:
+        return
+
+    print(f"  -> Found missing image: {image_url[:50]}...")
+    item['image_url'] = image_url
+    try:
+        database.update_news_image(item['url'], image_url)
+    except Exception as e:
+        print(f"  -> Failed to update image in DB: {e}")
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-3-flash-preview')
+def prefetch_article_content(item):
+    """Prefetch worker: HTTP-only content fetch (Playwright stays on the main thread)."""
+    return fetch_article_content(item['url'], item['source'], item.get('discussion_url'), allow_browser=False)
 
-    # 定義 7 種新聞分類
-    CATEGORY_DEFINITIONS = """
+def prepare_article_content(item, prefetcher=None):
+    """
+    Fetches an item's content for analysis (backfilling its image on the way),
+    using the prefetched result when there is one.
+    Falls back to the RSS summary; returns None if there is nothing to analyze.
+    """
+    result = None
+    if prefetcher:
+        result = prefetcher.take(item, usable=lambda r: is_final_status(r[1]) or r[1] == BROWSER_NEEDED)
+    if result and result[1] == BROWSER_NEEDED:
+        # The prefetch already tried HTTP: only the browser is left
+        log_debug("  -> Prefetch needs the browser, skipping the HTTP fetch")
+        content, status, fetched_image = fetch_article_content(
+            item['url'], item['source'], item.get('discussion_url'), browser_only=True)
+        result = content, status, fetched_image or result[2]
+    elif result:
+        log_debug(f"  -> Using prefetched content ({result[1]})")
+    else:
+        result = fetch_article_content(item['url'], item['source'], item.get('discussion_url'))
+    content, status, fetched_image = result
+    
+    # Backfill image if missing (head-only fetch when the page didn't give one)
+    backfill_image(item, fetched_image)
+    
+    if content:
+        return content
+    
+    print(f"  -> Fetch failed: {status}")
+    log_debug(f"  -> Fetch failed: {status}")
+    
+    # Fallback to RSS summary if available
+    if item.get('summary'):
+        print("  -> Falling back to RSS summary...")
+        log_debug("  -> Falling back to RSS summary...")
+        # Append a note to content so AI knows it's a summary
+        return item['summary'] + "\n\n(Note: Full article content could not be fetched. Analyze based on this summary.)"
+    return None
+
+# 定義 7 種新聞分類
+CATEGORY_DEFINITIONS = """
     - Breaking: 突發重大事件、重要人事異動、產品重大更新（如 GPT-5 發布、CEO 辭職）
     - Tools: 新工具、App、網站、實用功能發布（如 ChatGPT 新功能、Perplexity 更新）
     - Business: 融資、投資、併購、財報、商業合作（如 OpenAI 融資、Google 收購）
@@ -358,7 +386,44 @@ def analyze_article_with_gemini(title, content, source):
     - Rules: 政府法規、政策、補助方案（如 歐盟 AI Act、台灣補助）
     - Risk: 資安漏洞、AI 偏見、倫理爭議、安全威脅（如 AI 攻擊、隱私問題）
     """
-    
+ALL_CATEGORIES = ['Breaking', 'Tools', 'Business', 'Creative', 'Research', 'Rules', 'Risk']
+
+# Batched analysis: several articles per request, within a prompt token budget
+ANALYSIS_BATCH_SIZE = 6
+ANALYSIS_TOKEN_BUDGET = 8000
+ARTICLE_PROMPT_CHARS = 3000  # per-article content sent to the model
+
+# Structured output: one result per article, keyed by the article ID
+ANALYSIS_BATCH_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'results': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'id': {'type': 'STRING'},
+                    'ai_rundown': {'type': 'STRING'},
+                    'category': {'type': 'STRING', 'enum': ALL_CATEGORIES},
+                },
+                'required': ['id', 'ai_rundown', 'category'],
+            },
+        },
+    },
+    'required': ['results'],
+}
+
+def analyze_article_with_gemini(title, content, source):
+    """
+    Uses Gemini to generate UX writing for a single article.
+    """
+    if not get_api_key():
+        error_msg = "CRITICAL: No API Key found. Cannot proceed with AI analysis."
+        print(error_msg)
+        raise ValueError(error_msg)
+
+    client = llm_client.get_client()
+
     prompt = f"""
     你是一位專業的科技新聞編輯，擅長 UX Writing。請閱讀以下新聞內容，並為「每日 AI 簡報」撰寫分析文案。
     
@@ -366,7 +431,7 @@ def analyze_article_with_gemini(title, content, source):
     標題：{title}
     來源：{source}
     內容摘要：
-    {content[:3000]}... (下略)
+    {content[:ARTICLE_PROMPT_CHARS]}... (下略)
 
     【撰寫要求】
     請生成以下欄位的內容：
@@ -393,27 +458,13 @@ def analyze_article_with_gemini(title, content, source):
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(prompt)
-            text = response.text
-            
-            # Clean up json
-            try:
-                # Find the first { and last }
-                start_idx = text.find('{')
-                end_idx = text.rfind('}')
-                
-                if start_idx != -1 and end_idx != -1:
-                    text = text[start_idx:end_idx+1]
-            except:
-                pass
-            
             try:
-                return json.loads(text)
+                return client.analyze(prompt)
             except json.JSONDecodeError as je:
                 print(f"JSON Decode Error: {je}")
                 log_debug(f"JSON Decode Error for {title}: {je}")
-                log_debug(f"Raw Text: {text}")
-                print(f"Raw Text was: {text[:500]}...") # Log first 500 chars
+                log_debug(f"Raw Text: {je.doc}")
+                print(f"Raw Text was: {je.doc[:500]}...") # Log first 500 chars
                 # Continue to retry loop
                 
         except Exception as e:
@@ -429,16 +480,99 @@ def analyze_article_with_gemini(title, content, source):
                 
     return None
 
+def analyze_articles_batch(articles):
+    """
+    Analyzes several articles in one Gemini request with JSON-schema output.
+    `articles` is a list of dicts with id, title, source and content.
+    Returns {id: {'ai_rundown', 'category'}}; articles missing from the result
+    (or a failed request) should be analyzed individually by the caller.
+    """
+    if not articles:
+        return {}
+    if len(articles) == 1:
+        article = articles[0]
+        analysis = analyze_article_with_gemini(article['title'], article['content'], article['source'])
+        return {article['id']: analysis} if analysis else {}
+
+    if not get_api_key():
+        error_msg = "CRITICAL: No API Key found. Cannot proceed with AI analysis."
+        print(error_msg)
+        raise ValueError(error_msg)
+
+    client = llm_client.get_client()
+
+    articles_text = ""
+    for article in articles:
+        articles_text += f"""
+    ---
+    ID: {article['id']}
+    標題：{article['title']}
+    來源：{article['source']}
+    內容摘要：
+    {article['content'][:ARTICLE_PROMPT_CHARS]}
+    """
+
+    prompt = f"""
+    你是一位專業的科技新聞編輯，擅長 UX Writing。請閱讀以下 {len(articles)} 則新聞，並為「每日 AI 簡報」逐則撰寫分析文案。
+    
+    【新聞列表】
+    {articles_text}
+    ---
+
+    【撰寫要求】
+    每一則新聞都要生成以下欄位，並以該則新聞的 ID 對應：
+    
+    1. **ai_rundown (重點摘要，繁體中文)**：
+       - 類似 The Rundown AI 的風格。
+       - 用一句話破題，接著用 2-3 句話清楚說明發生了什麼事。
+       - 語氣專業、簡潔、有力。
+       - 字數控制在 50 字以內。
+
+    2. **category (新聞分類，英文)**：
+       - 根據新聞內容，從以下 7 種分類中選擇最適合的一種：
+       {CATEGORY_DEFINITIONS}
+
+    【輸出格式】
+    JSON：{{"results": [{{"id": "...", "ai_rundown": "...", "category": "..."}}, ...]}}
+    """
+
+    generation_config = {
+        'response_mime_type': 'application/json',
+        'response_schema': ANALYSIS_BATCH_SCHEMA,
+    }
+
+    ids = {article['id'] for article in articles}
+    max_retries = 2
+    for attempt in range(max_retries):
+        try:
+            data = client.analyze(prompt, kind='analyze_batch', generation_config=generation_config)
+            results = {}
+            for result in data.get('results', []):
+                article_id = str(result.get('id', '')).strip()
+                if article_id in ids and result.get('ai_rundown'):
+                    results[article_id] = {'ai_rundown': result['ai_rundown'], 'category': result.get('category', 'Breaking')}
+            print(f"  -> Batch analysis: {len(results)}/{len(articles)} articles in one request")
+            return results
+        except Exception as e:
+            print(f"Gemini batch analysis failed (Attempt {attempt+1}): {e}")
+            log_debug(f"Gemini batch analysis failed (Attempt {attempt+1}): {e}")
+            if "429" in str(e) or "ResourceExhausted" in str(e):
+                wait_time = (attempt + 1) * 20
+                print(f"Rate limit hit. Waiting {wait_time} seconds...")
+                time.sleep(wait_time)
+            else:
+                break  # Malformed/unsupported structured output: fall back to single calls
+
+    return {}
+
 def generate_daily_summary(top10_list):
     """
     Generates a high-level summary for the entire briefing (100-150 words).
     """
-    api_key = get_api_key()
-    if not api_key or not top10_list:
+    if not get_api_key() or not top10_list:
         return None
         
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-3-flash-preview')
+    client = llm_client.get_client()
     
     # Prepare input
     news_text = ""
@@ -469,8 +603,7 @@ def generate_daily_summary(top10_list):
     """
     
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        text = client.summarise(prompt)
         
         # Clean up any potential markdown or JSON artifacts
         if text.startswith('```'):
@@ -508,15 +641,13 @@ def select_top_stories_with_ai(candidates):
     """
     Uses Gemini to select the top 10 most impactful stories from a larger pool.
     """
-    api_key = get_api_key()
-    if not api_key or not candidates:
+    if not get_api_key() or not candidates:
         return candidates[:10] # Fallback
         
     print(f"🤖 AI Editor is selecting top stories from {len(candidates)} candidates...")
     
-    genai.configure(api_key=api_key)
     # Use 3 Flash for selection to save quota
-    model = genai.GenerativeModel('gemini-3-flash-preview')
+    client = llm_client.get_client('gemini-3-flash-preview')
     
     # Prepare candidate list for AI
     candidates_text = ""
@@ -544,14 +675,7 @@ def select_top_stories_with_ai(candidates):
     """
     
     try:
-        response = model.generate_content(prompt)
-        text = response.text
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-            
-        selected_ids = json.loads(text)
+        selected_ids = client.select(prompt)
         
         # Filter and reorder candidates based on AI selection
         selected_candidates = []
@@ -566,14 +690,16 @@ def select_top_stories_with_ai(candidates):
         print(f"AI Selection failed: {e}")
         return candidates[:20] # Fallback
 
-def generate_deep_top10(target_date=None):
+def resolve_target_date(target_date=None):
+    """None -> now (Taipei); 'YYYY-MM-DD' -> that day."""
     if target_date is None:
-        target_date = get_taiwan_now()
-    elif isinstance(target_date, str):
-        target_date = datetime.strptime(target_date, '%Y-%m-%d').replace(tzinfo=TAIPEI_TZ)
+        return get_taiwan_now()
+    if isinstance(target_date, str):
+        return datetime.strptime(target_date, '%Y-%m-%d').replace(tzinfo=TAIPEI_TZ)
+    return target_date
 
-    print(f"Starting Deep Analysis for {target_date.strftime('%Y-%m-%d')}...")
-    
+def rank_candidates(target_date):
+    """Recent news scored by the rule-based ranker, cut down to a diverse pool for the AI editor."""
     # 1. Get Candidates (Top 100 from Rule-Based)
     import rule_based_top10
     
@@ -632,268 +758,222 @@ def generate_deep_top10(target_date=None):
     candidates.sort(key=lambda x: x['score'], reverse=True)
     
     # --- DIVERSITY ENFORCEMENT ---
-    # Group by category
-    category_buckets = {}
-    for item in candidates:
-        cat = item.get('top10_category', 'Uncategorized')
-        if cat not in category_buckets:
-            category_buckets[cat] = []
-        category_buckets[cat].append(item)
-        
-    diversity_pool = []
-    seen_urls = set()
-    source_counts = {} # Track items per source for capping
-    MAX_PER_SOURCE = 3
-    
-    # 1. Guaranteed Entry: Top 3 from each category
     from difflib import SequenceMatcher
     
-    def is_duplicate(item, pool):
-        """Check if item is duplicate based on URL or Title similarity"""
+    def is_duplicate_title(item, pool):
+        """Check if item is a near-duplicate of an already selected item by title similarity"""
+        title = item['title'].lower()
         for existing in pool:
-            # URL check
-            if item['url'] == existing['url']:
-                return True
-            
-            # Title similarity check
-            ratio = SequenceMatcher(None, item['title'].lower(), existing['title'].lower()).ratio()
+            matcher = SequenceMatcher(None, title, existing['title'].lower())
+            # quick_ratio/real_quick_ratio are cheap upper bounds of ratio()
+            if matcher.real_quick_ratio() <= 0.85 or matcher.quick_ratio() <= 0.85:
+                continue
+            ratio = matcher.ratio()
             if ratio > 0.85: # 85% similarity threshold
                 print(f"DEBUG: Duplicate detected by title: '{item['title']}' vs '{existing['title']}' ({ratio:.2f})")
                 return True
         return False
-
-    for cat, items in category_buckets.items():
-        # items are already sorted by score
-        top_picks = items[:3]
-        for item in top_picks:
-            if not is_duplicate(item, diversity_pool):
-                # Check source cap
-                source = item.get('source', 'Unknown')
-                if source_counts.get(source, 0) >= MAX_PER_SOURCE:
-                    continue
-                    
-                diversity_pool.append(item)
-                seen_urls.add(item['url'])
-                source_counts[source] = source_counts.get(source, 0) + 1
+    
+    MAX_PER_SOURCE = 3
+    MAX_GOOGLE_NEWS = 4
+    diversity_pool = QuotaSelector(
+        50,
+        max_per_source=MAX_PER_SOURCE,
+        caps=[(lambda x: google_news.is_google_news_url(x.get('origin_url') or x['url']), MAX_GOOGLE_NEWS)],
+        accept=lambda item, selected: not is_duplicate_title(item, selected)
+    )
+    
+    # 1. Guaranteed Entry: Top 3 from each category (categories in score order)
+    category_quotas = {cat: 3 for cat in dict.fromkeys(item['top10_category'] for item in candidates)}
+    diversity_pool.take_quotas(candidates, category_quotas, category_of=lambda x: x['top10_category'])
     
     # --- SPECIAL ENFORCEMENT ---
-    # 1. Ensure at least 5 HackingAI items (via discussion_url)
-    # HackingAI is special, we might want to allow more from it if it's the aggregator itself,
-    # but since we resolved sources, these might now be 'GitHub', 'Arxiv', etc.
+    # 2. Ensure up to 5 HackingAI items (via discussion_url)
+    # Since we resolved sources, these might now be 'GitHub', 'Arxiv', etc.
     # So we filter by discussion_url presence which indicates HackingAI origin.
-    hacking_ai_items = [item for item in candidates if item.get('discussion_url') and not is_duplicate(item, diversity_pool)]
-    for item in hacking_ai_items[:5]:
-        # Check source cap (even for HackingAI derived items, we want diversity)
-        # But maybe relax it slightly or treat them as distinct? 
-        # Let's enforce cap to ensure we don't get 5 Arxiv papers if HackingAI posted 5 Arxiv papers.
-        source = item.get('source', 'Unknown')
-        if source_counts.get(source, 0) >= MAX_PER_SOURCE:
-            continue
-            
-        diversity_pool.append(item)
-        seen_urls.add(item['url'])
-        source_counts[source] = source_counts.get(source, 0) + 1
-        
-    # 2. Fill the rest up to 50, but CAP Google News
-    remaining_slots = 50 - len(diversity_pool)
-    google_news_count = sum(1 for item in diversity_pool if 'news.google.com' in item['url'])
-    MAX_GOOGLE_NEWS = 4
+    # Source cap still applies so we don't get 5 Arxiv papers if HackingAI posted 5 Arxiv papers.
+    hacking_ai_items = [item for item in candidates if item.get('discussion_url')]
+    diversity_pool.take_top(hacking_ai_items, 5)
     
-    if remaining_slots > 0:
-        for item in candidates: # candidates is already sorted by score
-            if item['url'] not in seen_urls:
-                # Check Google News Cap (Legacy logic, but source_counts handles it generally now)
-                is_google_news = 'news.google.com' in item['url']
-                
-                if is_google_news:
-                    if google_news_count >= MAX_GOOGLE_NEWS:
-                        continue
-                    google_news_count += 1
-                
-                # General Source Cap
-                source = item.get('source', 'Unknown')
-                if source_counts.get(source, 0) >= MAX_PER_SOURCE:
-                    continue
-                    
-                diversity_pool.append(item)
-                seen_urls.add(item['url'])
-                source_counts[source] = source_counts.get(source, 0) + 1
-                if len(diversity_pool) >= 50:
-                    break
-                    
-    # If still not enough (because of strict caps), fill with anything
+    # 3. Fill the rest up to 50, with Google News and per-source caps
+    diversity_pool.fill(candidates)
+    
+    # If still not enough (because of strict caps), relax the Google News cap
+    # but keep strict per-source diversity
     if len(diversity_pool) < 20:
-        for item in candidates:
-            if len(diversity_pool) >= 50: break
-            if item['url'] in seen_urls: continue
-            
-            # Still enforce cap in fallback? Maybe relax if desperate.
-            # Let's enforce strict diversity.
-            source = item.get('source', 'Unknown')
-            if source_counts.get(source, 0) >= MAX_PER_SOURCE:
-                continue
-                
-            diversity_pool.append(item)
-            seen_urls.add(item['url'])
-            source_counts[source] = source_counts.get(source, 0) + 1
-
-    candidates = diversity_pool
+        diversity_pool.fill(candidates, relax_caps=True)
+    
     # Re-sort pool by score for AI
-    candidates.sort(key=lambda x: x['score'], reverse=True)
+    candidates = diversity_pool.ranked()
     
     print(f"Found {len(candidates)} candidates (Diversity Enforced). Sending to AI Editor...")
-    
+    return candidates
+
+def analyze_candidates(candidates, target_date):
+    """
+    AI editor selection, then content fetch + Gemini analysis until TARGET_ARTICLES
+    are accepted (progress is saved after every batch that accepted any).
+    Returns: (accepted_articles, processed_count)
+    """
+    prefetcher = Prefetcher(prefetch_article_content)
+    try:
+        return _analyze_candidates(candidates, target_date, prefetcher)
+    finally:
+        # Also on errors: the pool would otherwise outlive the call in a
+        # long-running job worker / scheduler process
+        prefetcher.close()
+        print(prefetcher.report())
+
+def _analyze_candidates(candidates, target_date, prefetcher):
     # --- AI EDITOR SELECTION ---
+    # Speculatively fetch the top of the pool while the editor call is in flight
+    prefetcher.start(candidates[:PREFETCH_COUNT])
     final_candidates = select_top_stories_with_ai(candidates)
-    
-    # 定義 7 種新聞分類
-    ALL_CATEGORIES = ['Breaking', 'Tools', 'Business', 'Creative', 'Research', 'Rules', 'Risk']
+    # Cancel prefetches for rejected items
+    prefetcher.keep(final_candidates)
     
     processed_articles = []  # 改用新變數名稱，收集所有成功處理的文章
     processed_count = 0
+    TARGET_ARTICLES = 12
     
-    # 2. Process Candidates until we have 12 good ones (減少處理數量以提升效能)
-    for item in final_candidates:
-        if len(processed_articles) >= 12:
-            break
+    def save_progress():
+        # INCREMENTAL SAVE
+        # Add rank
+        current_top10 = []
+        for i, t_item in enumerate(processed_articles):
+            t_item_copy = t_item.copy()
+            t_item_copy['rank'] = i + 1
+            current_top10.append(t_item_copy)
             
-        print(f"Processing candidate {processed_count+1}/{len(final_candidates)}: {item['title']}")
-        log_debug(f"Processing candidate {processed_count+1}: {item['title']}")
+        result = {
+            "date": target_date.strftime('%Y-%m-%d'),
+            "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "top10": current_top10,
+            "news_count": len(candidates),
+            "analysis_stats": {"processed": processed_count, "accepted": len(processed_articles)},
+            "method": "deep-ai-analysis"
+        }
         
-        # Fetch Content
-        content, status, fetched_image = fetch_article_content(item['url'], item['source'], item.get('discussion_url'))
-        
-        # Backfill image if missing (DISABLED for speed)
-        # if not item.get('image_url') and fetched_image:
-        #     print(f"  -> Found missing image: {fetched_image[:50]}...")
-        #     item['image_url'] = fetched_image
-        #     # Update DB with new image
-        #     try:
-        #         database.update_news_image(item['url'], fetched_image)
-        #     except Exception as e:
-        #         print(f"  -> Failed to update image in DB: {e}")
-        
-        if not content:
-            print(f"  -> Fetch failed: {status}")
-            log_debug(f"  -> Fetch failed: {status}")
-            
-            # Fallback to RSS summary if available
-            if item.get('summary'):
-                print("  -> Falling back to RSS summary...")
-                log_debug("  -> Falling back to RSS summary...")
-                content = item['summary']
-                # Append a note to content so AI knows it's a summary
-                content += "\n\n(Note: Full article content could not be fetched. Analyze based on this summary.)"
+        filename = f"top10_{target_date.strftime('%Y-%m-%d')}.json"
+        # Save to DB (Firestore or Local File via abstraction)
+        database.save_briefing(target_date.strftime('%Y-%m-%d'), result)
+        print(f"  -> Saved progress to DB ({filename})")
+    
+    # 2. Process Candidates until we have 12 good ones (減少處理數量以提升效能)
+    # Content is fetched per article; analysis runs in batches (one Gemini
+    # request for several articles, within ANALYSIS_TOKEN_BUDGET).
+    pending = list(enumerate(final_candidates))
+    carry = None  # prepared article that didn't fit the previous batch
+    while (pending or carry) and len(processed_articles) < TARGET_ARTICLES:
+        batch_limit = min(ANALYSIS_BATCH_SIZE, TARGET_ARTICLES - len(processed_articles))
+        batch = []
+        batch_tokens = 0
+        while len(batch) < batch_limit:
+            if carry:
+                article, carry = carry, None
+            elif pending:
+                index, item = pending.pop(0)
+                print(f"Processing candidate {index+1}/{len(final_candidates)}: {item['title']}")
+                log_debug(f"Processing candidate {index+1}: {item['title']}")
+                content = prepare_article_content(item, prefetcher)
+                if not content:
+                    processed_count += 1
+                    continue
+                article = {'id': str(index), 'item': item, 'title': item['title'], 'source': item['source'], 'content': content}
             else:
-                processed_count += 1
-                continue
+                break
             
+            tokens = estimate_tokens(article['content'][:ARTICLE_PROMPT_CHARS])
+            if batch and batch_tokens + tokens > ANALYSIS_TOKEN_BUDGET:
+                carry = article
+                break
+            batch.append(article)
+            batch_tokens += tokens
+        
+        if not batch:
+            break
+        
         # Analyze with AI
-        print("  -> Analyzing with Gemini...")
-        log_debug("  -> Analyzing with Gemini...")
-        analysis = analyze_article_with_gemini(item['title'], content, item['source'])
+        print(f"  -> Analyzing {len(batch)} articles with Gemini (~{batch_tokens} tokens of content)...")
+        log_debug(f"  -> Analyzing batch of {len(batch)} with Gemini...")
+        analyses = analyze_articles_batch(batch)
+        accepted_before = len(processed_articles)
         
-        if analysis:
-            item['ai_rundown'] = analysis.get('ai_rundown')
-            item['ai_category'] = analysis.get('category', 'Breaking')  # 新增分類欄位
-            # Removed details and impact as per user request
-            item['ai_details'] = None
-            item['ai_impact'] = None
-            if 'ai_bullets' in item:
-                del item['ai_bullets']
-            
-            # Save to DB
-            database.update_ai_analysis(
-                item['url'], 
-                item['ai_rundown'], 
-                None, # details
-                None  # impact
-            )
+        for article in batch:
+            item = article['item']
+            analysis = analyses.get(article['id'])
+            if not analysis:
+                # Missing from the batch reply: single-article request
+                print(f"  -> Analyzing individually: {item['title'][:40]}...")
+                analysis = analyze_article_with_gemini(item['title'], article['content'], item['source'])
+            processed_count += 1
             
-            processed_articles.append(item)
-            print(f"  -> Added to pool ✅ (Total: {len(processed_articles)})")
-            
-            # INCREMENTAL SAVE
-            # Add rank
-            current_top10 = []
-            for i, t_item in enumerate(processed_articles):
-                t_item_copy = t_item.copy()
-                t_item_copy['rank'] = i + 1
-                current_top10.append(t_item_copy)
+            if analysis:
+                item['ai_rundown'] = analysis.get('ai_rundown')
+                item['ai_category'] = analysis.get('category', 'Breaking')  # 新增分類欄位
+                # Removed details and impact as per user request
+                item['ai_details'] = None
+                item['ai_impact'] = None
+                if 'ai_bullets' in item:
+                    del item['ai_bullets']
                 
-            result = {
-                "date": target_date.strftime('%Y-%m-%d'),
-                "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                "top10": current_top10,
-                "news_count": len(candidates),
-                "analysis_stats": {"processed": processed_count + 1, "accepted": len(processed_articles)},
-                "method": "deep-ai-analysis"
-            }
-            
-            filename = f"top10_{target_date.strftime('%Y-%m-%d')}.json"
-            # Save to DB (Firestore or Local File via abstraction)
-            database.save_briefing(target_date.strftime('%Y-%m-%d'), result)
-            print(f"  -> Saved progress to DB ({filename})")
-            
-        else:
-            print("  -> AI Analysis failed, skipping.")
-            log_debug("  -> AI Analysis failed, skipping.")
-            
-        processed_count += 1
-        # Removed time.sleep(0.5) for faster processing
+                # Save to DB
+                database.update_ai_analysis(
+                    item['url'], 
+                    item['ai_rundown'], 
+                    None, # details
+                    None  # impact
+                )
+                
+                processed_articles.append(item)
+                print(f"  -> Added to pool ✅ (Total: {len(processed_articles)})")
+            else:
+                print("  -> AI Analysis failed, skipping.")
+                log_debug("  -> AI Analysis failed, skipping.")
+        
+        # Only after an acceptance: an empty top10 would overwrite a good briefing
+        if len(processed_articles) > accepted_before:
+            save_progress()
         
+    return processed_articles, processed_count
+
+def select_final_top10(processed_articles):
+    """Category-balanced Top 10 of the analyzed articles, sorted by score."""
     # 3. 分類平衡選擇：確保每個分類至少有 1 則，然後按 score 排序
     print("\n🎯 Applying category balance with score-based ranking...")
     
-    # 按分類分組
-    category_buckets = {cat: [] for cat in ALL_CATEGORIES}
-    for item in processed_articles:
+    # 未知分類歸入 Breaking
+    def balance_category(item):
         cat = item.get('ai_category', 'Breaking')
-        if cat in category_buckets:
-            category_buckets[cat].append(item)
-        else:
-            category_buckets['Breaking'].append(item)  # 未知分類歸入 Breaking
-    
-    # 在每個分類內按 score 排序
-    for cat in category_buckets:
-        category_buckets[cat].sort(key=lambda x: x.get('score', 0), reverse=True)
+        return cat if cat in ALL_CATEGORIES else 'Breaking'
     
     # 列印每個分類的數量
-    for cat, items in category_buckets.items():
-        print(f"  {cat}: {len(items)} items")
-    
-    # 選擇邏輯：每個分類至少 1 則（選該分類中 score 最高的）
-    final_top10 = []
-    used_urls = set()
-    
-    # 第一輪：每個分類各選 1 則（按 score 最高）
-    for cat in ALL_CATEGORIES:
-        items = category_buckets[cat]
-        if items and len(final_top10) < 10:
-            # 選該分類中 score 最高的一則
-            for item in items:
-                if item['url'] not in used_urls:
-                    final_top10.append(item)
-                    used_urls.add(item['url'])
-                    print(f"  ✓ Selected [{cat}] (score: {item.get('score', 0):.1f}): {item['title'][:40]}...")
-                    break
+    category_counts = {cat: 0 for cat in ALL_CATEGORIES}
+    for item in processed_articles:
+        category_counts[balance_category(item)] += 1
+    for cat, count in category_counts.items():
+        print(f"  {cat}: {count} items")
     
-    # 第二輪：用剩餘名額補齊（按 score 排序）
-    remaining_items = [item for item in processed_articles if item['url'] not in used_urls]
-    remaining_items.sort(key=lambda x: x.get('score', 0), reverse=True)
+    final_selector = QuotaSelector(10, score=lambda x: x.get('score', 0))
     
-    for item in remaining_items:
-        if len(final_top10) >= 10:
-            break
-        final_top10.append(item)
-        used_urls.add(item['url'])
+    # 第一輪：每個分類各選 1 則（選該分類中 score 最高的）
+    picked = final_selector.take_quotas(processed_articles, {cat: 1 for cat in ALL_CATEGORIES}, balance_category)
+    for cat, items in picked.items():
+        for item in items:
+            print(f"  ✓ Selected [{cat}] (score: {item.get('score', 0):.1f}): {item['title'][:40]}...")
+    
+    # 第二輪：用剩餘名額補齊（按 score 排序）
+    for item in final_selector.fill(processed_articles):
         print(f"  + Filled with [{item.get('ai_category', 'Unknown')}] (score: {item.get('score', 0):.1f}): {item['title'][:40]}...")
     
     # 最終按 score 排序
-    final_top10.sort(key=lambda x: x.get('score', 0), reverse=True)
+    final_top10 = final_selector.ranked()
     
     print(f"\n📋 Final Top 10 selected and sorted by score ({len(final_top10)} items)")
-    
+    return final_top10
+
+def publish_briefing(target_date, final_top10, news_count, analysis_stats):
+    """Adds the daily summary and ranks, then saves the briefing (never overwriting a good one with nothing)."""
     # 4. Generate Daily Summary (The Cherry on Top)
     print("Generating Daily Briefing Summary...")
     daily_summary = generate_daily_summary(final_top10)
@@ -916,8 +996,6 @@ def generate_deep_top10(target_date=None):
             if existing_briefing and existing_briefing.get('top10') and len(existing_briefing['top10']) > 0:
                 print(f"⚠️ WARNING: Generated list is empty, but Firestore already has {len(existing_briefing['top10'])} items for {date_str}.")
                 print("⚠️ Aborting save to prevent overwriting valid briefing.")
-                # Cleanup Playwright before returning
-                cleanup_playwright()
                 return existing_briefing
         except Exception as e:
             print(f"Error checking Firestore: {e}")
@@ -930,8 +1008,6 @@ def generate_deep_top10(target_date=None):
                 if existing_data.get('top10') and len(existing_data['top10']) > 0:
                     print(f"⚠️ WARNING: Generated list is empty, but {filename} already has data.")
                     print("⚠️ Aborting save to prevent overwriting valid briefing.")
-                    # Cleanup Playwright before returning
-                    cleanup_playwright()
                     return existing_data
             except Exception as e:
                 print(f"Error checking existing file: {e}")
@@ -941,24 +1017,32 @@ def generate_deep_top10(target_date=None):
         "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         "top10": final_top10,
         "daily_briefing": daily_summary, # New field
-        "news_count": len(candidates),
-        "analysis_stats": {"processed": processed_count, "accepted": len(processed_articles), "final_selected": len(final_top10)},
+        "news_count": news_count,
+        "analysis_stats": analysis_stats,
         "method": "deep-ai-analysis"
     }
     
     # Save to DB (Firestore or Local File via abstraction)
     database.save_briefing(target_date.strftime('%Y-%m-%d'), result)
     
-    # Cleanup Playwright resources
-    cleanup_playwright()
+    report = llm_client.latency_report()
+    if report:
+        print("Gemini latency:\n" + report)
         
     print(f"Saved Deep Analysis Top 10 to {filename}")
     return result
 
-
-if __name__ == "__main__":
-    # Test run
-    if not get_api_key():
-        print("Please set GOOGLE_API_KEY environment variable to test.")
-    else:
-        generate_deep_top10()
+def generate_deep_top10(target_date=None):
+    """Rank -> analyze -> publish in one call (see pipeline.py for the staged version)."""
+    target_date = resolve_target_date(target_date)
+    print(f"Starting Deep Analysis for {target_date.strftime('%Y-%m-%d')}...")
+    
+    try:
+        candidates = rank_candidates(target_date)
+        processed_articles, processed_count = analyze_candidates(candidates, target_date)
+        final_top10 = select_final_top10(processed_articles)
+        analysis_stats = {"processed": processed_count, "accepted": len(processed_articles), "final_selected": len(final_top10)}
+        return publish_briefing(target_date, final_top10, len(candidates), analysis_stats)
+    finally:
+        # Cleanup Playwright resources
+        cleanup_playwright()
@@ -0,0 +1,339 @@
+"""
+Email delivery: durable outbox, reused SMTP connection, batched recipients.
+
+A message is enqueued once (keyed, e.g. "briefing:2026-01-22") together
+with one delivery row per recipient. deliver_pending() sends due rows over
+a single authenticated connection, RECIPIENTS_PER_BATCH envelope
+recipients per SMTP transaction, and records each recipient's outcome:
+
+    sent     accepted by the server
+    pending  temporary failure (4xx, connection error): retried with
+             exponential backoff, up to MAX_ATTEMPTS
+    failed   permanent failure (5xx) or out of attempts
+
+Re-enqueuing the same key never re-sends to recipients already sent, so a
+retry after a crash only delivers what is missing. It does replace the
+subject and content for everyone not sent yet, so a briefing regenerated
+later in the day reaches new and retried recipients in its latest form.
+Recipients are only in the SMTP envelope; the To header never lists them.
+
+A message enqueued with personalized=True stores the shared template from
+email_templates.render_shared(); each recipient then gets its own
+transaction with their fragments filled in (the template is split once
+per message, not per recipient).
+
+Retries are sent by whatever drains the outbox next: scheduler.py does it
+every loop, or run this module by hand.
+
+Usage:
+    python email_delivery.py            # deliver everything due in the outbox
+    python email_delivery.py --status   # per-message delivery counts
+"""
+import argparse
+import os
+import smtplib
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import email_templates
+
+OUTBOX_DB = "email_outbox.db"
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))
+SMTP_SECURITY = os.getenv('SMTP_SECURITY', 'ssl')     # ssl | starttls | none
+SMTP_TIMEOUT = 30
+RECIPIENTS_PER_BATCH = 50       # envelope recipients per SMTP transaction
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 60            # doubled after every failed attempt
+MAX_BACKOFF_SECONDS = 3600
+IDLE_CHECK_SECONDS = 60         # NOOP a connection idle this long before reuse
+
+PENDING, SENT, FAILED = 'pending', 'sent', 'failed'
+
+
+def get_connection():
+    conn = sqlite3.connect(OUTBOX_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            sender TEXT NOT NULL,
+            subject TEXT,
+            html TEXT,
+            personalized INTEGER DEFAULT 0,
+            created_at DATETIME
+        )
+    ''')
+    c.execute("PRAGMA table_info(messages)")
+    if 'personalized' not in [row['name'] for row in c.fetchall()]:
+        c.execute("ALTER TABLE messages ADD COLUMN personalized INTEGER DEFAULT 0")
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER NOT NULL,
+            recipient TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL DEFAULT 0,
+            last_error TEXT,
+            sent_at DATETIME,
+            UNIQUE (message_id, recipient)
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries (status, next_attempt_at)")
+    conn.commit()
+    conn.close()
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def backoff_delay(attempts):
+    return min(BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), MAX_BACKOFF_SECONDS)
+
+
+def enqueue(key, sender, subject, html, recipients, personalized=False):
+    """
+    Add a message and its recipients to the outbox (idempotent per key:
+    recipients already sent are left alone, new recipients are added and
+    unsent ones get the new subject/content). Returns the message id. With personalized=True, `html` is a shared template
+    (email_templates.render_shared()) filled in per recipient at send time.
+    """
+    init_db()
+    conn = get_connection()
+    try:
+        c = conn.cursor()
+        c.execute(
+            "INSERT OR IGNORE INTO messages (key, sender, subject, html, personalized, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, sender, subject, html, int(personalized), _now())
+        )
+        message_id = c.execute("SELECT id FROM messages WHERE key = ?", (key,)).fetchone()['id']
+        c.executemany(
+            "INSERT OR IGNORE INTO deliveries (message_id, recipient, status) VALUES (?, ?, ?)",
+            [(message_id, recipient, PENDING) for recipient in dict.fromkeys(recipients)]
+        )
+        # Re-enqueued (e.g. regenerated briefing): unsent deliveries get the new version
+        c.execute(
+            "UPDATE messages SET subject = ?, html = ?, personalized = ? WHERE id = ? "
+            "AND EXISTS (SELECT 1 FROM deliveries WHERE message_id = ? AND status != ?)",
+            (subject, html, int(personalized), message_id, message_id, SENT)
+        )
+        conn.commit()
+        return message_id
+    finally:
+        conn.close()
+
+
+def message_status(message_id, recipients=None):
+    """{status: count} for one message's deliveries (only `recipients`' if given)."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT recipient, status FROM deliveries WHERE message_id = ?", (message_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    wanted = set(recipients) if recipients is not None else None
+    status = {}
+    for row in rows:
+        if wanted is None or row['recipient'] in wanted:
+            status[row['status']] = status.get(row['status'], 0) + 1
+    return status
+
+
+class SMTPConnection:
+    """One authenticated SMTP session, opened on first use and reused."""
+
+    def __init__(self, user, password, host=SMTP_HOST, port=SMTP_PORT, security=SMTP_SECURITY,
+                 timeout=SMTP_TIMEOUT):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.security = security
+        self.timeout = timeout
+        self.server = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def _connect(self):
+        print(f"Connecting to SMTP server {self.host}:{self.port} ({self.security})...")
+        if self.security == 'ssl':
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == 'starttls':
+                server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self.server = server
+        self.connects += 1
+
+    def ensure(self):
+        """A live session: reconnects if closed or if an idle one fails NOOP."""
+        if self.server is not None and time.time() - self.last_used > IDLE_CHECK_SECONDS:
+            try:
+                if self.server.noop()[0] != 250:
+                    self.close()
+            except (smtplib.SMTPException, OSError):
+                self.server = None
+        if self.server is None:
+            self._connect()
+        return self.server
+
+    def sendmail(self, sender, recipients, message):
+        """
+        sendmail over the shared session; returns {recipient: (code, msg)}
+        for refused recipients. A dropped connection is reopened once.
+        """
+        for attempt in range(2):
+            server = self.ensure()
+            try:
+                refused = server.sendmail(sender, recipients, message)
+                self.last_used = time.time()
+                return refused
+            except smtplib.SMTPServerDisconnected:
+                self.server = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+def build_message(sender, recipients, subject, html):
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['Subject'] = subject
+    # Batched recipients must not see each other: they're only in the envelope
+    msg['To'] = recipients[0] if len(recipients) == 1 else "undisclosed-recipients:;"
+    msg.attach(MIMEText(html, 'html'))
+    return msg.as_string()
+
+
+def _record(c, delivery_ids, status, error=None):
+    """Count an attempt for each (id, attempts) and store its outcome."""
+    now = time.time()
+    for delivery_id, attempts in delivery_ids:
+        attempts += 1
+        # Out of retries: temporary failure becomes permanent
+        status_now = FAILED if status == PENDING and attempts >= MAX_ATTEMPTS else status
+        c.execute(
+            "UPDATE deliveries SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, sent_at = ? WHERE id = ?",
+            (status_now, attempts, now + backoff_delay(attempts) if status_now == PENDING else 0,
+             error, _now() if status_now == SENT else None, delivery_id)
+        )
+
+
+def deliver_pending(connection, message_id=None, batch_size=RECIPIENTS_PER_BATCH):
+    """
+    Send every due delivery (optionally only for one message) over
+    `connection`. Returns {'sent', 'retry', 'failed'} counts for this run.
+    """
+    init_db()
+    counts = {'sent': 0, 'retry': 0, 'failed': 0}
+    conn = get_connection()
+    try:
+        query = ("SELECT d.id, d.recipient, d.attempts, d.message_id, m.sender, m.subject, m.html, m.personalized "
+                 "FROM deliveries d JOIN messages m ON m.id = d.message_id "
+                 "WHERE d.status = ? AND d.next_attempt_at <= ?")
+        params = [PENDING, time.time()]
+        if message_id is not None:
+            query += " AND d.message_id = ?"
+            params.append(message_id)
+        rows = conn.execute(query + " ORDER BY d.message_id, d.id", params).fetchall()
+
+        by_message = {}
+        for row in rows:
+            by_message.setdefault(row['message_id'], []).append(row)
+
+        for rows in by_message.values():
+            sender, subject, html = rows[0]['sender'], rows[0]['subject'], rows[0]['html']
+            shared = email_templates.SharedBody(html) if rows[0]['personalized'] else None
+            # Personalized mail differs per recipient: one transaction each
+            step = 1 if shared else batch_size
+            for start in range(0, len(rows), step):
+                batch = rows[start:start + step]
+                recipients = [row['recipient'] for row in batch]
+                ids = {row['recipient']: (row['id'], row['attempts']) for row in batch}
+                body = email_templates.personalize(shared, recipients[0]) if shared else html
+                c = conn.cursor()
+                try:
+                    refused = connection.sendmail(sender, recipients, build_message(sender, recipients, subject, body))
+                except smtplib.SMTPRecipientsRefused as e:
+                    refused = e.recipients
+                except (smtplib.SMTPException, OSError) as e:
+                    # Whole transaction failed: retry the batch later
+                    print(f"⚠️ SMTP batch failed ({len(batch)} recipients): {e}")
+                    connection.close()
+                    _record(c, ids.values(), PENDING, str(e))
+                    conn.commit()
+                    counts['retry'] += len(batch)
+                    continue
+
+                accepted = [ids[r] for r in recipients if r not in refused]
+                _record(c, accepted, SENT)
+                counts['sent'] += len(accepted)
+                for recipient, (code, message) in refused.items():
+                    error = f"{code} {message.decode(errors='replace') if isinstance(message, bytes) else message}"
+                    permanent = 500 <= code < 600
+                    _record(c, [ids[recipient]], FAILED if permanent else PENDING, error)
+                    counts['failed' if permanent else 'retry'] += 1
+                conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def deliver_due():
+    """
+    deliver_pending() over a fresh connection with the EMAIL_SENDER /
+    EMAIL_PASSWORD account; for periodic runners (scheduler.py, main()).
+    """
+    password = (os.getenv('EMAIL_PASSWORD') or '').replace(' ', '')
+    connection = SMTPConnection(os.getenv('EMAIL_SENDER'), password)
+    try:
+        return deliver_pending(connection)
+    finally:
+        connection.close()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--status', action='store_true', help='show delivery counts per message')
+    args = arg_parser.parse_args()
+
+    init_db()
+    if args.status:
+        conn = get_connection()
+        for message in conn.execute("SELECT id, key FROM messages ORDER BY id DESC LIMIT 20").fetchall():
+            print(f"{message['key']}: {message_status(message['id'])}")
+        conn.close()
+        return 0
+
+    counts = deliver_due()
+    print(f"Delivered: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Compiled, cached rendering of the briefing email.
+
+The templates are string.Template objects compiled once at import. A
+briefing is rendered in two stages:
+
+    render_shared()   the briefing body (header, summary, news list),
+                      rendered once per briefing content hash and cached
+                      as a SharedBody: the text split once around its only
+                      placeholders, the per-recipient fragments
+                      ($greeting, $footer_extra)
+    personalize()     fills those fragments for one recipient: a join of
+                      the cached parts, no per-item work and no re-scan
+
+so mailing thousands of recipients costs one body render plus one cheap
+substitution each. Values from the briefing have "$" escaped in stage one
+so they come out of stage two unchanged.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from string import Template
+from urllib.parse import quote
+
+UNSUBSCRIBE_URL = os.getenv('EMAIL_UNSUBSCRIBE_URL')   # e.g. https://example.com/unsubscribe
+DASHBOARD_URL = os.getenv('DASHBOARD_URL', 'http://localhost:8501')
+CACHE_ENTRIES = 16
+
+# "$$" survives stage one as "$", so $${greeting} becomes a stage-two placeholder
+LAYOUT = Template("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body {
+                    font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                    background-color: #f4f4f4;
+                    margin: 0;
+                    padding: 0;
+                }
+                .container {
+                    max-width: 600px;
+                    margin: 20px auto;
+                    background: #ffffff;
+                    border-radius: 8px;
+                    overflow: hidden;
+                    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+                }
+                .header {
+                    background: #1a73e8;
+                    color: white;
+                    padding: 20px;
+                    text-align: center;
+                }
+                .header h1 {
+                    margin: 0;
+                    font-size: 24px;
+                }
+                .date {
+                    font-size: 14px;
+                    opacity: 0.8;
+                    margin-top: 5px;
+                }
+                .greeting {
+                    margin: 20px 20px 0 20px;
+                }
+                .summary-card {
+                    background: #e8f0fe;
+                    border-left: 4px solid #1a73e8;
+                    margin: 20px;
+                    padding: 15px;
+                    border-radius: 4px;
+                }
+                .summary-title {
+                    font-weight: bold;
+                    color: #1a73e8;
+                    margin-bottom: 8px;
+                }
+                .news-list {
+                    padding: 0 20px 20px 20px;
+                }
+                .news-item {
+                    border-bottom: 1px solid #eee;
+                    padding: 15px 0;
+                }
+                .news-item:last-child {
+                    border-bottom: none;
+                }
+                .news-rank {
+                    font-weight: bold;
+                    color: #1a73e8;
+                    font-size: 14px;
+                }
+                .news-title {
+                    font-size: 18px;
+                    font-weight: bold;
+                    margin: 5px 0;
+                    display: block;
+                    text-decoration: none;
+                    color: #202124;
+                }
+                .news-title:hover {
+                    color: #1a73e8;
+                }
+                .news-meta {
+                    font-size: 12px;
+                    color: #5f6368;
+                    margin-bottom: 8px;
+                }
+                .category-tag {
+                    display: inline-block;
+                    padding: 2px 6px;
+                    border-radius: 4px;
+                    background: #f1f3f4;
+                    color: #5f6368;
+                    font-size: 11px;
+                    margin-left: 5px;
+                }
+                .news-rundown {
+                    font-size: 14px;
+                    color: #444;
+                }
+                .footer {
+                    background: #f8f9fa;
+                    padding: 20px;
+                    text-align: center;
+                    font-size: 12px;
+                    color: #5f6368;
+                    border-top: 1px solid #eee;
+                }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>📡 AI News Radar</h1>
+                    <div class="date">${date} Daily Briefing</div>
+                </div>
+                $${greeting}
+                ${summary}
+                <div class="news-list">
+                ${items}
+                </div>
+                <div class="footer">
+                    Sent by AI News Collector • <a href="${dashboard_url}">View Dashboard</a>
+                    $${footer_extra}
+                </div>
+            </div>
+        </body>
+        </html>
+        """)
+
+SUMMARY = Template("""
+                <div class="summary-card">
+                    <div class="summary-title">今日重點總結</div>
+                    <div>${summary}</div>
+                </div>
+            """)
+
+ITEM = Template("""
+                <div class="news-item">
+                    <div class="news-rank">#${rank}</div>
+                    <a href="${url}" class="news-title" target="_blank">${title}</a>
+                    <div class="news-meta">
+                        ${source}
+                        <span class="category-tag">${category}</span>
+                    </div>
+                    <div class="news-rundown">${rundown}</div>
+                </div>
+            """)
+
+GREETING = Template('<div class="greeting">Hi ${name},</div>')
+UNSUBSCRIBE = Template('<br><a href="${url}">Unsubscribe</a>')
+
+_cache = OrderedDict()      # briefing hash -> SharedBody
+_lock = threading.Lock()
+stats = {'hits': 0, 'misses': 0}
+
+
+def _escape(value):
+    """Briefing text as a stage-one value: "$" must survive stage two."""
+    return str(value).replace('$', '$$')
+
+
+class SharedBody:
+    """
+    A rendered body compiled for fast per-recipient output: literal text
+    and placeholder names, split once. `template` is the text form (what the
+    outbox stores); SharedBody(template) restores it.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.parts = []         # literal strings at even indexes, field names at odd ones
+        literal, pos = [], 0
+        for match in Template.pattern.finditer(template):
+            literal.append(template[pos:match.start()])
+            pos = match.end()
+            name = match.group('named') or match.group('braced')
+            if name:
+                self.parts += [''.join(literal), name]
+                literal = []
+            elif match.group('escaped') is not None:
+                literal.append('$')
+            else:
+                raise ValueError(f"Invalid placeholder in template at {match.start()}")
+        literal.append(template[pos:])
+        self.parts.append(''.join(literal))
+        self.fields = set(self.parts[1::2])
+
+    def substitute(self, fragments):
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = fragments[parts[i]]
+        return ''.join(parts)
+
+
+def briefing_hash(top10_data, daily_summary=None, date_str=None):
+    canonical = json.dumps([date_str, daily_summary, top10_data], ensure_ascii=False,
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def _render_body(top10_data, daily_summary, date_str):
+    items = []
+    for i, item in enumerate(top10_data):
+        items.append(ITEM.substitute(
+            rank=f"{i + 1:02d}",
+            url=_escape(item.get('url', '#')),
+            title=_escape(item.get('title', 'No Title')),
+            source=_escape(item.get('source', 'Unknown')),
+            category=_escape(item.get('ai_category', 'General')),
+            rundown=_escape(item.get('ai_rundown', 'No summary available.')),
+        ))
+    summary = SUMMARY.substitute(summary=_escape(daily_summary)) if daily_summary else ''
+    return LAYOUT.substitute(
+        date=date_str,
+        summary=summary,
+        items=''.join(items),
+        dashboard_url=_escape(DASHBOARD_URL),
+    )
+
+
+def render_shared(top10_data, daily_summary=None, date_str=None):
+    """
+    The briefing body as a SharedBody with only per-recipient placeholders
+    left, rendered once per distinct briefing and then served from cache.
+    """
+    date_str = date_str or datetime.now().strftime('%Y-%m-%d')
+    key = briefing_hash(top10_data, daily_summary, date_str)
+    with _lock:
+        shared = _cache.get(key)
+        if shared is not None:
+            _cache.move_to_end(key)
+            stats['hits'] += 1
+            return shared
+
+    shared = SharedBody(_render_body(top10_data, daily_summary, date_str))
+    with _lock:
+        stats['misses'] += 1
+        _cache[key] = shared
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return shared
+
+
+def recipient_fragments(recipient=None):
+    """Per-recipient fragments; all empty for a shared (multi-recipient) send."""
+    if not recipient:
+        return {'greeting': '', 'footer_extra': ''}
+    name = recipient.split('@', 1)[0]
+    footer_extra = UNSUBSCRIBE.substitute(url=f"{UNSUBSCRIBE_URL}?email={quote(recipient)}") if UNSUBSCRIBE_URL else ''
+    return {'greeting': GREETING.substitute(name=name), 'footer_extra': footer_extra}
+
+
+def personalize(shared, recipient=None):
+    """Final HTML for one recipient (or the shared edition) from render_shared()'s body."""
+    if isinstance(shared, str):
+        shared = SharedBody(shared)
+    return shared.substitute(recipient_fragments(recipient))
+
+
+def render_briefing(top10_data, daily_summary=None, date_str=None, recipient=None):
+    return personalize(render_shared(top10_data, daily_summary, date_str), recipient)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
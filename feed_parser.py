@@ -0,0 +1,134 @@
+"""
+Streaming RSS/Atom parser.
+
+Feeds are parsed incrementally with xml.etree's XMLPullParser: bytes can be
+fed straight from a streamed HTTP response, each <item>/<entry> is yielded as
+soon as it is complete and then detached from the tree, so memory stays flat
+regardless of feed size. Only the fields the crawler needs are extracted.
+
+Google News items carry the publisher in a <source url="..."> element, so no
+second HTML parse of <description> is needed to find it.
+"""
+import html
+import re
+import xml.etree.ElementTree as ET
+
+ITEM_TAGS = {'item', 'entry'}
+DATE_TAGS = ('pubDate', 'published', 'updated', 'date')  # 'date' is dc:date
+SUMMARY_TAGS = ('description', 'summary', 'content', 'encoded')  # 'encoded' is content:encoded
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _local_name(tag):
+    """Strip the XML namespace: '{http://www.w3.org/2005/Atom}entry' -> 'entry'."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def strip_html(text):
+    """Cheap tag stripping for feed descriptions (which are escaped HTML)."""
+    if not text:
+        return ""
+    text = _TAG_RE.sub(' ', text)
+    return _SPACE_RE.sub(' ', html.unescape(text)).strip()
+
+
+def _finish_entry(fields):
+    """Build the item dict from the collected child fields."""
+    title = (fields.get('title') or '').strip()
+    source_name = (fields.get('source') or '').strip()
+
+    # Google News titles look like "Headline - Publisher"
+    if source_name and title.endswith(' - ' + source_name):
+        title = title[:-(len(source_name) + 3)].strip()
+
+    published = ''
+    for tag in DATE_TAGS:
+        if fields.get(tag):
+            published = fields[tag].strip()
+            break
+
+    summary = ''
+    for tag in SUMMARY_TAGS:
+        if fields.get(tag):
+            summary = strip_html(fields[tag])
+            break
+
+    return {
+        'title': title,
+        'link': (fields.get('link') or '').strip(),
+        'published': published,
+        'summary': summary,
+        'source': source_name,
+        'source_url': fields.get('source_url', ''),
+    }
+
+
+def iter_feed_items(chunks):
+    """
+    Yield feed items from an iterable of bytes/str chunks (or a single
+    bytes/str document). Each item is a dict with title, link, published
+    (raw string), summary (plain text), source and source_url.
+    """
+    if isinstance(chunks, (bytes, str)):
+        chunks = [chunks]
+
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    stack = []
+    state = {'item': None, 'fields': None}
+
+    def drain():
+        for event, elem in parser.read_events():
+            if event == 'start':
+                stack.append(elem)
+                if state['item'] is None and _local_name(elem.tag) in ITEM_TAGS:
+                    state['item'] = elem
+                    state['fields'] = {}
+                continue
+
+            stack.pop()
+            item = state['item']
+            if item is None:
+                continue
+
+            if elem is item:
+                yield _finish_entry(state['fields'])
+                state['item'] = None
+                state['fields'] = None
+                # Detach the finished item so the tree doesn't grow
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+                continue
+
+            # Only direct children of the item (Atom <source> has its own <title>)
+            if not stack or stack[-1] is not item:
+                continue
+
+            fields = state['fields']
+            name = _local_name(elem.tag)
+            if name == 'link':
+                # RSS: <link>url</link>; Atom: <link rel="alternate" href="url"/>
+                href = elem.get('href')
+                if href:
+                    if elem.get('rel', 'alternate') == 'alternate' and not fields.get('link'):
+                        fields['link'] = href
+                elif elem.text:
+                    fields['link'] = elem.text
+            elif name == 'source':
+                fields['source'] = elem.text or ''
+                fields['source_url'] = elem.get('url', '')
+            elif name not in fields:
+                fields[name] = elem.text or ''
+
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            parser.feed(chunk)
+            yield from drain()
+        parser.close()
+        yield from drain()
+    except ET.ParseError as e:
+        print(f"Feed parse error (stopping early): {e}")
@@ -0,0 +1,227 @@
+"""
+HTML parser backend selection.
+
+BeautifulSoup's default 'html.parser' is pure Python; lxml is several times
+faster on listing pages. make_soup() parses with lxml by default and falls
+back to html5lib (or html.parser) if the preferred backend is missing or
+fails on the markup. A source can pin its backend with a "parser" key in
+sources.json, e.g. {"name": "...", "parser": "html.parser"}, and opt out of
+container-only parsing with "partial_parse": false.
+"""
+import os
+import re
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+# Backend used when a source doesn't specify one (override with HTML_PARSER env var)
+DEFAULT_PARSER = os.environ.get('HTML_PARSER', 'lxml')
+
+# Tried in order when the preferred backend fails. html5lib is lenient like a
+# browser; html.parser ships with Python so it is always available.
+FALLBACK_PARSERS = ['html5lib', 'html.parser']
+
+
+def parser_chain(parser=None):
+    """Return the ordered list of backends to try for `parser`."""
+    preferred = parser or DEFAULT_PARSER
+    return [preferred] + [p for p in FALLBACK_PARSERS if p != preferred]
+
+
+def source_parser(source):
+    """Return the parser configured for a source dict (or None for the default)."""
+    if not source:
+        return None
+    return source.get('parser')
+
+
+def make_soup(markup, parser=None, parse_only=None):
+    """
+    Parse markup with the preferred backend, falling back on failure.
+
+    A backend counts as failed if it is not installed, raises, or returns an
+    empty tree for non-empty markup (lxml does this on some malformed input).
+    """
+    last_error = None
+    for backend in parser_chain(parser):
+        # html5lib doesn't support parse_only; skip it for partial parses
+        if parse_only is not None and backend == 'html5lib':
+            continue
+        try:
+            soup = BeautifulSoup(markup, backend, parse_only=parse_only)
+        except FeatureNotFound as e:
+            last_error = e
+            continue
+        except Exception as e:
+            print(f"Parser '{backend}' failed, trying fallback: {e}")
+            last_error = e
+            continue
+
+        if markup and parse_only is None and not soup.contents:
+            print(f"Parser '{backend}' returned an empty tree, trying fallback...")
+            continue
+        return soup
+
+    if last_error:
+        print(f"All parsers failed: {last_error}")
+    return BeautifulSoup("", 'html.parser')
+
+
+# --- Partial parsing (container-only) ---
+#
+# For CSS-selector sources only the `container` elements are used, so most of
+# the page tree is thrown away. container_strainer() compiles the container
+# selector into a SoupStrainer that lets the tree builder create just the
+# subtrees that can contain a match: for each comma-separated alternative the
+# left-most compound selector (the outermost ancestor) is matched while
+# parsing, and the full selector is applied to the partial tree afterwards.
+
+_COMPOUND_TAG_RE = re.compile(r'^([a-zA-Z][\w-]*|\*)?')
+_COMPOUND_PART_RE = re.compile(
+    r'\.(?P<cls>[\w-]+)'
+    r'|#(?P<id>[\w-]+)'
+    r'|\[\s*(?P<attr>[\w:-]+)\s*'
+    r'(?:(?P<op>[*^$~|]?=)\s*(?:"(?P<dq>[^"]*)"|\'(?P<sq>[^\']*)\'|(?P<bare>[^\]\s]*)))?\s*\]'
+)
+
+
+class _Compound:
+    """A single compound selector such as div.teaser[data-id] (no combinators)."""
+
+    def __init__(self, tag, classes, conditions):
+        self.tag = tag
+        self.classes = classes
+        self.conditions = conditions  # list of (attr, op, value)
+
+    @classmethod
+    def parse(cls, text):
+        match = _COMPOUND_TAG_RE.match(text)
+        tag = match.group(1) if match and match.group(1) != '*' else None
+        pos = match.end() if match else 0
+
+        classes = []
+        conditions = []
+        while pos < len(text):
+            part = _COMPOUND_PART_RE.match(text, pos)
+            if not part:
+                return None  # pseudo-classes etc. are not supported
+            if part.group('cls'):
+                classes.append(part.group('cls'))
+            elif part.group('id'):
+                conditions.append(('id', '=', part.group('id')))
+            else:
+                value = part.group('dq')
+                if value is None:
+                    value = part.group('sq')
+                if value is None:
+                    value = part.group('bare')
+                conditions.append((part.group('attr'), part.group('op'), value))
+            pos = part.end()
+
+        if not tag and not classes and not conditions:
+            return None
+        return cls(tag.lower() if tag else None, classes, conditions)
+
+    def matches(self, name, attrs):
+        if self.tag and name != self.tag:
+            return False
+        attrs = attrs or {}
+
+        if self.classes:
+            value = attrs.get('class') or ''
+            tag_classes = value.split() if isinstance(value, str) else list(value)
+            if not all(c in tag_classes for c in self.classes):
+                return False
+
+        for attr, op, expected in self.conditions:
+            value = attrs.get(attr)
+            if value is None:
+                return False
+            if not isinstance(value, str):
+                value = ' '.join(value)
+            if op is None:
+                continue
+            if op == '=' and value != expected:
+                return False
+            if op == '*=' and expected not in value:
+                return False
+            if op == '^=' and not value.startswith(expected):
+                return False
+            if op == '$=' and not value.endswith(expected):
+                return False
+            if op == '~=' and expected not in value.split():
+                return False
+            if op == '|=' and not (value == expected or value.startswith(expected + '-')):
+                return False
+        return True
+
+
+def _leading_compound(selector):
+    """
+    Return the left-most compound of a selector, or None if the selector uses
+    sibling combinators (their left side is not an ancestor of the match).
+    """
+    depth = 0
+    end = len(selector)
+    for i, ch in enumerate(selector):
+        if ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+        elif depth == 0 and (ch.isspace() or ch == '>'):
+            end = i
+            break
+    rest = selector[end:]
+    depth = 0
+    for ch in rest:
+        if ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+        elif depth == 0 and ch in '+~':
+            return None
+    return selector[:end]
+
+
+class SelectorStrainer(SoupStrainer):
+    """SoupStrainer that keeps any top-level tag matching one of several compounds."""
+
+    def __init__(self, compounds):
+        super().__init__()
+        self.compounds = compounds
+
+    @property
+    def excludes_everything(self):
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return any(c.matches(name, attrs) for c in self.compounds)
+
+    def allow_string_creation(self, string):
+        return False
+
+    def __repr__(self):
+        return f"<SelectorStrainer {len(self.compounds)} compounds>"
+
+
+def container_strainer(selector):
+    """
+    Compile a (comma-separated) container selector into a strainer.
+    Returns None if any alternative can't be compiled; callers should then
+    parse the full document.
+    """
+    if not selector:
+        return None
+
+    compounds = []
+    for alternative in selector.split(','):
+        alternative = alternative.strip()
+        if not alternative:
+            continue
+        leading = _leading_compound(alternative)
+        compound = _Compound.parse(leading) if leading else None
+        if compound is None:
+            return None
+        compounds.append(compound)
+
+    if not compounds:
+        return None
+    return SelectorStrainer(compounds)
@@ -0,0 +1,462 @@
+"""
+Background jobs for long-running work started from the Streamlit app.
+
+Jobs are rows in a SQLite table (jobs.db, also when the news live in
+Firestore: the table describes work running on this instance). A daemon
+worker thread claims queued jobs and runs them outside the Streamlit script
+run, so a browser refresh or a slow request no longer kills a crawl; the UI
+just polls status and logs.
+
+submit() is single-flight per job kind: while a job of that kind is queued
+or running, submitting again returns the existing job instead of starting
+a duplicate. Running jobs update a heartbeat; one whose heartbeat stops
+(the process died) is marked failed so it doesn't block new submissions,
+and so is a job left queued for longer than QUEUED_TIMEOUT_SECONDS.
+submit() and active_job() make sure this process runs a worker, so a job
+queued before a restart is picked up again.
+
+Output printed by a job (on the worker thread, and on the pools it starts
+with initializer=inherit_output(): date/link resolvers, prefetchers) goes to a log_stream
+ring buffer that viewers in this process read as lines arrive; it is
+copied to job_logs with every heartbeat and when the job ends, for
+viewers in other processes and after the job is gone from memory.
+"""
+import json
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+import log_stream
+
+JOBS_DB = "jobs.db"
+POLL_SECONDS = 2.0
+HEARTBEAT_SECONDS = 10.0
+STALE_SECONDS = 120.0           # running job without heartbeat for this long is dead
+QUEUED_TIMEOUT_SECONDS = 3600   # queued job never claimed for this long is dropped
+KEEP_LOG_JOBS = 20              # jobs whose logs are kept in job_logs
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+def get_connection():
+    conn = sqlite3.connect(JOBS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params TEXT,
+            result TEXT,
+            error TEXT,
+            created_at DATETIME,
+            started_at DATETIME,
+            finished_at DATETIME,
+            heartbeat_at REAL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS job_logs (
+            job_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            line TEXT,
+            PRIMARY KEY (job_id, seq)
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs (kind, status)")
+    conn.commit()
+    conn.close()
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['params'] = json.loads(job['params']) if job['params'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def _fail_stale(c, kind):
+    """
+    Mark jobs of `kind` as failed when their worker stopped heartbeating, or
+    when they stayed queued for too long (no worker claimed them).
+    """
+    c.execute(
+        "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+        "WHERE kind = ? AND status = ? AND heartbeat_at < ?",
+        (FAILED, "Worker stopped (process restarted?)", _now(), kind, RUNNING, time.time() - STALE_SECONDS)
+    )
+    queued_cutoff = datetime.fromtimestamp(time.time() - QUEUED_TIMEOUT_SECONDS).strftime('%Y-%m-%d %H:%M:%S')
+    c.execute(
+        "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+        "WHERE kind = ? AND status = ? AND created_at < ?",
+        (FAILED, "Never started (no worker picked it up)", _now(), kind, QUEUED, queued_cutoff)
+    )
+
+
+def submit(kind, params=None):
+    """
+    Queue a job of `kind` unless one is already queued/running.
+    Returns (job_id, created): created is False when an active job was reused.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    init_db()
+    conn = get_connection()
+    try:
+        # BEGIN IMMEDIATE takes the write lock: check-and-insert is atomic
+        # across threads and processes
+        conn.execute("BEGIN IMMEDIATE")
+        c = conn.cursor()
+        _fail_stale(c, kind)
+        c.execute(
+            "SELECT id FROM jobs WHERE kind = ? AND status IN (?, ?) ORDER BY id LIMIT 1",
+            (kind, *ACTIVE_STATES)
+        )
+        row = c.fetchone()
+        if row:
+            conn.commit()
+            # It may have been queued by a process that is gone: run it here
+            ensure_worker().wake()
+            return row['id'], False
+        c.execute(
+            "INSERT INTO jobs (kind, status, params, created_at) VALUES (?, ?, ?, ?)",
+            (kind, QUEUED, json.dumps(params or {}), _now())
+        )
+        job_id = c.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    ensure_worker().wake()
+    return job_id, True
+
+
+def get_job(job_id):
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row)
+
+
+def active_job(kind):
+    """The queued/running job of `kind`, or None."""
+    init_db()
+    ensure_worker()
+    conn = get_connection()
+    try:
+        _fail_stale(conn.cursor(), kind)
+        conn.commit()
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? AND status IN (?, ?) ORDER BY id LIMIT 1",
+            (kind, *ACTIVE_STATES)
+        ).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row)
+
+
+def get_logs(job_id, after_seq=0):
+    """
+    Log lines of a job with seq > after_seq: list of (seq, line). Live jobs of
+    this process are read from their in-memory stream, others from job_logs.
+    """
+    stream = log_stream.get_stream(job_id)
+    if stream is not None:
+        return stream.read(after_seq)[0]
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT seq, line FROM job_logs WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after_seq)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(row['seq'], row['line']) for row in rows]
+
+
+def wait_logs(job_id, after_seq=0, timeout=POLL_SECONDS):
+    """
+    Like get_logs, but waits up to `timeout` for new lines first (returns as
+    soon as a line is written when the job runs in this process).
+    """
+    deadline = time.time() + timeout
+    while True:
+        stream = log_stream.get_stream(job_id)
+        if stream is not None:
+            stream.wait(after_seq, max(0.0, deadline - time.time()))
+            return stream.read(after_seq)[0]
+        if time.time() >= deadline:
+            return get_logs(job_id, after_seq)
+        # Not (yet) running in this process: the worker may pick it up any moment
+        time.sleep(0.1)
+
+
+# --- Log capture ---
+def _persist_logs(job_id, stream, after_seq):
+    """Copy the stream's lines after after_seq to job_logs; returns the last seq stored."""
+    lines, last_seq, _ = stream.read(after_seq)
+    if not lines:
+        return after_seq
+    conn = get_connection()
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_logs (job_id, seq, line) VALUES (?, ?, ?)",
+            [(job_id, seq, line) for seq, line in lines]
+        )
+        conn.commit()
+    except Exception as e:
+        sys.__stderr__.write(f"Job log write error: {e}\n")
+        return after_seq
+    finally:
+        conn.close()
+    return last_seq
+
+
+def _prune_logs():
+    """Keep the logs of the last KEEP_LOG_JOBS jobs only."""
+    conn = get_connection()
+    try:
+        conn.execute(
+            "DELETE FROM job_logs WHERE job_id NOT IN (SELECT id FROM jobs ORDER BY id DESC LIMIT ?)",
+            (KEEP_LOG_JOBS,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class ThreadRoutedStream:
+    """
+    sys.stdout/stderr replacement: writes from a thread with a registered
+    sink go there, everything else to the original stream. A job registers
+    its worker thread, and the pools it starts register theirs through
+    inherit_output(). Unlike contextlib.redirect_stdout this doesn't
+    swallow the output of Streamlit sessions or unrelated threads.
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self.sinks = {}
+
+    def _sink(self):
+        return self.sinks.get(threading.get_ident())
+
+    def write(self, text):
+        sink = self._sink()
+        if sink is not None:
+            sink.write(text)
+            return len(text)
+        return self.original.write(text)
+
+    def flush(self):
+        sink = self._sink()
+        if sink is not None:
+            sink.flush()
+        else:
+            self.original.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.original, name)
+
+
+_routing_lock = threading.Lock()
+
+
+def _install_routing():
+    with _routing_lock:
+        if not isinstance(sys.stdout, ThreadRoutedStream):
+            sys.stdout = ThreadRoutedStream(sys.stdout)
+        if not isinstance(sys.stderr, ThreadRoutedStream):
+            sys.stderr = ThreadRoutedStream(sys.stderr)
+
+
+def inherit_output():
+    """
+    ThreadPoolExecutor initializer: the pool's threads print where the
+    thread creating the pool does (a running job's log). None if that
+    thread's output isn't routed.
+    """
+    routes = [(out, out.sinks.get(threading.get_ident())) for out in (sys.stdout, sys.stderr)
+              if isinstance(out, ThreadRoutedStream)]
+    routes = [(out, sink) for out, sink in routes if sink is not None]
+    if not routes:
+        return None
+
+    def register():
+        ident = threading.get_ident()
+        for out, sink in routes:
+            out.sinks[ident] = sink
+    return register
+
+
+# --- Handlers ---
+def run_briefing(params):
+    """Crawl -> rank -> analyze -> publish (see pipeline.py)."""
+    import os
+    import pipeline
+
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if api_key:
+        print(f"API Key found in env: {api_key[:5]}... (masked)")
+    else:
+        print("WARNING: GOOGLE_API_KEY not found in env!")
+
+    run = pipeline.Pipeline(params.get('date')).run(params.get('start_at', 'crawl'))
+    if not run.ok:
+        raise RuntimeError(run.error)
+    crawl = run.output('crawl')
+    top10 = (run.briefing or {}).get('top10') or []
+    if not top10:
+        raise RuntimeError("Generation produced 0 items.")
+    return {'new_items': crawl.new_items if crawl else None, 'top10_count': len(top10)}
+
+
+JOB_HANDLERS = {
+    'briefing': run_briefing,
+}
+
+
+# --- Worker ---
+class Worker:
+    def __init__(self):
+        self._wake = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name='job-worker', daemon=True)
+
+    def start(self):
+        init_db()
+        _install_routing()
+        self.thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running; returns it or None."""
+        conn = get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, _now(), time.time(), row['id'])
+            )
+            conn.commit()
+            return _row_to_job(row)
+        finally:
+            conn.close()
+
+    def _heartbeat(self, job_id, stream, done, persisted):
+        while not done.wait(HEARTBEAT_SECONDS):
+            conn = get_connection()
+            try:
+                conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+                conn.commit()
+            except Exception as e:
+                sys.__stderr__.write(f"Job heartbeat error: {e}\n")
+            finally:
+                conn.close()
+            persisted['seq'] = _persist_logs(job_id, stream, persisted['seq'])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = get_connection()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, _now(), job_id)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def run_job(self, job):
+        job_id = job['id']
+        stream = log_stream.open_stream(job_id)
+        done = threading.Event()
+        persisted = {'seq': 0}
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, stream, done, persisted), daemon=True)
+        heartbeat.start()
+        routes = [out for out in (sys.stdout, sys.stderr) if isinstance(out, ThreadRoutedStream)]
+        ident = threading.get_ident()
+        for out in routes:
+            out.sinks[ident] = stream
+
+        status, result, error = SUCCEEDED, None, None
+        try:
+            print(f"Job {job_id} ({job['kind']}) started")
+            result = JOB_HANDLERS[job['kind']](job['params'])
+        except Exception as e:
+            status, error = FAILED, str(e)
+            print(f"CRITICAL ERROR: {e}")
+            traceback.print_exc()
+        finally:
+            for out in routes:
+                # The job's thread and any pool threads it registered
+                for thread_ident, sink in list(out.sinks.items()):
+                    if sink is stream:
+                        out.sinks.pop(thread_ident, None)
+            done.set()
+            heartbeat.join()
+
+        stream.append(f"Job {job_id} {status}")
+        stream.close()
+        _persist_logs(job_id, stream, persisted['seq'])
+        self._finish(job_id, status, result=result, error=error)
+        _prune_logs()
+
+    def _loop(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                sys.__stderr__.write(f"Job claim error: {e}\n")
+                job = None
+            if job is None:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                # Bookkeeping failed (job DB locked, ...): keep the worker alive
+                sys.__stderr__.write(f"Job {job['id']} error: {e}\n")
+                try:
+                    self._finish(job['id'], FAILED, error=str(e))
+                except Exception:
+                    pass
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def ensure_worker():
+    """The process's worker thread (started on first use)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = Worker()
+            _worker.start()
+        return _worker
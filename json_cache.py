@@ -0,0 +1,74 @@
+"""
+Small persistent key/value cache stored as a JSON file.
+
+Used for per-URL lookups that are expensive to repeat across crawls
+(publication dates, resolved redirects, ...). Entries carry the time they
+were stored so old ones can be expired. Safe to use from worker threads.
+"""
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = 'cache'
+
+
+def cache_path(filename):
+    """Path of a cache file inside the shared cache directory."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), CACHE_DIR, filename)
+
+
+class JsonCache:
+    def __init__(self, path, max_age_days=None):
+        self.path = path
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self._data = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._data is not None:
+            return
+        self._data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                print(f"Error loading cache {self.path}: {e}")
+
+    def _expired(self, entry):
+        return self.max_age is not None and time.time() - entry.get('ts', 0) > self.max_age
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._load()
+            entry = self._data.get(key)
+            if entry is None or self._expired(entry):
+                return default
+            return entry.get('value', default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()
+            self._data[key] = {'value': value, 'ts': time.time()}
+            self._dirty = True
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def save(self):
+        """Write pending changes (dropping expired entries) atomically."""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return
+            self._data = {k: v for k, v in self._data.items() if not self._expired(v)}
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Error saving cache {self.path}: {e}")
@@ -0,0 +1,142 @@
+"""
+Shared Gemini client.
+
+genai is configured once per API key and one GenerativeModel is kept per
+model name, so callers no longer pay setup cost on every request. The typed
+methods wrap generate_content with the response handling each kind of call
+needs (select -> list of IDs, analyze -> parsed JSON, summarise -> text) and
+record per-call latency, which latency_report() summarises.
+"""
+import json
+import os
+import threading
+import time
+
+import google.generativeai as genai
+
+DEFAULT_MODEL = 'gemini-3-flash-preview'
+
+_lock = threading.Lock()
+_clients = {}
+_configured_key = None
+_env_file_key = None
+_env_file_read = False
+
+
+def get_api_key():
+    """API key from the environment, else from the .env file (read once)."""
+    global _env_file_key, _env_file_read
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if api_key:
+        return api_key
+
+    if not _env_file_read and os.path.exists('.env'):
+        try:
+            with open('.env', 'r') as f:
+                for line in f:
+                    if line.startswith('GOOGLE_API_KEY='):
+                        _env_file_key = line.strip().split('=')[1]
+                        break
+        except Exception:
+            pass
+        _env_file_read = True
+    return _env_file_key
+
+
+def _strip_code_fence(text):
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0]
+    if "```" in text:
+        return text.split("```")[1].split("```")[0]
+    return text
+
+
+def parse_json(text, opener='{'):
+    """Parse the JSON object/array in a model reply (tolerates fences and chatter)."""
+    closer = '}' if opener == '{' else ']'
+    text = _strip_code_fence(text)
+    start = text.find(opener)
+    end = text.rfind(closer)
+    if start != -1 and end != -1:
+        text = text[start:end + 1]
+    return json.loads(text)
+
+
+class LLMClient:
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self._stats = {}  # kind -> {'calls', 'errors', 'total', 'max'}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, kind, elapsed, ok):
+        with self._stats_lock:
+            stats = self._stats.setdefault(kind, {'calls': 0, 'errors': 0, 'total': 0.0, 'max': 0.0})
+            stats['calls'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            if not ok:
+                stats['errors'] += 1
+
+    def generate(self, prompt, kind='generate', **kwargs):
+        """Raw generate_content call returning the reply text (timed under `kind`)."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.model.generate_content(prompt, **kwargs)
+            text = response.text
+            ok = True
+            return text
+        finally:
+            self._record(kind, time.perf_counter() - start, ok)
+
+    def select(self, prompt, **kwargs):
+        """Ask for a ranked selection; returns the list of IDs in the reply."""
+        return parse_json(self.generate(prompt, kind='select', **kwargs), opener='[')
+
+    def analyze(self, prompt, opener='{', kind='analyze', **kwargs):
+        """Ask for a structured analysis; returns the parsed JSON reply."""
+        return parse_json(self.generate(prompt, kind=kind, **kwargs), opener=opener)
+
+    def summarise(self, prompt, **kwargs):
+        """Ask for free text; returns the stripped reply."""
+        return self.generate(prompt, kind='summarise', **kwargs).strip()
+
+    def stats(self):
+        with self._stats_lock:
+            return {kind: dict(values) for kind, values in self._stats.items()}
+
+
+def get_client(model_name=DEFAULT_MODEL):
+    """
+    Shared client for `model_name`. Raises ValueError if no API key is set.
+    genai is reconfigured (and clients rebuilt) only when the key changes.
+    """
+    global _configured_key
+    api_key = get_api_key()
+    if not api_key:
+        raise ValueError("No API Key found (GOOGLE_API_KEY).")
+
+    with _lock:
+        if api_key != _configured_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            _clients.clear()
+        client = _clients.get(model_name)
+        if client is None:
+            client = LLMClient(model_name)
+            _clients[model_name] = client
+        return client
+
+
+def latency_report():
+    """One line per (model, call kind): count, errors, mean and max latency."""
+    lines = []
+    with _lock:
+        clients = list(_clients.values())
+    for client in clients:
+        for kind, s in sorted(client.stats().items()):
+            mean = s['total'] / s['calls'] if s['calls'] else 0.0
+            lines.append(f"{client.model_name} {kind}: {s['calls']} calls, {s['errors']} errors, "
+                         f"avg {mean:.2f}s, max {s['max']:.2f}s")
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+"""
+Line-oriented log channel with bounded retention.
+
+A LogStream is written like a file (write() is line-buffered) by the code
+producing output and read incrementally by any number of viewers: each
+keeps the sequence number of the last line it has seen and asks only for
+newer lines, optionally blocking until some arrive. Only the newest
+MAX_LINES lines are retained (ring buffer); a viewer that falls behind
+is told how many lines it missed.
+"""
+import threading
+from collections import deque
+
+MAX_LINES = 2000
+MAX_STREAMS = 20            # streams kept in the registry (oldest closed ones dropped)
+
+
+class LogStream:
+    def __init__(self, max_lines=MAX_LINES):
+        self.lines = deque(maxlen=max_lines)    # (seq, line)
+        self.seq = 0                            # seq of the newest line
+        self.closed = False
+        self._partial = ''
+        self._cond = threading.Condition()
+
+    def write(self, text):
+        with self._cond:
+            self._partial += text
+            if '\n' not in self._partial:
+                return len(text)
+            *complete, self._partial = self._partial.split('\n')
+            self._append(complete)
+        return len(text)
+
+    def flush(self):
+        # Partial lines wait for their newline (or close())
+        pass
+
+    def append(self, line):
+        """Add a whole line (after any pending partial line)."""
+        with self._cond:
+            if self._partial:
+                self._append([self._partial])
+                self._partial = ''
+            self._append([line])
+
+    def _append(self, lines):
+        added = False
+        for line in lines:
+            line = line.rstrip()
+            if not line.strip():
+                continue
+            self.seq += 1
+            self.lines.append((self.seq, line))
+            added = True
+        if added:
+            self._cond.notify_all()
+
+    def close(self):
+        """Emit any partial line and wake all waiting readers."""
+        with self._cond:
+            if self._partial:
+                self._append([self._partial])
+                self._partial = ''
+            self.closed = True
+            self._cond.notify_all()
+
+    def read(self, after_seq=0):
+        """
+        Lines newer than after_seq: (lines, last_seq, missed) where lines is a
+        list of (seq, line) and missed counts lines already dropped from the
+        buffer.
+        """
+        with self._cond:
+            new = [(seq, line) for seq, line in self.lines if seq > after_seq] if self.seq > after_seq else []
+        missed = (new[0][0] - after_seq - 1) if new else 0
+        last_seq = new[-1][0] if new else after_seq
+        return new, last_seq, missed
+
+    def wait(self, after_seq, timeout=None):
+        """Block until there are lines after after_seq or the stream is closed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.seq > after_seq or self.closed, timeout)
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def open_stream(key, max_lines=MAX_LINES):
+    """New stream registered under `key` (replacing any previous one)."""
+    stream = LogStream(max_lines)
+    with _streams_lock:
+        _streams.pop(key, None)
+        _streams[key] = stream
+        # Bounded registry: drop the oldest closed streams
+        for old_key in list(_streams):
+            if len(_streams) <= MAX_STREAMS:
+                break
+            if _streams[old_key].closed:
+                del _streams[old_key]
+    return stream
+
+
+def get_stream(key):
+    with _streams_lock:
+        return _streams.get(key)
@@ -0,0 +1,114 @@
+"""
+Cheap page metadata fetch.
+
+Publication dates and preview images live in the page <head>, so there is no
+need to download and parse whole articles for them. fetch_head() streams the
+response and stops as soon as </head> has arrived (or a byte budget is
+spent); parse_metadata() then parses only the <meta> tags of that prefix.
+"""
+import re
+from urllib.parse import urljoin
+
+import requests
+from bs4 import SoupStrainer
+
+from html_parsing import make_soup
+
+HEAD_BUDGET = 64 * 1024
+CHUNK_SIZE = 8192
+
+_HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+_JSON_LD_DATE_RE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+
+# Checked in order; the first present wins
+PUBLISHED_KEYS = [
+    ('property', 'article:published_time'),
+    ('property', 'og:article:published_time'),
+    ('itemprop', 'datePublished'),
+    ('name', 'article:published_time'),
+    ('name', 'parsely-pub-date'),
+    ('name', 'publish-date'),
+    ('name', 'pubdate'),
+    ('name', 'date'),
+]
+IMAGE_KEYS = [
+    ('property', 'og:image'),
+    ('property', 'og:image:secure_url'),
+    ('name', 'twitter:image'),
+    ('property', 'twitter:image'),
+    ('name', 'twitter:image:src'),
+]
+
+_META_ONLY = SoupStrainer('meta')
+
+
+def fetch_head(url, headers, session=None, max_bytes=HEAD_BUDGET, timeout=10):
+    """
+    Stream `url` until </head> or `max_bytes`. Returns (html, complete) where
+    complete is True if the whole document arrived; (None, False) on HTTP errors.
+    """
+    getter = session or requests
+    # Servers that honour Range stop after the budget; others are cut off below
+    headers = dict(headers, Range=f'bytes=0-{max_bytes - 1}')
+    with getter.get(url, headers=headers, timeout=timeout, verify=False, stream=True) as response:
+        if response.status_code not in (200, 206):
+            return None, False
+        buf = bytearray()
+        complete = True
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            # Look for </head> across the chunk boundary
+            search_from = max(0, len(buf) - 16)
+            buf.extend(chunk)
+            if _HEAD_END_RE.search(buf, search_from) or len(buf) >= max_bytes:
+                complete = False
+                break
+        if complete and response.status_code == 206:
+            # "Content-Range: bytes 0-65535/183422": only a slice was sent
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            complete = not total.isdigit() or int(total) <= len(buf)
+        encoding = response.encoding or 'utf-8'
+    return bytes(buf).decode(encoding, errors='replace'), complete
+
+
+def _first_content(soup, keys):
+    for attr, key in keys:
+        meta = soup.find('meta', attrs={attr: key})
+        if meta and meta.get('content'):
+            return meta['content'].strip()
+    return None
+
+
+def find_image(soup, base_url=""):
+    """Preview image (og:image / twitter:image) of an already parsed page."""
+    image = _first_content(soup, IMAGE_KEYS)
+    if image and base_url:
+        image = urljoin(base_url, image)
+    return image
+
+
+def parse_metadata(html, base_url=""):
+    """
+    Extract {'published_time', 'image'} (raw strings or None) from the head
+    of a page. Only <meta> tags are built into the tree.
+    """
+    soup = make_soup(html, parse_only=_META_ONLY)
+
+    published = _first_content(soup, PUBLISHED_KEYS)
+    if not published:
+        match = _JSON_LD_DATE_RE.search(html)
+        if match:
+            published = match.group(1)
+
+    return {'published_time': published, 'image': find_image(soup, base_url)}
+
+
+def fetch_metadata(url, headers, session=None, max_bytes=HEAD_BUDGET):
+    """Fetch just the head of `url` and return its metadata dict (None on failure)."""
+    try:
+        html, _ = fetch_head(url, headers, session=session, max_bytes=max_bytes)
+    except Exception as e:
+        print(f"Metadata fetch error for {url}: {e}")
+        return None
+    if not html:
+        return None
+    return parse_metadata(html, url)
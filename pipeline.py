@@ -0,0 +1,220 @@
+"""
+Briefing pipeline: crawl -> rank -> analyze -> publish.
+
+Each stage is a function from the previous stage's output to its own
+(typed with the dataclasses below). Outputs are checkpointed under
+cache/pipeline/<date>/, so a run can resume from any stage without
+repeating the earlier ones (e.g. re-run analysis without crawling again).
+
+The same Pipeline is used by the CLI, the Streamlit app and the scheduler,
+all in-process:
+
+    python pipeline.py                      # full run for today
+    python pipeline.py --from analyze       # reuse today's ranked candidates
+    python pipeline.py --date 2026-01-05 --from rank --to rank
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+import database
+import deep_analyzer
+from json_cache import cache_path
+
+STAGES = ('crawl', 'rank', 'analyze', 'publish')
+CHECKPOINT_DIR = cache_path('pipeline')
+
+
+@dataclass
+class CrawlOutput:
+    new_items: int
+    today_count: int
+
+
+@dataclass
+class RankOutput:
+    candidates: list
+
+
+@dataclass
+class AnalyzeOutput:
+    articles: list          # accepted (analyzed) articles
+    processed: int          # articles sent to analysis, accepted or not
+    top10: list
+    news_count: int         # size of the candidate pool
+
+
+@dataclass
+class PublishOutput:
+    briefing: dict
+
+
+OUTPUT_TYPES = {'crawl': CrawlOutput, 'rank': RankOutput, 'analyze': AnalyzeOutput, 'publish': PublishOutput}
+
+
+@dataclass
+class StageResult:
+    stage: str
+    seconds: float
+    output: object
+    resumed: bool = False   # loaded from a checkpoint instead of run
+
+
+@dataclass
+class PipelineResult:
+    date: str
+    stages: list = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def output(self, stage):
+        for result in self.stages:
+            if result.stage == stage:
+                return result.output
+        return None
+
+    @property
+    def briefing(self):
+        published = self.output('publish')
+        return published.briefing if published else None
+
+    def timing_report(self):
+        lines = []
+        for result in self.stages:
+            note = " (checkpoint)" if result.resumed else ""
+            lines.append(f"  {result.stage:<8} {result.seconds:7.2f}s{note}")
+        total = sum(result.seconds for result in self.stages)
+        lines.append(f"  {'total':<8} {total:7.2f}s")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    def __init__(self, target_date=None, log=print, checkpoint_dir=CHECKPOINT_DIR):
+        self.target_date = deep_analyzer.resolve_target_date(target_date)
+        self.date_str = self.target_date.strftime('%Y-%m-%d')
+        self.log = log
+        self.checkpoint_dir = os.path.join(checkpoint_dir, self.date_str)
+
+    # --- Stages ---
+    def crawl(self, _=None):
+        from crawler import NewsCrawler
+        database.init_db()
+        initial_count = database.get_today_news_count()
+        NewsCrawler().run()
+        today_count = database.get_today_news_count()
+        return CrawlOutput(new_items=today_count - initial_count, today_count=today_count)
+
+    def rank(self, _=None):
+        return RankOutput(candidates=deep_analyzer.rank_candidates(self.target_date))
+
+    def analyze(self, ranked):
+        articles, processed = deep_analyzer.analyze_candidates(ranked.candidates, self.target_date)
+        top10 = deep_analyzer.select_final_top10(articles)
+        return AnalyzeOutput(articles=articles, processed=processed, top10=top10,
+                             news_count=len(ranked.candidates))
+
+    def publish(self, analyzed):
+        stats = {"processed": analyzed.processed, "accepted": len(analyzed.articles),
+                 "final_selected": len(analyzed.top10)}
+        briefing = deep_analyzer.publish_briefing(self.target_date, analyzed.top10, analyzed.news_count, stats)
+        return PublishOutput(briefing=briefing)
+
+    # --- Checkpoints ---
+    def _checkpoint_path(self, stage):
+        return os.path.join(self.checkpoint_dir, f"{stage}.json")
+
+    def save_checkpoint(self, stage, output):
+        path = self._checkpoint_path(stage)
+        try:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                # default=str: Firestore rows carry datetimes (created_at)
+                json.dump(asdict(output), f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.log(f"Pipeline: could not save {stage} checkpoint: {e}")
+
+    def load_checkpoint(self, stage):
+        """Saved output of `stage` for this date, or None."""
+        path = self._checkpoint_path(stage)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return OUTPUT_TYPES[stage](**json.load(f))
+
+    # --- Run ---
+    def run(self, start_at='crawl', stop_after='publish'):
+        """
+        Run stages start_at..stop_after. The input of start_at comes from the
+        previous stage's checkpoint. Stage errors are caught and reported in
+        the result (the earlier stages' outputs stay checkpointed).
+        """
+        if start_at not in STAGES or stop_after not in STAGES:
+            raise ValueError(f"Unknown stage; expected one of {', '.join(STAGES)}")
+        first, last = STAGES.index(start_at), STAGES.index(stop_after)
+        result = PipelineResult(date=self.date_str)
+
+        previous = None
+        if first > 0:
+            previous_stage = STAGES[first - 1]
+            previous = self.load_checkpoint(previous_stage)
+            if previous is None and previous_stage != 'crawl':
+                result.error = f"No {previous_stage} checkpoint for {self.date_str}; run from '{previous_stage}' first."
+                self.log(f"Pipeline: {result.error}")
+                return result
+            if previous is not None:
+                result.stages.append(StageResult(previous_stage, 0.0, previous, resumed=True))
+
+        try:
+            for stage in STAGES[first:last + 1]:
+                self.log(f"Pipeline: [{stage}] starting...")
+                start = time.perf_counter()
+                try:
+                    output = getattr(self, stage)(previous)
+                except Exception as e:
+                    result.error = f"{stage} failed: {e}"
+                    self.log(f"Pipeline: {result.error}")
+                    traceback.print_exc()
+                    break
+                elapsed = time.perf_counter() - start
+                self.save_checkpoint(stage, output)
+                result.stages.append(StageResult(stage, elapsed, output))
+                self.log(f"Pipeline: [{stage}] done in {elapsed:.2f}s")
+                previous = output
+        finally:
+            deep_analyzer.cleanup_playwright()
+
+        self.log("Pipeline timing:\n" + result.timing_report())
+        return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--date', help='briefing date (YYYY-MM-DD, default: today)')
+    arg_parser.add_argument('--from', dest='start_at', choices=STAGES, default='crawl', help='first stage to run')
+    arg_parser.add_argument('--to', dest='stop_after', choices=STAGES, default='publish', help='last stage to run')
+    args = arg_parser.parse_args()
+
+    # UTF-8 console output on Windows (crawler.py no longer rewraps streams on import)
+    for stream in (sys.stdout, sys.stderr):
+        if sys.platform.startswith('win') and hasattr(stream, 'reconfigure'):
+            stream.reconfigure(encoding='utf-8', errors='replace')
+
+    result = Pipeline(args.date).run(args.start_at, args.stop_after)
+    if not result.ok:
+        print(f"CRITICAL PIPELINE ERROR: {result.error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Speculative article prefetching.
+
+While the AI editor call is in flight, the highest-scoring candidates are
+very likely to be chosen, so their content is fetched in the background.
+Once the selection is known, fetches for rejected items are cancelled (or
+their results discarded if already running) and the analysis loop takes
+prefetched results instead of fetching again.
+
+The fetch function runs on worker threads, so it must be HTTP-only
+(Playwright's sync API is bound to the thread that started it).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from jobs import inherit_output
+
+MAX_WORKERS = 4
+
+
+class Prefetcher:
+    def __init__(self, fetch, key=lambda item: item['url'], max_workers=MAX_WORKERS):
+        """`fetch(item)` returns the result to hand back from take()."""
+        self.fetch = fetch
+        self.key = key
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch',
+                                       initializer=inherit_output())
+        self.futures = {}
+        self.started = 0
+        self.cancelled = 0
+        self.discarded = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, items):
+        """Begin fetching `items` (in order) in the background."""
+        for item in items:
+            key = self.key(item)
+            if key in self.futures:
+                continue
+            self.futures[key] = self.pool.submit(self.fetch, item)
+            self.started += 1
+
+    def keep(self, items):
+        """Cancel prefetches for everything not in `items` (the editor's selection)."""
+        wanted = {self.key(item) for item in items}
+        for key in list(self.futures):
+            if key in wanted:
+                continue
+            future = self.futures.pop(key)
+            if future.cancel():
+                self.cancelled += 1
+            else:
+                self.discarded += 1  # already running/done: result is dropped
+
+    def take(self, item, usable=lambda result: True):
+        """
+        The prefetched result for `item` (waiting for it if still running),
+        or None if it wasn't prefetched, failed, or isn't `usable`.
+        """
+        future = self.futures.pop(self.key(item), None)
+        if future is None:
+            self.misses += 1
+            return None
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Prefetch failed for {self.key(item)}: {e}")
+            result = None
+        if result is None or not usable(result):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def close(self):
+        """Stop outstanding work (pending fetches are cancelled)."""
+        for future in self.futures.values():
+            if future.cancel():
+                self.cancelled += 1
+        self.futures.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (f"Prefetch: {self.started} started, {self.cancelled} cancelled, {self.discarded} discarded; "
+                f"hit rate {self.hits}/{lookups} ({rate:.0f}%)")
@@ -0,0 +1,343 @@
+"""
+Static publishing of briefings.
+
+When a briefing is saved (database briefing listener) it is rendered once
+to static files under public/, which any static file server or CDN can
+serve without Streamlit or database reads:
+
+    public/index.html                    latest briefing
+    public/briefings/<date>.html         one page per briefing
+    public/briefings/<date>.<hash>.json  briefing data (immutable)
+    public/briefings/<date>.json         same, at a stable URL
+    public/feed.json                     JSON Feed of recent briefings
+    public/feed.xml                      RSS 2.0 of recent briefings
+    public/assets/style.<hash>.css       stylesheet
+    public/manifest.json                 date -> content hash and file names
+
+<hash> is a content hash, so hashed files can be cached forever; pages
+and feeds only change when a briefing's content does. The card markup is
+shared with app.py (render_summary_html / render_cards_html).
+
+Usage:
+    python publisher.py                 # (re)publish every briefing in the DB
+    python publisher.py --date 2026-01-22
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from email.utils import format_datetime
+from html import escape
+
+import database
+
+PUBLIC_DIR = 'public'
+CSS_SOURCE = os.path.join('assets', 'style.css')
+FEED_BRIEFINGS = 14         # briefings listed in feed.json / feed.xml
+SITE_TITLE = 'AI News Radar'
+# Absolute base URL of the published site, for feed links (optional)
+SITE_URL = os.environ.get('PUBLIC_SITE_URL', '').rstrip('/')
+
+# 分類標籤對應的顯示名稱和 CSS class
+CATEGORY_DISPLAY = {
+    'Breaking': ('Breaking', 'tag-breaking'),
+    'Tools': ('Tools', 'tag-tools'),
+    'Business': ('Business', 'tag-business'),
+    'Creative': ('Creative', 'tag-creative'),
+    'Research': ('Research', 'tag-research'),
+    'Rules': ('Rules', 'tag-rules'),
+    'Risk': ('Risk', 'tag-risk'),
+}
+
+
+# --- Rendering (shared with app.py) ---
+def render_summary_html(daily_summary):
+    if not daily_summary:
+        return ''
+    return f'''
+<div class="daily-summary-card">
+    <div class="daily-summary-title">今日新聞總結</div>
+    <div class="daily-summary-content">{escape(daily_summary, quote=False)}</div>
+</div>
+'''
+
+
+def render_cards_html(top10_list):
+    """5x2 grid of text cards for the (up to) 10 items."""
+    html_cards = ['<div class="news-grid-responsive">']
+    for i, item in enumerate(top10_list[:10]):  # Ensure max 10
+        rank = i + 1
+        title = escape(item.get('title') or 'No Title', quote=False)
+        source = escape(item.get('source') or 'Unknown', quote=False)
+        url = escape(item.get('url') or '#')
+        rundown = escape(item.get('ai_rundown') or '尚無摘要', quote=False)
+
+        category_name, category_class = CATEGORY_DISPLAY.get(item.get('ai_category', ''), ('', ''))
+        # 只在有分類時顯示標籤
+        category_tag = f'<span class="news-category-tag {category_class}">{category_name}</span>' if category_name else ''
+
+        html_cards.append(f'''
+<div class="news-card-text-only">
+<div class="card-rank">#{rank:02d}</div>
+<a href="{url}" target="_blank" class="card-title">{title}</a>
+<div class="card-meta">
+<span class="news-source">{source}</span>
+{category_tag}
+</div>
+<div class="card-summary">
+{rundown}
+</div>
+</div>
+''')
+    html_cards.append('</div>')
+    return "".join(html_cards)
+
+
+def is_final_briefing(data):
+    """
+    True for a briefing saved by deep_analyzer.publish_briefing. The
+    incremental saves made during analysis have no final_selected count.
+    """
+    return ((data or {}).get('analysis_stats') or {}).get('final_selected') is not None
+
+
+def top10_items(data):
+    return [item for item in (data or {}).get('top10') or [] if item is not None]
+
+
+# --- Files ---
+def content_hash(data):
+    """Short hash of a briefing's canonical JSON."""
+    canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+
+def _write(path, content):
+    """Atomic write (readers never see a half-written file)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with open(tmp_path, mode, **({} if mode == 'wb' else {'encoding': 'utf-8'})) as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _site_url(path):
+    return f"{SITE_URL}/{path}" if SITE_URL else path
+
+
+def compact_briefing(date_str, data):
+    """The fields readers need (no scoring internals)."""
+    items = []
+    for item in top10_items(data):
+        items.append({
+            'rank': item.get('rank'),
+            'title': item.get('title'),
+            'url': item.get('url'),
+            'source': item.get('source'),
+            'category': item.get('ai_category'),
+            'published_at': item.get('published_at'),
+            'image_url': item.get('image_url'),
+            'rundown': item.get('ai_rundown'),
+        })
+    return {
+        'date': date_str,
+        'generated_at': data.get('generated_at'),
+        'daily_briefing': data.get('daily_briefing'),
+        'top10': items,
+    }
+
+
+class Publisher:
+    def __init__(self, out_dir=PUBLIC_DIR):
+        self.out_dir = out_dir
+        self.manifest_path = os.path.join(out_dir, 'manifest.json')
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'briefings': {}, 'css': None}
+
+    def publish_css(self, manifest):
+        """Copy style.css under a content-hashed name; returns its relative path."""
+        try:
+            with open(CSS_SOURCE, 'rb') as f:
+                css = f.read()
+        except OSError:
+            return None
+        name = f"style.{hashlib.sha256(css).hexdigest()[:12]}.css"
+        path = os.path.join(self.out_dir, 'assets', name)
+        if not os.path.exists(path):
+            _write(path, css)
+        manifest['css'] = f"assets/{name}"
+        return manifest['css']
+
+    def render_page(self, date_str, data, root, css_href, json_href):
+        """Standalone page; `root` is the relative path from the page to public/."""
+        css_link = f'<link rel="stylesheet" href="{root}{css_href}">' if css_href else ''
+        return f'''<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{date_str} 新聞AI摘要 - {SITE_TITLE}</title>
+{css_link}
+<link rel="alternate" type="application/json" href="{root}{json_href}">
+<link rel="alternate" type="application/rss+xml" title="{SITE_TITLE}" href="{root}feed.xml">
+</head>
+<body>
+<main style="max-width: 1200px; margin: 0 auto; padding: 24px;">
+<h3>{date_str} 新聞AI摘要</h3>
+<hr>
+{render_summary_html(data.get('daily_briefing'))}
+{render_cards_html(top10_items(data))}
+</main>
+</body>
+</html>
+'''
+
+    def publish(self, date_str, data):
+        """Render one briefing; no-op if its content hash is already published."""
+        if not top10_items(data):
+            return False
+        manifest = self.load_manifest()
+        digest = content_hash(data)
+        css_href = self.publish_css(manifest)
+        entry = manifest['briefings'].get(date_str)
+        if entry and entry.get('hash') == digest and entry.get('css') == css_href:
+            return False
+
+        compact = json.dumps(compact_briefing(date_str, data), ensure_ascii=False, separators=(',', ':'))
+        json_name = f"{date_str}.{digest}.json"
+        briefing_dir = os.path.join(self.out_dir, 'briefings')
+        _write(os.path.join(briefing_dir, json_name), compact)
+        _write(os.path.join(briefing_dir, f"{date_str}.json"), compact)
+        if entry and entry.get('json') and entry['json'] != json_name:
+            try:
+                os.remove(os.path.join(briefing_dir, entry['json']))
+            except OSError:
+                pass
+
+        page = self.render_page(date_str, data, '../', css_href, f"briefings/{json_name}")
+        _write(os.path.join(briefing_dir, f"{date_str}.html"), page)
+
+        manifest['briefings'][date_str] = {
+            'hash': digest,
+            'css': css_href,
+            'json': json_name,
+            'html': f"{date_str}.html",
+            'generated_at': data.get('generated_at'),
+        }
+        latest = max(manifest['briefings'])
+        if latest == date_str:
+            index = self.render_page(date_str, data, '', css_href, f"briefings/{json_name}")
+            _write(os.path.join(self.out_dir, 'index.html'), index)
+
+        self.publish_feeds(manifest)
+        _write(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True))
+        print(f"Published briefing {date_str} ({digest}) to {self.out_dir}/")
+        return True
+
+    def publish_feeds(self, manifest):
+        """feed.json (JSON Feed 1.1) and feed.xml (RSS 2.0) of the newest briefings."""
+        dates = sorted(manifest['briefings'], reverse=True)[:FEED_BRIEFINGS]
+        json_items = []
+        rss_items = []
+        for date_str in dates:
+            entry = manifest['briefings'][date_str]
+            try:
+                with open(os.path.join(self.out_dir, 'briefings', entry['json']), 'r', encoding='utf-8') as f:
+                    briefing = json.load(f)
+            except (OSError, ValueError):
+                continue
+            page_url = _site_url(f"briefings/{entry['html']}")
+            try:
+                published = datetime.strptime(entry.get('generated_at') or date_str, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                published = datetime.strptime(date_str, '%Y-%m-%d')
+            title = f"{date_str} 新聞AI摘要"
+            summary = briefing.get('daily_briefing') or ''
+            headlines = [item['title'] for item in briefing['top10'] if item.get('title')]
+
+            json_items.append({
+                # Stable per date: a regenerated briefing updates its item, not a new one
+                'id': date_str,
+                'url': page_url,
+                'title': title,
+                'content_text': summary,
+                'summary': " / ".join(headlines),
+                'date_published': published.isoformat(),
+                '_briefing': _site_url(f"briefings/{entry['json']}"),
+            })
+            rss_items.append(f'''<item>
+<title>{escape(title)}</title>
+<link>{escape(page_url)}</link>
+<guid isPermaLink="false">{escape(date_str)}</guid>
+<pubDate>{format_datetime(published.astimezone())}</pubDate>
+<description>{escape(summary or " / ".join(headlines))}</description>
+</item>''')
+
+        feed = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': SITE_TITLE,
+            'home_page_url': _site_url('index.html'),
+            'feed_url': _site_url('feed.json'),
+            'items': json_items,
+        }
+        _write(os.path.join(self.out_dir, 'feed.json'), json.dumps(feed, ensure_ascii=False, separators=(',', ':')))
+        rss = f'''<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+<channel>
+<title>{escape(SITE_TITLE)}</title>
+<link>{escape(_site_url('index.html'))}</link>
+<description>{escape(SITE_TITLE)} daily briefings</description>
+{chr(10).join(rss_items)}
+</channel>
+</rss>
+'''
+        _write(os.path.join(self.out_dir, 'feed.xml'), rss)
+
+
+_publisher = Publisher()
+
+
+def on_briefing_saved(date_str, data):
+    # Progress saves during analysis would publish half-finished briefings
+    if not is_final_briefing(data):
+        return
+    try:
+        _publisher.publish(date_str, data)
+    except Exception as e:
+        print(f"Static publish failed for {date_str}: {e}")
+
+
+database.add_briefing_listener(on_briefing_saved)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--date', help='publish only this briefing (YYYY-MM-DD)')
+    arg_parser.add_argument('--out', default=PUBLIC_DIR, help='output directory')
+    args = arg_parser.parse_args()
+
+    publisher = Publisher(args.out)
+    dates = [args.date] if args.date else sorted(database.list_briefings())
+    published = 0
+    for date_str in dates:
+        data = database.get_briefing(date_str)
+        if not is_final_briefing(data):
+            # Missing, or a progress save of an unfinished analysis
+            print(f"Skipping {date_str}: no final briefing")
+            continue
+        if publisher.publish(date_str, data):
+            published += 1
+    print(f"Published {published} of {len(dates)} briefings.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
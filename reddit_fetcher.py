@@ -0,0 +1,172 @@
+"""
+Reddit thread content over plain HTTP.
+
+HackingAI items link to a Reddit discussion. Instead of rendering the thread
+in a browser, the public JSON representation (<thread>/.json) is fetched on a
+pooled session; if Reddit refuses it (rate limit, 403), the server-rendered
+old.reddit.com page is parsed instead. Threads are cached per thread ID
+(cache/reddit_threads.json).
+"""
+import re
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from html_parsing import make_soup
+from json_cache import JsonCache, cache_path
+
+MAX_COMMENTS = 8
+MAX_TEXT_CHARS = 5000
+CACHE_MAX_AGE_DAYS = 1  # comments keep arriving; refresh daily
+
+# Reddit blocks generic browser UAs on .json; it asks for a descriptive one
+HEADERS = {
+    'User-Agent': 'python:ai-news-briefing:1.0 (discussion reader)',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+_THREAD_ID_RE = re.compile(r'/comments/([a-z0-9]+)', re.IGNORECASE)
+
+_session = None
+_cache = None
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        _session.mount('https://', adapter)
+    return _session
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = JsonCache(cache_path('reddit_threads.json'), max_age_days=CACHE_MAX_AGE_DAYS)
+    return _cache
+
+
+def thread_id(url):
+    """Reddit thread ID from a discussion URL (or None)."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.netloc.endswith('reddit.com'):
+        match = _THREAD_ID_RE.search(parsed.path)
+        return match.group(1).lower() if match else None
+    if parsed.netloc == 'redd.it':
+        # redd.it/<id> short links
+        return parsed.path.strip('/').split('/')[0].lower() or None
+    return None
+
+
+def fetch_thread_json(tid):
+    """Post and top comments from the .json API, or None."""
+    response = _get_session().get(
+        f'https://www.reddit.com/comments/{tid}/.json',
+        params={'limit': MAX_COMMENTS, 'depth': 1, 'sort': 'top', 'raw_json': 1},
+        timeout=10,
+    )
+    if response.status_code != 200:
+        print(f"Reddit JSON returned {response.status_code} for {tid}")
+        return None
+
+    listing = response.json()
+    post = listing[0]['data']['children'][0]['data']
+    comments = []
+    for child in listing[1]['data']['children']:
+        if child.get('kind') != 't1':
+            continue  # 'more' placeholders
+        body = (child['data'].get('body') or '').strip()
+        if body and body not in ('[deleted]', '[removed]'):
+            comments.append(body)
+        if len(comments) >= MAX_COMMENTS:
+            break
+
+    return {
+        'title': post.get('title', ''),
+        'selftext': post.get('selftext', ''),
+        'link_url': post.get('url', ''),
+        'subreddit': post.get('subreddit', ''),
+        'score': post.get('score'),
+        'comments': comments,
+        'via': 'json',
+    }
+
+
+def fetch_thread_html(tid):
+    """Same fields scraped from old.reddit.com (server-rendered), or None."""
+    response = _get_session().get(f'https://old.reddit.com/comments/{tid}/', params={'sort': 'top'}, timeout=10)
+    if response.status_code != 200:
+        print(f"old.reddit returned {response.status_code} for {tid}")
+        return None
+
+    soup = make_soup(response.text)
+    post = soup.select_one('div.thing.link')
+    if not post:
+        return None
+    title = post.select_one('a.title')
+    body = post.select_one('div.expando div.md')
+    comments = []
+    for md in soup.select('div.commentarea div.thing.comment div.entry div.md'):
+        text = md.get_text('\n', strip=True)
+        if text:
+            comments.append(text)
+        if len(comments) >= MAX_COMMENTS:
+            break
+
+    score = post.get('data-score')
+    return {
+        'title': title.get_text(strip=True) if title else '',
+        'selftext': body.get_text('\n', strip=True) if body else '',
+        'link_url': post.get('data-url', ''),
+        'subreddit': post.get('data-subreddit', ''),
+        'score': int(score) if score and score.lstrip('-').isdigit() else None,
+        'comments': comments,
+        'via': 'old.reddit',
+    }
+
+
+def fetch_thread(url):
+    """
+    Fetch a Reddit thread (post + top comments). Returns a dict with title,
+    selftext, link_url, subreddit, score, comments and via; None on failure.
+    """
+    tid = thread_id(url)
+    if not tid:
+        return None
+
+    cache = _get_cache()
+    cached = cache.get(tid)
+    if cached:
+        return cached
+
+    thread = None
+    for fetch in (fetch_thread_json, fetch_thread_html):
+        try:
+            thread = fetch(tid)
+        except Exception as e:
+            print(f"Reddit fetch error ({fetch.__name__}, {tid}): {e}")
+            thread = None
+        if thread:
+            break
+
+    if thread:
+        cache.set(tid, thread)
+        cache.save()
+    return thread
+
+
+def thread_text(thread, max_chars=MAX_TEXT_CHARS):
+    """Plain-text rendering of a thread for the analyzer prompt."""
+    parts = [thread['title']]
+    if thread.get('subreddit'):
+        parts.append(f"r/{thread['subreddit']}")
+    if thread.get('selftext'):
+        parts.append(thread['selftext'])
+    if thread.get('comments'):
+        parts.append("Top comments:\n" + "\n".join(f"- {comment}" for comment in thread['comments']))
+    return "\n\n".join(parts)[:max_chars]
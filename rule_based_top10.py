@@ -2,6 +2,7 @@ import os
 import json
 import database
 from datetime import datetime, timedelta
+from selection import select_by_quota
 
 # Source weights (1-10, higher = more authoritative)
 SOURCE_WEIGHTS = {
@@ -345,25 +346,7 @@ def generate_rule_based_top10(target_date=None):
         item['score'] = calculate_score(item)
         item['top10_category'] = categorize_news(item, sources_config)
     
-    # 3. Group by category
-    grouped = {
-        'Policy': [],
-        'Technology': [],
-        'Industry': [],
-        'Business': [],
-        'Risk': []
-    }
-    
-    for item in news:
-        cat = item['top10_category']
-        if cat in grouped:
-            grouped[cat].append(item)
-    
-    # Sort each group by score
-    for cat in grouped:
-        grouped[cat].sort(key=lambda x: x['score'], reverse=True)
-    
-    # 4. Select by quotas
+    # 3. Select by quotas, then fill remaining slots by score
     quotas = {
         'Policy': 2,
         'Technology': 2,
@@ -372,30 +355,21 @@ def generate_rule_based_top10(target_date=None):
         'Risk': 1
     }
     
-    top10 = []
-    for cat, count in quotas.items():
-        selected = grouped[cat][:count]
-        top10.extend(selected)
-    
-    # 5. Fill remaining slots if needed
-    if len(top10) < 10:
-        remaining = []
-        for cat in grouped:
-            for item in grouped[cat]:
-                if item not in top10:
-                    remaining.append(item)
-        remaining.sort(key=lambda x: x['score'], reverse=True)
-        top10.extend(remaining[:10-len(top10)])
-    
-    # 6. Final sort by score and add rank
-    top10.sort(key=lambda x: x['score'], reverse=True)
-    top10 = top10[:10]  # Ensure exactly 10
+    top10 = select_by_quota(
+        news, quotas,
+        category_of=lambda x: x['top10_category'],
+        limit=10,
+        score=lambda x: x['score']
+    )
     
     for i, item in enumerate(top10):
         item['rank'] = i + 1
     
-    # 7. Calculate stats
-    stats = {k: len(v) for k, v in grouped.items()}
+    # 4. Calculate stats
+    stats = {cat: 0 for cat in quotas}
+    for item in news:
+        if item['top10_category'] in stats:
+            stats[item['top10_category']] += 1
     
     result = {
         "date": target_date.strftime('%Y-%m-%d'),
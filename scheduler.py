@@ -0,0 +1,291 @@
+"""
+Crawl scheduler daemon: each source on its own, adaptive interval.
+
+Instead of crawling every source on every run, each source is crawled when
+it is due, and its interval follows its observed publish rate:
+
+    - new items found: the interval moves towards the one expected to find
+      TARGET_NEW_PER_CRAWL items per crawl (an EWMA of items/hour), so busy
+      sources (Google News, TLDR) are polled more often
+    - nothing new: the interval grows by IDLE_BACKOFF (quiet sources such
+      as RAND or Futurium are crawled a few times a day at most)
+    - fetch/parse failure: exponential backoff
+
+Intervals are clamped to [min, max] (per crawl type, overridable per source
+in sources.json with "min_interval_minutes" / "max_interval_minutes") and
+change by at most 2x per crawl. State lives in the database
+(database.get_source_states / save_source_state), so a restart picks up
+where it left off.
+
+Every loop also sends email outbox deliveries whose retry is due
+(email_delivery.py), so failed briefing emails go out without a manual run.
+
+Optionally the daily briefing is generated once a day after --briefing-at
+(Taipei time, like the briefing dates; pipeline.py, from the rank stage:
+the crawl is already continuous).
+
+Usage:
+    python scheduler.py                         # run forever
+    python scheduler.py --briefing-at 07:30     # ... and publish the daily briefing
+    python scheduler.py --once                  # crawl what is due now, then exit
+    python scheduler.py --status                # per-source intervals and rates
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+import database
+
+DEFAULT_INTERVAL = 60 * 60          # first interval for a source without history
+TARGET_NEW_PER_CRAWL = 3
+IDLE_BACKOFF = 1.5
+MAX_STEP = 2.0                      # interval changes at most x2 / /2 per crawl
+RATE_ALPHA = 0.3                    # EWMA weight of the latest crawl
+JITTER = 0.1                        # +-10% on the next due time, spreads sources out
+MAX_SLEEP = 60
+
+# (min, max) interval in minutes per crawl type
+INTERVAL_BOUNDS = {
+    'feed': (15, 12 * 60),
+    'json_api': (30, 24 * 60),
+    'static': (30, 24 * 60),
+    'dynamic': (60, 24 * 60),       # Playwright: expensive
+    'tldr_api': (60, 24 * 60),
+    'hackingai': (30, 24 * 60),
+}
+
+
+def load_sources():
+    with open('sources.json', 'r', encoding='utf-8') as f:
+        return [s for s in json.load(f) if not s.get('link_only')]
+
+
+def interval_bounds(source):
+    """(min, max) interval in seconds for a source."""
+    method = source.get('type', 'static')
+    low, high = INTERVAL_BOUNDS.get(method, INTERVAL_BOUNDS['static'])
+    low = source.get('min_interval_minutes', low)
+    high = max(source.get('max_interval_minutes', high), low)
+    return low * 60, high * 60
+
+
+def next_state(state, source, new_items, now):
+    """
+    Scheduling state after a crawl that found `new_items` (None: the crawl
+    failed). Pure function of its inputs, apart from the jitter.
+    """
+    low, high = interval_bounds(source)
+    state = dict(state)
+    interval = state.get('interval') or min(max(DEFAULT_INTERVAL, low), high)
+    last_crawl = state.get('last_crawl')
+
+    state['crawls'] = state.get('crawls', 0) + 1
+    if new_items is None:
+        state['failures'] = state.get('failures', 0) + 1
+        state['interval'] = round(interval)
+        state['next_due'] = now + min(interval * 2 ** state['failures'], high)
+        return state
+
+    state['failures'] = 0
+    state['total_new'] = state.get('total_new', 0) + new_items
+    state['last_new'] = new_items
+    if last_crawl:
+        hours = max(now - last_crawl, 60) / 3600
+        rate = new_items / hours
+        previous = state.get('rate')
+        state['rate'] = rate if previous is None else RATE_ALPHA * rate + (1 - RATE_ALPHA) * previous
+
+    if new_items == 0:
+        target = interval * IDLE_BACKOFF
+    elif state.get('rate'):
+        target = TARGET_NEW_PER_CRAWL / state['rate'] * 3600
+    else:
+        target = interval
+    interval = min(max(target, interval / MAX_STEP), interval * MAX_STEP)
+    interval = min(max(interval, low), high)
+
+    state['interval'] = round(interval)
+    state['last_crawl'] = now
+    state['next_due'] = now + interval * random.uniform(1 - JITTER, 1 + JITTER)
+    return state
+
+
+class CrawlScheduler:
+    def __init__(self, crawler=None, briefing_at=None, log=print):
+        if crawler is None:
+            from crawler import NewsCrawler
+            crawler = NewsCrawler()
+        self.crawler = crawler
+        self.briefing_at = briefing_at      # "HH:MM" or None
+        self.log = log
+        self.sources = [s for s in crawler.sources if not s.get('link_only')]
+        self.states = database.get_source_states()
+        self.stop_event = threading.Event()
+        self.briefing_retry_at = 0
+
+    def due_sources(self, now=None):
+        now = now or time.time()
+        due = [s for s in self.sources if self.states.get(s['name'], {}).get('next_due', 0) <= now]
+        # Most overdue first
+        return sorted(due, key=lambda s: self.states.get(s['name'], {}).get('next_due', 0))
+
+    def seconds_until_due(self, now=None):
+        now = now or time.time()
+        if not self.sources:
+            return MAX_SLEEP
+        next_due = min(self.states.get(s['name'], {}).get('next_due', 0) for s in self.sources)
+        return max(0, next_due - now)
+
+    def crawl(self, source):
+        name = source['name']
+        start = time.time()
+        try:
+            new_items = self.crawler.crawl_source(source)
+        except Exception as e:
+            self.log(f"Scheduler: error crawling {name}: {repr(e)}")
+            new_items = None
+        # Re-read: the crawl saved the source's watermark into the same state
+        state = next_state(database.get_source_state(name), source, new_items, time.time())
+        state['duration'] = round(time.time() - start, 2)
+        self.states[name] = state
+        database.save_source_state(name, state)
+        outcome = "failed" if new_items is None else f"{new_items} new"
+        self.log(f"Scheduler: {name}: {outcome}, next in {(state['next_due'] - time.time()) / 60:.0f} min")
+        return new_items
+
+    def run_due(self):
+        """Crawl every due source once; returns the number of new items."""
+        due = self.due_sources()
+        if not due:
+            return 0
+        self.log(f"Scheduler: {len(due)} of {len(self.sources)} sources due")
+        total = 0
+        try:
+            for source in due:
+                if self.stop_event.is_set():
+                    break
+                total += self.crawl(source) or 0
+        finally:
+            # Don't keep a browser open between cycles
+            self.crawler.close()
+        return total
+
+    def flush_outbox(self):
+        """Send email deliveries whose retry is due; None on errors."""
+        import email_delivery
+        if not os.path.exists(email_delivery.OUTBOX_DB):
+            return {}   # nothing was ever queued here
+        try:
+            counts = email_delivery.deliver_due()
+        except Exception as e:
+            self.log(f"Scheduler: email outbox error: {repr(e)}")
+            return None
+        if any(counts.values()):
+            self.log(f"Scheduler: email outbox: {counts}")
+        return counts
+
+    def briefing_due(self, now=None):
+        if not self.briefing_at:
+            return False
+        if now is None:
+            # The pipeline saves the briefing under the Taipei date, whatever the host's zone
+            from deep_analyzer import get_taiwan_now
+            now = get_taiwan_now()
+        if now.strftime('%H:%M') < self.briefing_at:
+            return False
+        # A progress save from a run that failed mid-analysis doesn't count
+        from publisher import is_final_briefing
+        return not is_final_briefing(database.get_briefing(now.strftime('%Y-%m-%d')))
+
+    def run_briefing(self):
+        import pipeline
+        self.log("Scheduler: generating the daily briefing...")
+        # Don't retry on every loop, also when a run succeeded without leaving a
+        # final briefing (nothing new to publish, save failed): try again in an hour
+        self.briefing_retry_at = time.time() + 3600
+        result = pipeline.Pipeline(log=self.log).run(start_at='rank')
+        if not result.ok:
+            self.log(f"Scheduler: briefing failed: {result.error}")
+        return result
+
+    def run_forever(self):
+        self.log(f"Scheduler: {len(self.sources)} sources"
+                 + (f", daily briefing after {self.briefing_at}" if self.briefing_at else ""))
+        while not self.stop_event.is_set():
+            self.run_due()
+            if self.briefing_due() and time.time() >= self.briefing_retry_at:
+                self.run_briefing()
+            self.flush_outbox()
+            self.stop_event.wait(min(self.seconds_until_due(), MAX_SLEEP))
+        self.log("Scheduler stopped.")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def print_status(sources, states):
+    now = time.time()
+    header = f"{'Source':<28} {'interval':>9} {'next in':>8} {'new/h':>7} {'last':>5} {'total':>6} {'fail':>5}"
+    print(header)
+    print("-" * len(header))
+    for source in sources:
+        state = states.get(source['name'])
+        if not state:
+            print(f"{source['name'][:28]:<28} {'-':>9} {'due':>8}")
+            continue
+        next_in = max(0, state.get('next_due', 0) - now) / 60
+        print(f"{source['name'][:28]:<28} {state.get('interval', 0) / 60:>8.0f}m {next_in:>7.0f}m "
+              f"{state.get('rate') or 0:>7.2f} {state.get('last_new', '-'):>5} "
+              f"{state.get('total_new', 0):>6} {state.get('failures', 0):>5}")
+
+
+def briefing_time(value):
+    """argparse type: zero-padded HH:MM (briefing_due compares strings)."""
+    try:
+        return datetime.strptime(value, '%H:%M').strftime('%H:%M')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HH:MM, got {value!r}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--once', action='store_true', help='crawl the sources due now and exit')
+    arg_parser.add_argument('--status', action='store_true', help='show per-source scheduling state')
+    arg_parser.add_argument('--briefing-at', metavar='HH:MM', type=briefing_time, help='generate the daily briefing after this time (Taipei)')
+    args = arg_parser.parse_args()
+
+    # UTF-8 console output on Windows (crawler.py no longer rewraps streams on import)
+    for stream in (sys.stdout, sys.stderr):
+        if sys.platform.startswith('win') and hasattr(stream, 'reconfigure'):
+            stream.reconfigure(encoding='utf-8', errors='replace')
+
+    database.init_db()
+    if args.status:
+        print_status(load_sources(), database.get_source_states())
+        return 0
+
+    scheduler = CrawlScheduler(briefing_at=args.briefing_at)
+    if args.once:
+        total = scheduler.run_due()
+        scheduler.flush_outbox()
+        print(f"Scheduler: {total} new items")
+        return 0
+
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.crawler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
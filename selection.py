@@ -0,0 +1,151 @@
+"""
+Shared Top 10 selection engine.
+
+Used by rule_based_top10, top_news_analyzer and deep_analyzer to pick items
+under per-category quotas, per-source caps, group caps (e.g. Google News) and
+URL uniqueness. Candidates are kept in heaps and popped lazily, so picking k
+items out of n costs O(n + k log n) instead of a full sort per category, and
+membership checks are hash-set lookups instead of list scans.
+"""
+import heapq
+from collections import Counter
+
+
+def _default_score(item):
+    return item.get('score', 0) or 0
+
+
+def _default_key(item):
+    return item['url']
+
+
+def _default_source(item):
+    return item.get('source', 'Unknown')
+
+
+class QuotaSelector:
+    """
+    Greedy bounded top-k selector.
+
+    limit          -- maximum number of items to select
+    score          -- callable returning the ranking score of an item
+    key            -- callable returning the uniqueness key (default: URL)
+    max_per_source -- optional cap on items sharing the same source
+    caps           -- optional list of (predicate, max_count) group caps
+    accept         -- optional extra predicate(item, selected) -> bool
+    """
+
+    def __init__(self, limit, score=_default_score, key=_default_key,
+                 source=_default_source, max_per_source=None, caps=None, accept=None):
+        self.limit = limit
+        self.score = score
+        self.key = key
+        self.source = source
+        self.max_per_source = max_per_source
+        self.caps = list(caps or [])
+        self.accept = accept
+
+        self.selected = []
+        self._seen = set()
+        self._source_counts = Counter()
+        self._cap_counts = [0] * len(self.caps)
+
+    def __len__(self):
+        return len(self.selected)
+
+    def __contains__(self, item):
+        return self.key(item) in self._seen
+
+    def is_full(self):
+        return len(self.selected) >= self.limit
+
+    def offer(self, item, relax_caps=False):
+        """Try to add a single item. Returns True if it was selected."""
+        if item is None or self.is_full():
+            return False
+
+        item_key = self.key(item)
+        if item_key in self._seen:
+            return False
+
+        if self.max_per_source is not None:
+            if self._source_counts[self.source(item)] >= self.max_per_source:
+                return False
+
+        matched_caps = []
+        for i, (predicate, max_count) in enumerate(self.caps):
+            if predicate(item):
+                if not relax_caps and self._cap_counts[i] >= max_count:
+                    return False
+                matched_caps.append(i)
+
+        if self.accept and not self.accept(item, self.selected):
+            return False
+
+        self.selected.append(item)
+        self._seen.add(item_key)
+        self._source_counts[self.source(item)] += 1
+        for i in matched_caps:
+            self._cap_counts[i] += 1
+        return True
+
+    def _heap(self, items):
+        # (negated score, input position, item): the position keeps ties in
+        # input order (like a stable sort) and stops heapq comparing dicts.
+        heap = [(-self.score(item), i, item) for i, item in enumerate(items)
+                if item is not None and self.key(item) not in self._seen]
+        heapq.heapify(heap)
+        return heap
+
+    def take_top(self, items, count=None, relax_caps=False):
+        """
+        Select up to `count` of the best-scoring eligible items (default: until full).
+        Returns the list of items selected by this call.
+        """
+        heap = self._heap(items)
+        taken = []
+        while heap and not self.is_full() and (count is None or len(taken) < count):
+            _, _, item = heapq.heappop(heap)
+            if self.offer(item, relax_caps=relax_caps):
+                taken.append(item)
+        return taken
+
+    def fill(self, items, relax_caps=False):
+        """Fill the remaining slots with the best-scoring eligible items."""
+        return self.take_top(items, relax_caps=relax_caps)
+
+    def take_quotas(self, items, quotas, category_of):
+        """
+        Select the best items per category according to `quotas` ({category: count}),
+        visiting categories in quota order. Items whose category is not in
+        `quotas` are ignored. Returns {category: [selected items]}.
+        """
+        buckets = {cat: [] for cat in quotas}
+        for item in items:
+            if item is None:
+                continue
+            cat = category_of(item)
+            if cat in buckets:
+                buckets[cat].append(item)
+
+        taken = {}
+        for cat, count in quotas.items():
+            if self.is_full():
+                break
+            taken[cat] = self.take_top(buckets[cat], count)
+        return taken
+
+    def ranked(self):
+        """Selected items sorted by score (descending, ties in selection order)."""
+        return sorted(self.selected, key=self.score, reverse=True)
+
+
+def select_by_quota(items, quotas, category_of, limit=10, score=_default_score, **kwargs):
+    """
+    Pick `limit` items: first fill each category quota, then fill the remaining
+    slots by score. Returns the selection sorted by score (descending).
+    """
+    selector = QuotaSelector(limit, score=score, **kwargs)
+    selector.take_quotas(items, quotas, category_of)
+    selector.fill(items)
+    return selector.ranked()
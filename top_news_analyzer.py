@@ -1,7 +1,8 @@
 import os
 import json
 import database
-import google.generativeai as genai
+from selection import select_by_quota
+import llm_client
 from datetime import datetime, timedelta
 import time
 
@@ -83,17 +84,13 @@ def analyze_with_gemini(news_items):
     Analyze news items using Gemini API to categorize and score them.
     """
     # Check for API Key
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        # Try to find it in a .env file or similar if not set
-        # For now, raise error or return empty
+    try:
+        # Using gemini-2.0-flash as it is available in this environment
+        client = llm_client.get_client('gemini-2.0-flash')
+    except ValueError:
         print("Error: GOOGLE_API_KEY not found in environment variables.")
         return []
 
-    genai.configure(api_key=api_key)
-    # Using gemini-2.0-flash as it is available in this environment
-    model = genai.GenerativeModel('gemini-2.0-flash')
-
     # Prepare prompt
     # We might need to batch this if there are too many items.
     # Let's process in batches of 10-20 to avoid token limits.
@@ -157,17 +154,8 @@ def analyze_with_gemini(news_items):
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = model.generate_content(prompt)
-                # Parse JSON from response
-                text = response.text
-                
-                # Clean up markdown code blocks if present
-                if "```json" in text:
-                    text = text.split("```json")[1].split("```")[0]
-                elif "```" in text:
-                    text = text.split("```")[1].split("```")[0]
-                    
-                batch_results = json.loads(text)
+                # Parse JSON array from response
+                batch_results = client.analyze(prompt, opener='[')
                 
                 # Merge results back to news items
                 for res in batch_results:
@@ -206,36 +194,6 @@ def select_top_10(analyzed_news):
     - Business: 2
     - Risk: 1
     """
-    # Group by category
-    grouped = {
-        'Policy': [],
-        'Technology': [],
-        'Industry': [],
-        'Business': [],
-        'Risk': []
-    }
-    
-    # Sort all by score desc first to handle duplicates or same scores
-    # Also handle deduplication here? 
-    # Let's do a simple deduplication by title similarity or just assume crawler did some.
-    # The crawler has url_exists check, so exact duplicates are gone.
-    # But same news from different sources might exist.
-    # For now, let's just sort by score.
-    
-    sorted_news = sorted(analyzed_news, key=lambda x: x.get('impact_score', 0), reverse=True)
-    
-    # Assign to groups
-    for item in sorted_news:
-        cat = item.get('analysis_category')
-        if cat in grouped:
-            grouped[cat].append(item)
-        else:
-            # Fallback or map other categories
-            # If Gemini returns something else, maybe put in Industry or Business?
-            # Let's put in Industry as default
-            grouped['Industry'].append(item)
-
-    # Quotas
     quotas = {
         'Policy': 2,
         'Technology': 2,
@@ -244,42 +202,19 @@ def select_top_10(analyzed_news):
         'Risk': 1
     }
     
-    top_10 = []
-    used_ids = set() # To avoid duplicates if we fill from others
-    
-    # First pass: fill quotas
-    for cat, count in quotas.items():
-        candidates = grouped[cat]
-        # Sort by score again just in case
-        candidates.sort(key=lambda x: x.get('impact_score', 0), reverse=True)
-        
-        selected = candidates[:count]
-        top_10.extend(selected)
-        for item in selected:
-            used_ids.add(item['url']) # Use URL as ID
-            
-    # Check if we have 10
-    if len(top_10) < 10:
-        needed = 10 - len(top_10)
-        # Get all remaining items from all categories
-        remaining = []
-        for cat in grouped:
-            for item in grouped[cat]:
-                if item['url'] not in used_ids:
-                    remaining.append(item)
-        
-        # Sort remaining by score
-        remaining.sort(key=lambda x: x.get('impact_score', 0), reverse=True)
-        
-        # Fill
-        top_10.extend(remaining[:needed])
-        
-    # Final sort by rank (maybe by category order or just score?)
-    # User asked for:
-    # 輸出格式請只包含：排名（1–10）、新聞標題、來源、類型
-    # Usually Top 10 is sorted by importance (score).
+    # If Gemini returns some other category, count it as Industry
+    def category_of(item):
+        cat = item.get('analysis_category')
+        return cat if cat in quotas else 'Industry'
     
-    top_10.sort(key=lambda x: x.get('impact_score', 0), reverse=True)
+    # Fill quotas first, then remaining slots by score; sorted by importance (score).
+    # URL is used as the ID to avoid duplicates.
+    top_10 = select_by_quota(
+        analyzed_news, quotas,
+        category_of=category_of,
+        limit=10,
+        score=lambda x: x.get('impact_score', 0) or 0
+    )
     
     # Add rank
     for i, item in enumerate(top_10):
@@ -0,0 +1,94 @@
+"""
+Cached data access for the Streamlit app.
+
+Every rerun of app.py used to list the briefings, fetch them one by one
+until a non-empty one turned up and re-read style.css / sources.json; on
+Firestore that is several RPCs per page view. These wrappers serve repeat
+views from memory: briefing reads are cached with a TTL (other instances
+or scripts may write briefings too) and dropped as soon as this process
+saves a briefing (database briefing listener). Static files are cached
+until their mtime changes.
+"""
+import json
+import os
+
+import streamlit as st
+
+import database
+
+BRIEFING_TTL = 300          # seconds; covers briefings written by other processes
+NEWS_COUNT_TTL = 60
+CSS_PATH = os.path.join('assets', 'style.css')
+SOURCES_PATH = 'sources.json'
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+# --- Static files ---
+@st.cache_resource(show_spinner=False)
+def _read_css(path, mtime):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def load_css():
+    """Contents of assets/style.css ('' if missing)."""
+    mtime = _mtime(CSS_PATH)
+    return _read_css(CSS_PATH, mtime) if mtime is not None else ''
+
+
+@st.cache_data(show_spinner=False)
+def _read_sources(path, mtime):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_sources_config():
+    """sources.json (raises on a missing/invalid file, like json.load)."""
+    return _read_sources(SOURCES_PATH, _mtime(SOURCES_PATH))
+
+
+# --- Briefings ---
+@st.cache_data(ttl=BRIEFING_TTL, show_spinner=False)
+def list_briefings():
+    return database.list_briefings()
+
+
+@st.cache_data(ttl=BRIEFING_TTL, show_spinner=False)
+def get_briefing(date_str):
+    return database.get_briefing(date_str)
+
+
+@st.cache_data(ttl=BRIEFING_TTL, show_spinner=False)
+def latest_briefing():
+    """(date_str, briefing) of the newest briefing with a non-empty top10, or (None, None)."""
+    for date_str in list_briefings():
+        try:
+            data = get_briefing(date_str)
+        except Exception as e:
+            print(f"Error checking briefing for {date_str}: {e}")
+            continue
+        if data and any(item is not None for item in data.get('top10') or []):
+            return date_str, data
+    return None, None
+
+
+@st.cache_data(ttl=NEWS_COUNT_TTL, show_spinner=False)
+def get_today_news_count():
+    return database.get_today_news_count()
+
+
+def invalidate_briefings(date_str=None, data=None):
+    """Drop cached briefing reads (all dates: the list and 'latest' change too)."""
+    list_briefings.clear()
+    get_briefing.clear()
+    latest_briefing.clear()
+    get_today_news_count.clear()
+
+
+database.add_briefing_listener(invalidate_briefings)
@@ -0,0 +1,295 @@
+"""
+Bloom filter of every ingested news URL, for crawl-time dedup.
+
+NewsCrawler asks the filter before the database: a URL whose canonical
+form (url_utils.canonical_url) is not in the filter was definitely never
+stored, so the common "new link" case costs no database round trip (on
+Firestore, one network read per candidate link otherwise). Only possible
+positives are confirmed with database.url_exists. Known links are mostly
+answered by the per-source watermark (watermark.py) before they get here.
+
+The filter is kept in cache/url_bloom.bin (a JSON header line, then the
+bit array) and, on Firestore, also in the meta/url_filter document, so a
+fresh instance (Cloud Run: ephemeral cache/) loads it with one read
+instead of scanning the news collection. The newer of the two is used.
+
+A filter is only trusted once it is caught up with the database: on load,
+and again every REFRESH_SECONDS while a crawler runs, the URLs created
+since its last sync (minus CATCHUP_SLACK, for clock skew and concurrent
+saves) are read and added. That covers news inserted by other hosts,
+instances and scripts (sync/migrate), and entries lost when two crawlers
+save at once. If a catch-up fails, the crawler asks the database for every
+URL until one succeeds. Between catch-ups a negative can be stale (another
+writer stored the URL meanwhile); add_news is idempotent per URL on both
+backends (SQLite UNIQUE url, Firestore document id derived from the URL),
+so that costs a rejected insert, not a duplicate. A full rebuild (one read per stored URL) happens
+only without any saved filter, when it is over capacity, or older than
+MAX_AGE_DAYS (which also drops the harmless positives of deleted news).
+
+Usage:
+    python url_filter.py             # false-positive-rate report
+    python url_filter.py --rebuild   # rebuild from the database
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+
+import database
+from json_cache import cache_path
+from url_utils import canonical_url
+
+FILTER_PATH = cache_path('url_bloom.bin')
+DEFAULT_CAPACITY = 200000
+DEFAULT_ERROR_RATE = 0.01
+REPORT_PROBES = 20000
+MAX_AGE_DAYS = 7
+REFRESH_SECONDS = 300
+CATCHUP_SLACK = 86400
+MAX_SHARED_BYTES = 1000000      # Firestore documents are limited to 1 MiB
+
+
+class BloomFilter:
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.built_at = time.time()
+        self.synced_at = self.built_at      # contains every URL created before this
+
+    def _positions(self, key):
+        # Double hashing (Kirsch-Mitzenmacher) from one 128-bit digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """Add `key`; returns True if it was (probably) not there yet."""
+        added = False
+        for pos in self._positions(key):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def fill_ratio(self):
+        return bin(int.from_bytes(self.bits, 'little')).count('1') / self.size
+
+    def estimated_fpr(self):
+        """False-positive rate implied by the bits actually set."""
+        return self.fill_ratio() ** self.hashes
+
+    def to_bytes(self):
+        header = {'capacity': self.capacity, 'error_rate': self.error_rate, 'size': self.size,
+                  'hashes': self.hashes, 'count': self.count, 'built_at': self.built_at,
+                  'synced_at': self.synced_at}
+        return json.dumps(header).encode('utf-8') + b'\n' + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        header_line, bits = data.split(b'\n', 1)
+        header = json.loads(header_line)
+        bloom = cls(header['capacity'], header['error_rate'])
+        if (bloom.size, bloom.hashes) != (header['size'], header['hashes']) or len(bits) != len(bloom.bits):
+            raise ValueError("inconsistent filter data")
+        bloom.bits = bytearray(bits)
+        bloom.count = header['count']
+        bloom.built_at = header['built_at']
+        bloom.synced_at = header.get('synced_at', header['built_at'])
+        return bloom
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class UrlFilter:
+    """The filter plus the bookkeeping of one crawler process."""
+
+    def __init__(self, bloom, path=FILTER_PATH):
+        self.bloom = bloom
+        self.path = path
+        self.dirty = False
+        self.synced = False         # caught up with the database; else not trusted
+        self.stats = {'negative': 0, 'confirmed': 0, 'false_positive': 0, 'unsynced': 0}
+
+    def might_contain(self, url):
+        return canonical_url(url) in self.bloom
+
+    def exists(self, url, db_exists):
+        """url_exists with the filter in front: DB lookups only for possible positives."""
+        if not self.synced:
+            self.stats['unsynced'] += 1
+            return db_exists(url)
+        if not self.might_contain(url):
+            self.stats['negative'] += 1
+            return False
+        if db_exists(url):
+            self.stats['confirmed'] += 1
+            return True
+        self.stats['false_positive'] += 1
+        return False
+
+    def add(self, url):
+        if self.bloom.add(canonical_url(url)):
+            self.dirty = True
+
+    def catch_up(self):
+        """Add the URLs created since the last sync; False (and untrusted) on errors."""
+        start = time.time()
+        try:
+            added = sum(1 for url in database.iter_news_urls(since=self.bloom.synced_at - CATCHUP_SLACK)
+                        if self.bloom.add(canonical_url(url)))
+        except Exception as e:
+            print(f"URL filter catch-up failed, checking every URL in the database: {e}")
+            self.synced = False
+            return False
+        self.bloom.synced_at = start
+        self.synced = True
+        self.dirty = True
+        if added:
+            print(f"URL filter: caught up {added} URLs stored elsewhere")
+        return True
+
+    def refresh(self):
+        """Catch up if the last sync is older than REFRESH_SECONDS (long-running crawlers)."""
+        if not self.synced or time.time() - self.bloom.synced_at > REFRESH_SECONDS:
+            self.catch_up()
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            _save_shared(self.bloom, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving URL filter {self.path}: {e}")
+
+
+def _save_shared(bloom, path):
+    """Local file, plus the shared copy on Firestore."""
+    bloom.save(path)
+    if database.USE_FIRESTORE:
+        data = bloom.to_bytes()
+        if len(data) <= MAX_SHARED_BYTES:
+            database.save_url_filter_blob(data)
+        else:
+            print(f"URL filter too large to share ({len(data)} bytes); kept locally only")
+
+
+def _load_saved(path):
+    """The newest saved filter (local file or shared copy), or None."""
+    candidates = []
+    if os.path.exists(path):
+        try:
+            candidates.append(BloomFilter.load(path))
+        except Exception as e:
+            print(f"Error loading URL filter {path}: {e}")
+    try:
+        data = database.get_url_filter_blob()
+        if data:
+            candidates.append(BloomFilter.from_bytes(bytes(data)))
+    except Exception as e:
+        print(f"Error loading shared URL filter: {e}")
+    return max(candidates, key=lambda bloom: bloom.synced_at, default=None)
+
+
+def rebuild(path=FILTER_PATH, capacity=None):
+    """Build the filter from every URL in the database and save it."""
+    start = time.perf_counter()
+    synced_at = time.time()
+    urls = [canonical_url(url) for url in database.iter_news_urls()]
+    bloom = BloomFilter(capacity or max(DEFAULT_CAPACITY, 2 * len(urls)))
+    bloom.built_at = bloom.synced_at = synced_at
+    for url in urls:
+        bloom.add(url)
+    _save_shared(bloom, path)
+    print(f"URL filter rebuilt: {len(urls)} URLs, {bloom.size // 8 // 1024} KB, "
+          f"{bloom.hashes} hashes, in {time.perf_counter() - start:.1f}s")
+    return bloom
+
+
+def load(path=FILTER_PATH):
+    """
+    The crawler's URL filter, caught up with the database: the newest saved
+    one, or rebuilt when there is none or it is over capacity or too old.
+    None if it can't be built (the crawler then asks the database for
+    every URL, as before).
+    """
+    bloom = _load_saved(path)
+    if bloom is not None and bloom.count > bloom.capacity:
+        print(f"URL filter over capacity ({bloom.count} > {bloom.capacity}), rebuilding...")
+        bloom = None
+    elif bloom is not None and time.time() - bloom.built_at > MAX_AGE_DAYS * 86400:
+        print(f"URL filter older than {MAX_AGE_DAYS} days, rebuilding...")
+        bloom = None
+    if bloom is None:
+        try:
+            bloom = rebuild(path)
+        except Exception as e:
+            print(f"Could not build URL filter, checking every URL in the database: {e}")
+            return None
+        url_filter = UrlFilter(bloom, path)
+        url_filter.synced = True
+        return url_filter
+    url_filter = UrlFilter(bloom, path)
+    url_filter.catch_up()
+    return url_filter
+
+
+def report(bloom, probes=REPORT_PROBES):
+    """Print size, fill and the estimated vs measured false-positive rate."""
+    # Probe with keys that can't have been inserted (not URLs)
+    false_positives = sum(1 for i in range(probes) if f"probe:{i}:{bloom.built_at}" in bloom)
+    built = time.strftime('%Y-%m-%d %H:%M', time.localtime(bloom.built_at))
+    synced = time.strftime('%Y-%m-%d %H:%M', time.localtime(bloom.synced_at))
+    print(f"URLs:             {bloom.count} (capacity {bloom.capacity}, built {built}, synced {synced})")
+    print(f"Size:             {bloom.size} bits ({bloom.size // 8 // 1024} KB), {bloom.hashes} hashes")
+    print(f"Fill:             {bloom.fill_ratio():.1%}")
+    print(f"FPR target:       {bloom.error_rate:.2%}")
+    print(f"FPR estimated:    {bloom.estimated_fpr():.3%}  (from fill)")
+    print(f"FPR measured:     {false_positives / probes:.3%}  ({false_positives}/{probes} probes)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--rebuild', action='store_true', help='rebuild the filter from the database')
+    arg_parser.add_argument('--capacity', type=int, help='URLs to size the rebuilt filter for')
+    args = arg_parser.parse_args()
+
+    database.init_db()
+    if args.rebuild:
+        bloom = rebuild(capacity=args.capacity)
+    else:
+        bloom = _load_saved(FILTER_PATH)
+        if bloom is None:
+            print("No URL filter yet; run with --rebuild (or crawl once).")
+            return 1
+    report(bloom)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
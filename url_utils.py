@@ -0,0 +1,48 @@
+"""
+URL helpers shared by the crawler caches.
+"""
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the click, never change the page
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'ref', 'ref_src', 'ref_url', 'referrer', 'oc', 'guccounter',
+    'cmpid', 'ncid', 'sr_share', 'spm', 'smid', 'smtyp',
+}
+TRACKING_PREFIXES = ('utm_', '_hs', 'pk_', 'mtm_')
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def canonical_url(url):
+    """
+    Normalize a URL for use as a cache key: lowercase scheme and host, no
+    'www.', no default port, no fragment, no tracking parameters, remaining
+    parameters sorted and no trailing slash on the path.
+    """
+    if not url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = (parts.scheme or 'http').lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if port and str(port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
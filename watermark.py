@@ -0,0 +1,94 @@
+"""
+Per-source crawl watermark: the URLs recently seen on a source's listing
+and the newest published date found there.
+
+Listings are usually newest-first and only the top few items are new. With
+a watermark, NewsCrawler checks each item against the remembered URLs
+first (no DB lookup), and stops parsing the listing once KNOWN_RUN_LIMIT
+known items in a row have been seen. Sources whose listing isn't
+chronological (Google News search feeds are ranked by relevance) set
+"newest_first": false in sources.json: they get the URL lookups but never
+stop early. Items dated before the watermark
+(minus STALE_SLACK_DAYS) count towards that run too, but are still checked,
+since an old-dated article can be new to us.
+
+Stored with the source's scheduling state (database.get_source_state /
+save_source_state, key 'watermark'). The first crawl of a source, or one
+with use_watermarks=False (python crawler.py --full), walks the whole
+listing as before.
+"""
+from datetime import datetime, timedelta
+
+import database
+
+KNOWN_RUN_LIMIT = 5
+MAX_URLS = 300                  # remembered per source, most recently seen kept
+STALE_SLACK_DAYS = 2
+
+
+class Watermark:
+    def __init__(self, name, urls=(), newest=None, newest_first=True):
+        self.name = name
+        self.newest_first = newest_first
+        self.urls = dict.fromkeys(urls)     # insertion-ordered set
+        self.newest = newest
+        # Early stop only once there is something to compare against
+        self.active = bool(self.urls) and newest_first
+        self.run = 0
+        self.hits = 0                       # DB lookups saved
+        self.stopped = False
+
+    @classmethod
+    def load(cls, source):
+        name = source['name']
+        state = database.get_source_state(name).get('watermark') or {}
+        return cls(name, state.get('urls') or (), state.get('newest'), source.get('newest_first', True))
+
+    def _is_stale(self, published_at):
+        if not published_at or not self.newest:
+            return False
+        try:
+            cutoff = datetime.strptime(self.newest[:10], '%Y-%m-%d') - timedelta(days=STALE_SLACK_DAYS)
+        except ValueError:
+            return False
+        return str(published_at)[:10] < cutoff.strftime('%Y-%m-%d')
+
+    def known(self, url, exists, published_at=None):
+        """
+        True if `url` was already ingested: from the watermark, else
+        exists(url) (the DB lookup). Tracks the run of known/stale items.
+        """
+        if url in self.urls:
+            self.hits += 1
+            hit = True
+        else:
+            hit = exists(url)
+            if hit:
+                self.remember(url)
+        if hit or self._is_stale(published_at):
+            self.run += 1
+        else:
+            self.run = 0
+        return hit
+
+    @property
+    def exhausted(self):
+        """A run of known items: the rest of the listing is older."""
+        if self.active and self.run >= KNOWN_RUN_LIMIT:
+            self.stopped = True
+        return self.stopped
+
+    def remember(self, url, published_at=None):
+        self.urls.pop(url, None)
+        self.urls[url] = None
+        if published_at and (not self.newest or str(published_at) > self.newest):
+            self.newest = str(published_at)
+
+    def save(self):
+        urls = list(self.urls)[-MAX_URLS:]
+        state = database.get_source_state(self.name)
+        state['watermark'] = {'urls': urls, 'newest': self.newest}
+        database.save_source_state(self.name, state)
+        if self.stopped or self.hits:
+            print(f"{self.name}: watermark saved {self.hits} lookups"
+                  + (", stopped early" if self.stopped else ""))